@@ -0,0 +1,133 @@
+"""上传带宽限制：进程内所有上传线程共享的令牌桶"""
+import threading
+import time
+
+from robot_data_uploader import config
+
+
+class TokenBucket:
+    """线程安全的令牌桶限速器
+
+    速率单位为字节/秒，0 或 None 表示不限速。速率可在运行时调整，正在等待的线程
+    最多在 MAX_WAIT 秒后按新速率重新计算。
+    """
+
+    MAX_WAIT = 0.2  # 秒
+    MIN_BURST = 64 * 1024  # 字节
+
+    def __init__(self, rate=None, burst=None):
+        self._lock = threading.Lock()
+        self._rate = 0
+        self._burst = self.MIN_BURST
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        self.set_rate(rate, burst)
+        self._tokens = float(self._burst)
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def set_rate(self, rate, burst=None):
+        """调整速率
+
+        Args:
+            rate: 速率（字节/秒），0 或 None 表示不限速
+            burst: 桶容量（字节），默认取 0.2 秒的流量且不小于 MIN_BURST
+        """
+        with self._lock:
+            self._refill()
+            self._rate = max(0, int(rate or 0))
+            self._burst = max(self.MIN_BURST, int(burst or self._rate * 0.2))
+            self._tokens = min(self._tokens, self._burst)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self._rate:
+            self._tokens = min(self._burst, self._tokens + (now - self._last) * self._rate)
+        self._last = now
+
+    def consume(self, amount):
+        """取出 amount 字节的令牌，令牌不足时阻塞等待"""
+        while amount > 0:
+            with self._lock:
+                if not self._rate:
+                    return
+                self._refill()
+                take = min(amount, self._burst)
+                if self._tokens >= take:
+                    self._tokens -= take
+                    amount -= take
+                    continue
+                wait = (take - self._tokens) / self._rate
+            time.sleep(min(wait, self.MAX_WAIT))
+
+    def reserve(self, amount):
+        """预先扣除 amount 字节的令牌（可透支），返回调用方发送前应等待的时间（秒）
+
+        供 asyncio 协程使用：不阻塞线程，由调用方 await asyncio.sleep 等待。
+        """
+        with self._lock:
+            if not self._rate:
+                return 0.0
+            self._refill()
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self._rate)
+
+
+class ThrottledReader:
+    """包装请求体文件对象，每次读取都从令牌桶中扣除相应字节数
+
+    SDK 边读边发送请求体，读取速度即发送速度。其余属性（tell、seek 等）直接转发给原对象。
+    """
+
+    def __init__(self, fp, limiter):
+        self._fp = fp
+        self._limiter = limiter
+
+    def read(self, *args):
+        data = self._fp.read(*args)
+        if data:
+            self._limiter.consume(len(data))
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._fp, name)
+
+
+class UploadRateController:
+    """管理进程内的上传速率，速率可在运行时调整"""
+
+    def __init__(self, rate=None):
+        self.limiter = TokenBucket(config.UPLOAD_RATE_LIMIT if rate is None else rate)
+
+    def set_rate(self, rate):
+        """设置速率（字节/秒），0 表示不限速"""
+        self.limiter.set_rate(rate)
+
+    def current_rate(self):
+        """当前生效的速率（字节/秒），0 表示不限速"""
+        return self.limiter.rate
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_rate_controller():
+    """获取进程内共享的上传速率控制器"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = UploadRateController()
+        return _controller
+
+
+def throttled(fp):
+    """用进程内共享的令牌桶包装请求体"""
+    return ThrottledReader(fp, get_rate_controller().limiter)
+
+
+def set_upload_rate(rate):
+    """运行时调整上传速率（字节/秒），0 表示不限速（如采集期间调低、采集结束后恢复）"""
+    get_rate_controller().set_rate(rate)
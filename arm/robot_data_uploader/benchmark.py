@@ -0,0 +1,489 @@
+"""上传吞吐量基准测试：生成 LeRobot 格式的合成数据集，对本地KS3替身服务（或指定端点）执行 batch_upload，
+按参数组合输出 JSON 结果
+
+每组参数都在新的替身服务进程、断点续传目录和上传器上运行，各次结果互不影响；替身服务运行在子进程中，
+CPU 统计只包含上传进程本身。结果附带版本、提交、架构和 Python 信息，可在不同版本之间、x86 与 arm 构建之间比较。
+
+--compression 模式不上传，按扩展名统计数据集文件的压缩率和压缩速度（compression.measure_compression），
+用于决定 UPLOAD_COMPRESSION_RULES；records 分布带有可压缩的 JSON/JSONL 状态记录。
+
+用法:
+    python -m robot_data_uploader.benchmark --profiles small,mixed --workers 1,4,8 --output bench.json
+    python -m robot_data_uploader.benchmark --compare baseline.json bench.json
+    python -m robot_data_uploader.benchmark --compression --profiles records --codecs zstd,gzip
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from robot_data_uploader import __version__, config
+
+RESULT_SCHEMA_VERSION = 1
+_MIB = 1024 * 1024
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 合成数据集的文件大小分布：episode 数、相机数、每个 episode 的 parquet 和视频文件大小范围（字节）
+DATASET_PROFILES = {
+    "small": {"episodes": 200, "cameras": 2, "data_size": (16 * 1024, 128 * 1024),
+              "video_size": (64 * 1024, 512 * 1024)},
+    "mixed": {"episodes": 20, "cameras": 3, "data_size": (256 * 1024, 2 * _MIB),
+              "video_size": (1 * _MIB, 8 * _MIB)},
+    "large": {"episodes": 4, "cameras": 3, "data_size": (2 * _MIB, 8 * _MIB),
+              "video_size": (16 * _MIB, 64 * _MIB)},
+    # 每个 episode 另有一份 JSONL 状态记录和一份 JSON 标注（文本内容，可压缩）
+    "records": {"episodes": 20, "cameras": 2, "data_size": (256 * 1024, 1 * _MIB),
+                "video_size": (1 * _MIB, 4 * _MIB), "records_size": (512 * 1024, 4 * _MIB)},
+}
+_CAMERAS = ("cam_high", "cam_left_wrist", "cam_right_wrist", "cam_low")
+_CHUNK_SIZE = 1000  # 与 LeRobot 一致：每个 chunk 目录 1000 个 episode
+
+# 单次运行期间修改、结束后恢复的配置项
+_RUN_SETTINGS = ("PART_SIZE", "MAX_PART_SIZE", "UPLOAD_ENGINE", "ENDPOINT", "CURRENT_ENDPOINT", "ENDPOINT_TYPE",
+                 "KS3_PORT", "KS3_PATH_STYLE", "ADAPTIVE_CONCURRENCY", "MAX_FILE_CONCURRENCY",
+                 "MAX_PART_CONCURRENCY", "BATCH_OUTBOX_RESUME")
+# 替身服务不校验签名，使用固定的凭证
+_BENCHMARK_STS_TOKEN = {"accessKeyId": "benchmark", "secretAccessKey": "benchmark", "securityToken": ""}
+
+
+def _log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def generate_dataset(root, profile, seed=0, scale=1.0):
+    """生成 LeRobot v2 目录结构的合成数据集（meta/、data/chunk-xxx/*.parquet、videos/chunk-xxx/<相机>/*.mp4）
+
+    parquet 和视频文件内容为伪随机字节（与压缩后的视频一样不可再压缩）；分布带有 records_size 时，
+    每个 episode 另生成 records/chunk-xxx/ 下的 JSONL 状态记录和 JSON 标注。相同参数生成的数据集完全相同。
+    已生成过的数据集直接复用。
+
+    Args:
+        root: 数据集存放目录
+        profile: DATASET_PROFILES 中的名称
+        seed: 随机种子
+        scale: 文件大小的缩放比例
+
+    Returns:
+        dict: {"path", "files", "bytes"}
+    """
+    spec = DATASET_PROFILES[profile]
+    name = f"{profile}-s{seed}-x{scale:g}"
+    path = os.path.join(root, name)
+    marker = os.path.join(root, name + ".json")
+    if os.path.exists(marker):
+        with open(marker, encoding="utf-8") as f:
+            return json.load(f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    rng = random.Random(f"{profile}:{seed}")
+    cameras = _CAMERAS[:spec["cameras"]]
+    files = total = 0
+
+    def write(relative_path, size_range):
+        nonlocal files, total
+        size = max(1, int(rng.randint(*size_range) * scale))
+        file_path = os.path.join(path, relative_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(rng.randbytes(size))
+        files += 1
+        total += size
+
+    def write_records(relative_path, size_range):
+        # 关节状态和动作按帧写成 JSONL，数值带噪声，与真实采集记录的压缩率接近
+        nonlocal files, total
+        size = max(1, int(rng.randint(*size_range) * scale))
+        file_path = os.path.join(path, relative_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        lines, written, frame = [], 0, 0
+        state = [rng.uniform(-1.0, 1.0) for _ in range(14)]
+        while written < size:
+            state = [round(value + rng.gauss(0.0, 0.01), 5) for value in state]
+            line = json.dumps({"timestamp": round(frame / 30, 4), "frame_index": frame, "observation.state": state,
+                               "action": [round(value + rng.gauss(0.0, 0.005), 5) for value in state]}) + "\n"
+            lines.append(line)
+            written += len(line)
+            frame += 1
+        data = "".join(lines).encode("utf-8")
+        with open(file_path, "wb") as f:
+            f.write(data)
+        annotation = json.dumps({"frames": frame, "fps": 30, "cameras": list(cameras),
+                                 "events": [{"frame_index": rng.randrange(frame), "label": "grasp"}
+                                            for _ in range(8)]}, indent=4).encode("utf-8")
+        with open(os.path.splitext(file_path)[0] + ".json", "wb") as f:
+            f.write(annotation)
+        files += 2
+        total += len(data) + len(annotation)
+
+    episodes, lengths = spec["episodes"], []
+    for episode in range(episodes):
+        chunk = f"chunk-{episode // _CHUNK_SIZE:03d}"
+        write(f"data/{chunk}/episode_{episode:06d}.parquet", spec["data_size"])
+        for camera in cameras:
+            write(f"videos/{chunk}/observation.images.{camera}/episode_{episode:06d}.mp4", spec["video_size"])
+        if "records_size" in spec:
+            write_records(f"records/{chunk}/episode_{episode:06d}.jsonl", spec["records_size"])
+        lengths.append(rng.randint(200, 1200))
+
+    info = {
+        "codebase_version": "v2.0",
+        "robot_type": "benchmark",
+        "total_episodes": episodes,
+        "total_frames": sum(lengths),
+        "total_videos": episodes * len(cameras),
+        "chunks_size": _CHUNK_SIZE,
+        "fps": 30,
+        "data_path": "data/chunk-{episode_chunk:03d}/episode_{episode_index:06d}.parquet",
+        "video_path": "videos/chunk-{episode_chunk:03d}/{video_key}/episode_{episode_index:06d}.mp4",
+    }
+    meta = {
+        "info.json": json.dumps(info, indent=4),
+        "tasks.jsonl": json.dumps({"task_index": 0, "task": "synthetic benchmark task"}) + "\n",
+        "episodes.jsonl": "".join(json.dumps({"episode_index": i, "tasks": ["synthetic benchmark task"],
+                                              "length": length}) + "\n" for i, length in enumerate(lengths)),
+    }
+    os.makedirs(os.path.join(path, "meta"), exist_ok=True)
+    for filename, content in meta.items():
+        data = content.encode("utf-8")
+        with open(os.path.join(path, "meta", filename), "wb") as f:
+            f.write(data)
+        files += 1
+        total += len(data)
+
+    dataset = {"path": path, "files": files, "bytes": total}
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(dataset, f)
+    return dataset
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def stub_process(latency=0.0, bandwidth=0.0, timeout=10):
+    """在子进程中启动KS3替身服务
+
+    Args:
+        latency: 每个请求的附加时延（秒）
+        bandwidth: 带宽上限（MB/s），0 表示不限速
+        timeout: 等待服务启动的最长时间（秒）
+
+    Yields:
+        str: 服务地址 "host:port"
+    """
+    port = _free_port()
+    env = dict(os.environ, KS3_ENDPOINT_OVERRIDE=f"127.0.0.1:{port}")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [_PACKAGE_ROOT, env.get("PYTHONPATH")]))
+    process = subprocess.Popen([sys.executable, "-m", "robot_data_uploader.ks3_stub", "--port", str(port),
+                                "--latency", str(latency), "--bandwidth", str(bandwidth)],
+                               cwd=_PACKAGE_ROOT, env=env, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("KS3替身服务启动失败")
+                time.sleep(0.05)
+        yield f"127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _timed_batch(uploader, dataset, target_directory, verify_method, skip_exist):
+    """执行一次批量上传，返回结果、耗时和进程 CPU 时间"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        cpu_start, start = time.process_time(), time.perf_counter()
+        result = uploader.batch_upload(directory=dataset["path"], target_directory=target_directory,
+                                       skip_exist=skip_exist, verify_method=verify_method)
+        return result.data or {}, time.perf_counter() - start, time.process_time() - cpu_start
+
+
+def run_upload(dataset, endpoint, max_worker, part_size, verify_method, engine, work_dir):
+    """对指定端点执行一次批量上传并测量，再以跳过已存在文件的方式重新上传一次，测量内容验证
+
+    上传器在新的临时目录中创建（断点续传日志、摘要缓存、批量清单都从空开始），结束后删除该目录。
+    运行期间关闭自适应并发，并发数固定为 max_worker 和 PART_CONCURRENCY，各组参数的结果才可比较；
+    同时关闭批量清单续传，第一次上传有失败文件时验证仍覆盖全部文件。
+    验证阶段与重新运行上传任务相同，沿用第一次上传留下的摘要缓存。
+
+    Returns:
+        dict: 本次运行的测量结果
+    """
+    # 延迟导入：只生成数据集或比较结果时不需要加载上传器
+    from robot_data_uploader.collect_uploader import BaaiRobotDataUploader
+    from robot_data_uploader.credentials import StsCredentialProvider
+
+    saved = {name: getattr(config, name) for name in _RUN_SETTINGS}
+    run_dir = tempfile.mkdtemp(prefix="run-", dir=work_dir)
+    cwd = os.getcwd()
+    config.PART_SIZE = config.MAX_PART_SIZE = part_size
+    config.UPLOAD_ENGINE = engine
+    config.ADAPTIVE_CONCURRENCY = False
+    config.MAX_FILE_CONCURRENCY = max_worker
+    config.MAX_PART_CONCURRENCY = config.PART_CONCURRENCY
+    config.BATCH_OUTBOX_RESUME = False
+    config.use_endpoint(endpoint, endpoint_type="基准测试")
+    os.chdir(run_dir)
+    try:
+        uploader = BaaiRobotDataUploader()
+        uploader.set_credential_provider(StsCredentialProvider(lambda: dict(_BENCHMARK_STS_TOKEN),
+                                                               sts_token=dict(_BENCHMARK_STS_TOKEN)))
+        uploader.set_max_worker(max_worker)
+        final = {}
+
+        def on_progress(snapshot):
+            # 只记录第一次上传结束时的快照，验证阶段的快照不覆盖
+            if snapshot["finished"] and not final:
+                final.update(snapshot)
+
+        uploader.add_progress_listener(on_progress)
+
+        target_directory = f"benchmark/{os.path.basename(run_dir)}"
+        data, seconds, cpu_seconds = _timed_batch(uploader, dataset, target_directory, verify_method, False)
+        # 目标目录已有全部文件，逐个按 verify_method 验证内容后跳过
+        verified, verify_seconds, verify_cpu_seconds = _timed_batch(uploader, dataset, target_directory,
+                                                                    verify_method, True)
+    finally:
+        os.chdir(cwd)
+        for name, value in saved.items():
+            setattr(config, name, value)
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    gigabytes = dataset["bytes"] / (1024 * _MIB)
+    return {
+        "adaptive_concurrency": False,
+        "files": data.get("success_count", 0),
+        "failed_files": data.get("failure_count", 0),
+        "bytes": dataset["bytes"],
+        "seconds": round(seconds, 4),
+        "mb_per_s": round(dataset["bytes"] / _MIB / seconds, 3) if seconds > 0 else 0.0,
+        "files_per_s": round(data.get("success_count", 0) / seconds, 3) if seconds > 0 else 0.0,
+        "file_seconds": {name: round(value, 4) for name, value in final.get("file_seconds", {}).items()},
+        "cpu_seconds": round(cpu_seconds, 4),
+        "cpu_seconds_per_gb": round(cpu_seconds / gigabytes, 4) if gigabytes else 0.0,
+        # 验证阶段：内容一致而跳过的文件数、验证不一致而重新上传的文件数
+        "verified_files": verified.get("skipped_count", 0),
+        "reuploaded_files": verified.get("success_count", 0),
+        "verify_seconds": round(verify_seconds, 4),
+        "verify_files_per_s": (round(verified.get("skipped_count", 0) / verify_seconds, 3)
+                               if verify_seconds > 0 else 0.0),
+        "verify_cpu_seconds": round(verify_cpu_seconds, 4),
+    }
+
+
+def environment_info():
+    """运行环境信息，用于比较不同版本和不同构建的结果"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_PACKAGE_ROOT, capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "version": __version__,
+        "commit": commit,
+        "build": os.path.basename(_PACKAGE_ROOT),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmark(profiles=("small", "mixed"), workers=(1, 4, 8), part_sizes=(8 * _MIB,),
+                  verify_methods=("size",), engines=("thread",), repeat=1, latency=0.0, bandwidth=0.0,
+                  endpoint=None, work_dir=None, seed=0, scale=1.0):
+    """按参数组合执行基准测试
+
+    Args:
+        profiles: 数据集文件大小分布（DATASET_PROFILES 中的名称）
+        workers: 同时上传的文件数（max_worker）
+        part_sizes: 分片大小（字节），同时作为分片大小的下限和上限
+        verify_methods: 文件内容验证方法
+        engines: 批量上传引擎
+        repeat: 每组参数的重复次数
+        latency: 替身服务每个请求的附加时延（秒）
+        bandwidth: 替身服务的带宽上限（MB/s），0 表示不限速
+        endpoint: 使用已有的端点（"host:port"，需支持路径方式访问），为空时每次运行启动新的替身服务
+        work_dir: 数据集和临时文件目录，默认在系统临时目录下
+        seed: 数据集随机种子
+        scale: 数据集文件大小的缩放比例
+
+    Returns:
+        dict: 结果（schema、environment、settings、runs），可直接序列化为 JSON
+    """
+    work_dir = work_dir or os.path.join(tempfile.gettempdir(), "robot_data_uploader_benchmark")
+    os.makedirs(work_dir, exist_ok=True)
+    datasets = {}
+    for profile in profiles:
+        _log(f"生成数据集 {profile} ...")
+        datasets[profile] = generate_dataset(os.path.join(work_dir, "datasets"), profile, seed, scale)
+
+    runs = []
+    combinations = list(itertools.product(profiles, engines, workers, part_sizes, verify_methods, range(repeat)))
+    for index, (profile, engine, max_worker, part_size, verify_method, attempt) in enumerate(combinations, 1):
+        params = {"profile": profile, "engine": engine, "max_worker": max_worker, "part_size": part_size,
+                  "verify_method": verify_method, "repeat": attempt}
+        _log(f"[{index}/{len(combinations)}] {params}")
+        with contextlib.ExitStack() as stack:
+            target = endpoint or stack.enter_context(stub_process(latency, bandwidth))
+            measured = run_upload(datasets[profile], target, max_worker, part_size, verify_method, engine, work_dir)
+        _log(f"    {measured['mb_per_s']} MB/s, {measured['files_per_s']} files/s, "
+             f"p99 {measured['file_seconds'].get('p99')} s, 验证 {measured['verify_files_per_s']} files/s")
+        runs.append(dict(params, **measured))
+
+    return {
+        "schema": RESULT_SCHEMA_VERSION,
+        "environment": environment_info(),
+        "settings": {"latency": latency, "bandwidth_mb_per_s": bandwidth, "endpoint": endpoint, "seed": seed,
+                     "scale": scale, "datasets": {profile: {"files": dataset["files"], "bytes": dataset["bytes"]}
+                                                  for profile, dataset in datasets.items()}},
+        "runs": runs,
+    }
+
+
+_RUN_KEY = ("profile", "engine", "max_worker", "part_size", "verify_method")
+
+
+def compare_results(baseline, current):
+    """按参数组合比较两份结果（重复运行取平均）
+
+    Returns:
+        list: 每组参数的 baseline/current 吞吐量（MB/s）、CPU（秒/GB）及吞吐量比值
+    """
+    def averages(result):
+        grouped = {}
+        for run in result["runs"]:
+            grouped.setdefault(tuple(run[name] for name in _RUN_KEY), []).append(run)
+        return {key: {metric: sum(run[metric] for run in group) / len(group)
+                      for metric in ("mb_per_s", "cpu_seconds_per_gb")}
+                for key, group in grouped.items()}
+
+    before, after = averages(baseline), averages(current)
+    rows = []
+    for key in sorted(before.keys() & after.keys(), key=str):
+        row = dict(zip(_RUN_KEY, key))
+        for metric in ("mb_per_s", "cpu_seconds_per_gb"):
+            row[f"baseline_{metric}"] = round(before[key][metric], 3)
+            row[f"current_{metric}"] = round(after[key][metric], 3)
+        row["throughput_ratio"] = (round(after[key]["mb_per_s"] / before[key]["mb_per_s"], 3)
+                                   if before[key]["mb_per_s"] else None)
+        rows.append(row)
+    return rows
+
+
+def run_compression_benchmark(profiles=("records",), codecs=("zstd", "gzip"), work_dir=None, seed=0, scale=1.0):
+    """按扩展名测量数据集文件的压缩率和压缩速度（不上传）
+
+    Args:
+        profiles: 数据集文件大小分布（DATASET_PROFILES 中的名称）
+        codecs: 参与比较的压缩算法，未安装 zstandard 时跳过 zstd
+        work_dir: 数据集目录，默认在系统临时目录下
+        seed: 数据集随机种子
+        scale: 数据集文件大小的缩放比例
+
+    Returns:
+        dict: 结果（schema、environment、settings、compression），compression 为
+              分布 -> 扩展名 -> 算法 -> {"files", "original_bytes", "compressed_bytes", "ratio", "mb_per_s"}
+    """
+    # 延迟导入：只在测量压缩时加载
+    from robot_data_uploader.compression import measure_compression
+
+    work_dir = work_dir or os.path.join(tempfile.gettempdir(), "robot_data_uploader_benchmark")
+    os.makedirs(work_dir, exist_ok=True)
+    datasets, compression = {}, {}
+    for profile in profiles:
+        _log(f"生成数据集 {profile} ...")
+        datasets[profile] = dataset = generate_dataset(os.path.join(work_dir, "datasets"), profile, seed, scale)
+        file_paths = [os.path.join(root, filename) for root, _, filenames in os.walk(dataset["path"])
+                      for filename in sorted(filenames)]
+        report = measure_compression(file_paths, codecs)
+        for ext, by_codec in sorted(report.items()):
+            for codec, stats in by_codec.items():
+                stats["ratio"] = round(stats["ratio"], 4)
+                stats["mb_per_s"] = round(stats["mb_per_s"], 3)
+                _log(f"    {profile} {ext} {codec}: 压缩率 {stats['ratio']}, {stats['mb_per_s']} MB/s")
+        compression[profile] = report
+
+    return {
+        "schema": RESULT_SCHEMA_VERSION,
+        "environment": environment_info(),
+        "settings": {"seed": seed, "scale": scale, "codecs": list(codecs),
+                     "levels": {codec: config.COMPRESSION_LEVELS.get(codec) for codec in codecs},
+                     "datasets": {profile: {"files": dataset["files"], "bytes": dataset["bytes"]}
+                                  for profile, dataset in datasets.items()}},
+        "compression": compression,
+    }
+
+
+def _split(value, cast=str):
+    return tuple(cast(item) for item in value.split(",") if item)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="上传吞吐量基准测试，结果以 JSON 输出")
+    parser.add_argument("--profiles", default="small,mixed", help=f"数据集分布，可选 {','.join(DATASET_PROFILES)}")
+    parser.add_argument("--workers", default="1,4,8", help="max_worker 取值列表")
+    parser.add_argument("--part-sizes", default="8", help="分片大小列表（MB）")
+    parser.add_argument("--verify", default="size", help="验证方法列表（size、md5、sha256、strict）")
+    parser.add_argument("--engines", default="thread", help="上传引擎列表（thread、asyncio）")
+    parser.add_argument("--repeat", type=int, default=1, help="每组参数的重复次数")
+    parser.add_argument("--latency", type=float, default=0.0, help="替身服务每个请求的附加时延（秒）")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="替身服务带宽上限（MB/s），0 表示不限速")
+    parser.add_argument("--endpoint", help="使用已有端点（host:port），不启动替身服务")
+    parser.add_argument("--work-dir", help="数据集和临时文件目录")
+    parser.add_argument("--seed", type=int, default=0, help="数据集随机种子")
+    parser.add_argument("--scale", type=float, default=1.0, help="数据集文件大小缩放比例")
+    parser.add_argument("--output", help="结果文件路径，默认输出到标准输出")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="比较两份结果文件")
+    parser.add_argument("--compression", action="store_true", help="不上传，按扩展名测量压缩率和压缩速度")
+    parser.add_argument("--codecs", default="zstd,gzip", help="--compression 模式比较的压缩算法列表")
+    args = parser.parse_args()
+
+    if args.compare:
+        results = []
+        for path in args.compare:
+            with open(path, encoding="utf-8") as f:
+                results.append(json.load(f))
+        output = {"baseline": results[0]["environment"], "current": results[1]["environment"],
+                  "runs": compare_results(*results)}
+    elif args.compression:
+        output = run_compression_benchmark(
+            profiles=_split(args.profiles), codecs=_split(args.codecs), work_dir=args.work_dir,
+            seed=args.seed, scale=args.scale)
+    else:
+        output = run_benchmark(
+            profiles=_split(args.profiles), workers=_split(args.workers, int),
+            part_sizes=tuple(int(float(size) * _MIB) for size in _split(args.part_sizes)),
+            verify_methods=_split(args.verify), engines=_split(args.engines), repeat=args.repeat,
+            latency=args.latency, bandwidth=args.bandwidth, endpoint=args.endpoint, work_dir=args.work_dir,
+            seed=args.seed, scale=args.scale)
+
+    text = json.dumps(output, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
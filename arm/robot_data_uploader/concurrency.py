@@ -0,0 +1,132 @@
+"""AIMD自适应并发控制"""
+import threading
+import time
+
+from robot_data_uploader import config
+
+_MIB = 1024 * 1024
+
+
+class AimdController:
+    """加性增、乘性减（AIMD）的并发控制器
+
+    每个统计窗口结束时评估一次：
+    - 单位数据量的平均耗时超过历史最小值的 latency_tolerance 倍 -> 并发数乘以 decrease_factor
+    - 否则吞吐量比上一个窗口提升超过 min_improvement -> 并发数加 increase
+    - 其余情况保持不变
+    请求失败时立即乘性减小（每个窗口最多减小一次，避免一批并发请求同时失败时连续减半）。
+
+    工作线程在每个任务前调用 acquire、结束后调用 release，同时进行的任务数不超过当前并发数；
+    也可以只读取 limit 作为当前允许的并发数。
+    """
+
+    def __init__(self, initial, minimum=1, maximum=None, increase=1, decrease_factor=None,
+                 window=None, latency_tolerance=None, min_improvement=None):
+        """
+        Args:
+            initial: 初始并发数
+            minimum: 最小并发数
+            maximum: 最大并发数，默认等于初始值
+            increase: 每次加性增加的并发数
+            decrease_factor: 乘性减小系数，默认取 config.AIMD_DECREASE_FACTOR
+            window: 统计窗口（秒），默认取 config.AIMD_WINDOW
+            latency_tolerance: 耗时上升的容忍倍数，默认取 config.AIMD_LATENCY_TOLERANCE
+            min_improvement: 视为吞吐量提升的最小比例，默认取 config.AIMD_MIN_IMPROVEMENT
+        """
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum or initial)
+        self.increase = increase
+        self.decrease_factor = config.AIMD_DECREASE_FACTOR if decrease_factor is None else decrease_factor
+        self.window = config.AIMD_WINDOW if window is None else window
+        self.latency_tolerance = config.AIMD_LATENCY_TOLERANCE if latency_tolerance is None else latency_tolerance
+        self.min_improvement = config.AIMD_MIN_IMPROVEMENT if min_improvement is None else min_improvement
+
+        self._cond = threading.Condition()
+        self._limit = min(self.maximum, max(self.minimum, initial))
+        self._active = 0
+        self._last_throughput = None
+        self._base_latency = None
+        self._last_decrease = 0.0
+        self._reset_window(time.monotonic())
+
+    def _reset_window(self, now):
+        self._window_start = now
+        self._window_bytes = 0
+        self._window_latency = 0.0
+        self._window_samples = 0
+
+    @property
+    def limit(self):
+        """当前并发数"""
+        with self._cond:
+            return self._limit
+
+    def acquire(self):
+        """占用一个并发名额，已达当前并发数时等待"""
+        with self._cond:
+            while self._active >= self._limit:
+                self._cond.wait()
+            self._active += 1
+
+    def release(self):
+        """释放并发名额"""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def record_success(self, nbytes, elapsed):
+        """记录一次成功的请求
+
+        Args:
+            nbytes: 传输的字节数
+            elapsed: 耗时（秒）
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._window_bytes += nbytes
+            # 按每MiB耗时衡量延迟，小于1MiB的请求按1MiB计，避免小文件的往返时延被放大
+            self._window_latency += elapsed / max(nbytes / _MIB, 1.0)
+            self._window_samples += 1
+            if now - self._window_start >= self.window:
+                self._evaluate(now)
+
+    def record_failure(self):
+        """记录一次失败的请求（超时、连接错误等），乘性减小并发数"""
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.window:
+                self._decrease(now)
+                self._reset_window(now)
+
+    def _evaluate(self, now):
+        if not self._window_samples:
+            self._reset_window(now)
+            return
+        throughput = self._window_bytes / max(now - self._window_start, 1e-6)
+        latency = self._window_latency / self._window_samples
+        if self._base_latency is None or latency < self._base_latency:
+            self._base_latency = latency
+
+        if latency > self._base_latency * self.latency_tolerance:
+            self._decrease(now)
+        elif self._last_throughput is None or throughput > self._last_throughput * (1 + self.min_improvement):
+            self._limit = min(self.maximum, self._limit + self.increase)
+            self._cond.notify_all()
+        self._last_throughput = throughput
+        self._reset_window(now)
+
+    def _decrease(self, now):
+        self._limit = max(self.minimum, int(self._limit * self.decrease_factor))
+        self._last_decrease = now
+        # 并发数减小后吞吐量基准随之重置，重新开始探测
+        self._last_throughput = None
+
+    def snapshot(self):
+        """当前状态，用于上报
+
+        Returns:
+            dict: {"limit", "active", "minimum", "maximum"}
+        """
+        with self._cond:
+            return {"limit": self._limit, "active": self._active,
+                    "minimum": self.minimum, "maximum": self.maximum}
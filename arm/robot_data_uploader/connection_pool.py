@@ -0,0 +1,113 @@
+"""KS3连接池，供批量上传的各个工作线程共享"""
+import itertools
+import threading
+import time
+
+from ks3.connection import PathCallingFormat
+
+from robot_data_uploader import config
+
+
+def ks3_connection_options():
+    """按配置生成 KS3 Connection 的端点参数（host、port、is_secure 以及存储桶访问方式）"""
+    options = {"host": config.ENDPOINT, "is_secure": config.KS3_IS_SECURE}
+    if config.KS3_PORT:
+        options["port"] = config.KS3_PORT
+    if config.KS3_PATH_STYLE:
+        options["calling_format"] = PathCallingFormat()
+    return options
+
+
+class _PooledConnection:
+    """连接池中的单个连接及其缓存的 Bucket 对象"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.buckets = {}
+        self.last_checked = time.time()
+
+
+class Ks3ConnectionPool:
+    """线程安全的KS3连接池
+
+    每个 Connection 内部持有 requests.Session，请求之间复用 TCP/TLS 长连接（keep-alive）。
+    工作线程首次使用时按轮询方式绑定到池中的一个连接，之后一直复用该连接及其 Bucket 对象，
+    避免每个线程、每个文件都重新建立连接。超过健康检查间隔的连接在下次使用前会先探测，
+    探测失败则重建。
+    """
+
+    def __init__(self, connection_factory, pool_size=None, health_check_interval=None, bucket_name=None):
+        """
+        Args:
+            connection_factory: 无参可调用对象，返回新的 ks3 Connection
+            pool_size: 连接池大小，默认取 config.KS3_POOL_SIZE
+            health_check_interval: 健康检查间隔（秒），默认取 config.KS3_POOL_HEALTH_CHECK_INTERVAL，0 表示不检查
+            bucket_name: 健康检查使用的存储桶，默认取 config.BUCKET_NAME
+        """
+        self._factory = connection_factory
+        self.pool_size = max(1, pool_size or config.KS3_POOL_SIZE)
+        self.health_check_interval = (config.KS3_POOL_HEALTH_CHECK_INTERVAL
+                                      if health_check_interval is None else health_check_interval)
+        self.bucket_name = bucket_name or config.BUCKET_NAME
+        self._lock = threading.Lock()
+        self._entries = []
+        self._round_robin = itertools.count()
+        self._local = threading.local()
+
+    def _acquire_entry(self):
+        """获取当前线程绑定的连接，必要时创建或做健康检查"""
+        entry = getattr(self._local, 'entry', None)
+        if entry is None:
+            with self._lock:
+                if len(self._entries) < self.pool_size:
+                    entry = _PooledConnection(self._factory())
+                    self._entries.append(entry)
+                else:
+                    entry = self._entries[next(self._round_robin) % len(self._entries)]
+            self._local.entry = entry
+        elif self.health_check_interval and time.time() - entry.last_checked > self.health_check_interval:
+            self._check_health(entry)
+        return entry
+
+    def _check_health(self, entry):
+        """探测连接是否可用，不可用时原地重建"""
+        with self._lock:
+            # 其他线程已完成本轮检查
+            if time.time() - entry.last_checked <= self.health_check_interval:
+                return
+            entry.last_checked = time.time()
+            connection = entry.connection
+        try:
+            head_bucket = getattr(connection, 'head_bucket', None)
+            if head_bucket is not None:
+                head_bucket(self.bucket_name)
+        except Exception:
+            new_connection = self._factory()
+            with self._lock:
+                # 正在使用旧连接的请求不受影响，后续请求改用新连接
+                if entry.connection is connection:
+                    entry.connection = new_connection
+                    entry.buckets = {}
+
+    def get_connection(self):
+        """获取当前线程可用的连接"""
+        return self._acquire_entry().connection
+
+    def get_bucket(self, bucket_name=None):
+        """获取当前线程连接上缓存的 Bucket 对象"""
+        bucket_name = bucket_name or self.bucket_name
+        entry = self._acquire_entry()
+        with self._lock:
+            bucket = entry.buckets.get(bucket_name)
+            connection = entry.connection
+        if bucket is None:
+            bucket = connection.get_bucket(bucket_name)
+            with self._lock:
+                if entry.connection is connection:
+                    entry.buckets.setdefault(bucket_name, bucket)
+        return bucket
+
+    def size(self):
+        """当前已建立的连接数"""
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,121 @@
+"""按内容去重：相同内容的文件已上传过时，用服务端复制代替重新上传"""
+import time
+
+from ks3.exception import KS3ServerError
+
+from robot_data_uploader import config
+from robot_data_uploader.local_store import SqliteStore, file_identity, open_store
+from robot_data_uploader.remote_digest import read_digest_metadata
+
+DEDUP_ALGORITHM = "sha256"  # 内容索引使用的摘要算法
+
+
+class DedupIndex(SqliteStore):
+    """内容摘要 -> 远程对象 的索引
+
+    每个远程对象（bucket, key）记录一行，同一内容可以对应多个对象；对象被覆盖上传时随之更新，
+    复制时发现源对象已不存在则删除该行。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS objects (
+        bucket TEXT NOT NULL,
+        key TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (bucket, key)
+    );
+    CREATE INDEX IF NOT EXISTS objects_by_digest ON objects (digest, size);
+    """
+
+    def lookup(self, bucket, digest, size, exclude_key=None):
+        """查找内容相同的远程对象，最近上传的在前
+
+        Returns:
+            list: 对象key列表
+        """
+        rows = self.query(
+            "SELECT key FROM objects WHERE digest=? AND size=? AND bucket=? ORDER BY updated_at DESC",
+            (digest, size, bucket)
+        )
+        return [key for key, in rows if key != exclude_key]
+
+    def remember(self, bucket, key, digest, size):
+        """记录（或更新）对象的内容摘要"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO objects (bucket, key, digest, size, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (bucket, key, digest, size, time.time())
+            )
+
+    def forget(self, bucket, key):
+        """删除已不存在的对象"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM objects WHERE bucket=? AND key=?", (bucket, key))
+
+
+def _content_digests(digest_cache, file_path, file_size):
+    """获取用于去重的文件摘要
+
+    摘要缓存中已有时直接使用；没有时只对不超过 config.DEDUP_HASH_MAX_SIZE 的文件读取计算
+    （结果写入缓存，上传后的校验可直接使用），更大的文件不为去重额外读盘。
+
+    Returns:
+        dict or None: 算法名 -> 摘要
+    """
+    cached = digest_cache.lookup(file_identity(file_path), (DEDUP_ALGORITHM, "md5"))
+    if DEDUP_ALGORITHM in cached:
+        return cached
+    if file_size > config.DEDUP_HASH_MAX_SIZE:
+        return None
+    return digest_cache.get_digests(file_path, (DEDUP_ALGORITHM, "md5"))
+
+
+def copy_if_duplicate(bucket, dedup_index, digest_cache, file_path, key, file_size):
+    """远程已有相同内容的对象时，通过服务端复制写入目标key
+
+    复制前通过一次 HEAD 核对源对象元数据中的摘要，源对象已被删除或被其他内容覆盖时从索引中移除并尝试下一个。
+    复制保留源对象的元数据（包括摘要元数据）。其他错误直接抛出，由上层重试逻辑处理。
+
+    Args:
+        bucket: 目标存储桶
+        dedup_index: DedupIndex
+        digest_cache: DigestCache
+        file_path: 本地文件路径
+        key: 目标对象key
+        file_size: 文件大小
+
+    Returns:
+        dict or None: 复制成功时返回文件摘要，没有可复制的对象时返回 None
+    """
+    if file_size > config.COPY_OBJECT_MAX_SIZE:
+        return None
+    digests = _content_digests(digest_cache, file_path, file_size)
+    if not digests:
+        return None
+    for source_key in dedup_index.lookup(bucket.name, digests[DEDUP_ALGORITHM], file_size, exclude_key=key):
+        try:
+            if read_digest_metadata(bucket, source_key).get(DEDUP_ALGORITHM) != digests[DEDUP_ALGORITHM]:
+                dedup_index.forget(bucket.name, source_key)
+                continue
+            bucket.copy_key(key, bucket.name, source_key)
+        except KS3ServerError as e:
+            if e.status == 404:
+                dedup_index.forget(bucket.name, source_key)
+                continue
+            raise
+        dedup_index.remember(bucket.name, key, digests[DEDUP_ALGORITHM], file_size)
+        return digests
+    return None
+
+
+def remember_upload(dedup_index, bucket_name, key, file_size, digests):
+    """上传成功后记录对象内容，供之后的重复文件复制"""
+    if dedup_index is not None and digests and digests.get(DEDUP_ALGORITHM):
+        dedup_index.remember(bucket_name, key, digests[DEDUP_ALGORITHM], file_size)
+
+
+def get_dedup_index(db_path):
+    """获取进程内共享的去重索引实例"""
+    return open_store(DedupIndex, db_path)
@@ -0,0 +1,95 @@
+"""文件选择规则：包含/排除规则、路径前缀和大小限制编译为一个匹配器，扫描目录时整棵剪掉被排除的子目录"""
+import fnmatch
+import re
+
+from robot_data_uploader import config
+
+MATCH_ALL = "*.*"  # 与原有文件过滤器一致，表示上传所有文件
+
+
+def _compile(patterns):
+    """把多个 glob 规则编译成一个不区分大小写的正则，没有规则时返回 None"""
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(pattern)})" for pattern in patterns), re.IGNORECASE)
+
+
+def _normalize_prefix(prefix):
+    prefix = prefix.replace("\\", "/").strip("/")
+    return prefix + "/" if prefix else ""
+
+
+class FileRules:
+    """编译后的文件选择规则
+
+    路径均为相对于数据集根目录、以 / 分隔的路径。
+    - include: 文件名规则，匹配任一即上传；包含 "*.*" 或为空时不按文件名过滤
+    - exclude: 排除规则，以 / 结尾的是目录规则（如 "images/"，扫描时整个目录不再进入），
+      其余为文件规则；规则中含 / 时匹配相对路径，否则匹配名称
+    - prefixes: 只上传这些路径前缀下的文件（如 "data/"、"meta/"），其他目录扫描时剪掉
+    - min_size / max_size: 文件大小范围（字节），在 stat 之后判断
+    """
+
+    def __init__(self, include=None, exclude=(), prefixes=(), min_size=None, max_size=None):
+        include = list(include or ())
+        self.include = include
+        self.exclude = list(exclude or ())
+        self.prefixes = [_normalize_prefix(prefix) for prefix in prefixes or ()]
+        self.min_size = min_size
+        self.max_size = max_size
+
+        self._include = None if not include or MATCH_ALL in include else _compile(include)
+        dir_patterns = [pattern.rstrip("/") for pattern in self.exclude if pattern.endswith("/")]
+        file_patterns = [pattern for pattern in self.exclude if not pattern.endswith("/")]
+        self._exclude_dir_name = _compile([p for p in dir_patterns if "/" not in p])
+        self._exclude_dir_path = _compile([p for p in dir_patterns if "/" in p])
+        self._exclude_file_name = _compile([p for p in file_patterns if "/" not in p])
+        self._exclude_file_path = _compile([p for p in file_patterns if "/" in p])
+        self._prefixes = tuple(prefix for prefix in self.prefixes if prefix)
+
+    @classmethod
+    def from_config(cls, include=None):
+        """按上传器的文件过滤器和 config.FILE_SELECTION_RULES 生成规则"""
+        return cls(include=include, **config.FILE_SELECTION_RULES)
+
+    @property
+    def has_size_limits(self):
+        return self.min_size is not None or self.max_size is not None
+
+    def allows_name(self, filename):
+        """按文件名判断（不知道所在目录时使用，如单文件和文件列表上传）"""
+        if self._include is not None and not self._include.match(filename):
+            return False
+        return not (self._exclude_file_name is not None and self._exclude_file_name.match(filename))
+
+    def allows_dir(self, relative_dir, name=None):
+        """扫描时是否进入该目录
+
+        Args:
+            relative_dir: 目录的相对路径
+            name: 目录名，默认取相对路径的最后一段
+        """
+        name = name or relative_dir.rsplit("/", 1)[-1]
+        if self._exclude_dir_name is not None and self._exclude_dir_name.match(name):
+            return False
+        if self._exclude_dir_path is not None and self._exclude_dir_path.match(relative_dir):
+            return False
+        if self._prefixes:
+            directory = relative_dir + "/"
+            # 目录在某个前缀之下，或者是通往某个前缀的上级目录
+            return any(directory.startswith(prefix) or prefix.startswith(directory) for prefix in self._prefixes)
+        return True
+
+    def allows_path(self, relative_path, name=None):
+        """按文件名和相对路径判断（不需要 stat）"""
+        name = name or relative_path.rsplit("/", 1)[-1]
+        if not self.allows_name(name):
+            return False
+        if self._exclude_file_path is not None and self._exclude_file_path.match(relative_path):
+            return False
+        return not self._prefixes or relative_path.startswith(self._prefixes)
+
+    def allows_size(self, size):
+        if self.min_size is not None and size < self.min_size:
+            return False
+        return self.max_size is None or size <= self.max_size
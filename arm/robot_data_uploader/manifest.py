@@ -0,0 +1,125 @@
+"""数据集目录扫描：生成待上传文件清单，扫描时的 stat 结果随清单传给后续上传流程"""
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from colorama import Fore
+
+from robot_data_uploader import config
+from robot_data_uploader.local_store import file_identity
+
+
+class ManifestEntry(tuple):
+    """清单中的一个文件：(file_path, file_size)，附带扫描时的文件身份标识
+
+    与原有的 (file_path, file_size) 元组兼容，可直接解包；上传时通过 identity 取得文件大小和修改时间，
+    不再对每个文件重复 os.path.exists / isfile / getsize。
+    """
+
+    def __new__(cls, file_path, identity):
+        entry = super().__new__(cls, (file_path, identity[2]))
+        entry.identity = identity
+        return entry
+
+    @property
+    def path(self):
+        return self[0]
+
+    @property
+    def size(self):
+        return self[1]
+
+    @property
+    def mtime_ns(self):
+        return self.identity[3]
+
+
+def entry_identity(item):
+    """清单条目附带的文件身份标识，普通 (file_path, file_size) 元组返回 None"""
+    return getattr(item, "identity", None)
+
+
+def _scan_directory(path, relative_dir, rules, on_skip):
+    """扫描单个目录（不递归）
+
+    Args:
+        path: 目录路径
+        relative_dir: 目录相对于数据集根目录的路径（以 / 结尾，根目录为空字符串）
+        rules: FileRules，为空时不过滤
+        on_skip: 文件被过滤时的回调，参数为文件名
+
+    Returns:
+        tuple: (文件条目列表, 子目录列表 [(路径, 相对路径)])
+    """
+    entries, subdirs = [], []
+    try:
+        iterator = os.scandir(path)
+    except OSError as e:
+        print(f"{Fore.YELLOW}无法读取目录 {path}: {str(e)}")
+        return entries, subdirs
+    with iterator:
+        for entry in iterator:
+            relative_path = relative_dir + entry.name
+            try:
+                # 与 os.walk 一致：不进入符号链接指向的目录，文件的符号链接按目标文件处理
+                if entry.is_dir(follow_symlinks=False):
+                    # 被排除的目录整个剪掉，其中的文件不再列举和 stat
+                    if rules is None or rules.allows_dir(relative_path, entry.name):
+                        subdirs.append((entry.path, relative_path + "/"))
+                    else:
+                        print(f"{Fore.YELLOW}跳过不符合过滤规则的目录: {entry.path}")
+                    continue
+                if not entry.is_file():
+                    continue
+                # 先按名称和路径过滤，被排除的文件不做 stat
+                if rules is not None and not rules.allows_path(relative_path, entry.name):
+                    if on_skip is not None:
+                        on_skip(entry.name)
+                    continue
+                # DirEntry 缓存 stat 结果（Windows 上扫描目录时即已取得，无需额外系统调用）
+                identity = file_identity(stat_result=entry.stat())
+                if rules is not None and not rules.allows_size(identity[2]):
+                    if on_skip is not None:
+                        on_skip(entry.name)
+                    continue
+                entries.append(ManifestEntry(entry.path, identity))
+            except OSError:
+                # 扫描过程中被删除的文件
+                continue
+    return entries, subdirs
+
+
+def build_manifest(directory, rules=None, on_skip=None, workers=None):
+    """用 os.scandir 扫描数据集目录，生成待上传文件清单
+
+    每个目录是一个扫描任务，发现的子目录（如 data/chunk-000、videos/chunk-001）继续提交给线程池，
+    各子目录并行扫描；目录读取和 stat 都会释放GIL，网络文件系统或机械盘上收益明显。
+
+    Args:
+        directory: 数据集根目录
+        rules: 文件选择规则（FileRules），默认全部上传
+        on_skip: 文件被过滤时的回调，参数为文件名
+        workers: 扫描线程数，默认取 config.MANIFEST_SCAN_WORKERS
+
+    Returns:
+        list: ManifestEntry 列表，按路径排序
+    """
+    workers = config.MANIFEST_SCAN_WORKERS if workers is None else workers
+    manifest = []
+    if workers <= 1:
+        pending = [(directory, "")]
+        while pending:
+            entries, subdirs = _scan_directory(*pending.pop(), rules, on_skip)
+            manifest.extend(entries)
+            pending.extend(subdirs)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = {executor.submit(_scan_directory, directory, "", rules, on_skip)}
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    entries, subdirs = future.result()
+                    manifest.extend(entries)
+                    in_flight.update(executor.submit(_scan_directory, path, relative_dir, rules, on_skip)
+                                     for path, relative_dir in subdirs)
+    manifest.sort(key=lambda entry: entry[0])
+    return manifest
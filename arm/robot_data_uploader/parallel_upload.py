@@ -0,0 +1,304 @@
+"""单文件内分片并发上传"""
+import base64
+import hashlib
+import math
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ks3.multipart import PartInfo
+
+from robot_data_uploader import config
+from robot_data_uploader.bandwidth import throttled
+from robot_data_uploader.part_sizing import get_transfer_stats
+
+
+class PartResult:
+    """单个分片的上传结果"""
+
+    def __init__(self, part_number, size, etag=None, crc64=None, elapsed=None):
+        self.part_number = part_number
+        self.size = size
+        self.etag = etag
+        self.crc64 = crc64
+        self.elapsed = elapsed  # 上传请求耗时（秒）
+
+    def __repr__(self):
+        return f"<PartResult {self.part_number} size={self.size}>"
+
+
+def plan_parts(file_size, part_size, skip_parts=()):
+    """计算待上传的分片列表
+
+    Args:
+        file_size: 文件大小（字节）
+        part_size: 分片大小（字节）
+        skip_parts: 已上传完成、需要跳过的分片号集合
+
+    Returns:
+        list: [(part_number, offset, size), ...]，按分片号升序
+    """
+    chunk_count = int(math.ceil(file_size * 1.0 / part_size))
+    parts = []
+    for i in range(chunk_count):
+        part_number = i + 1
+        if part_number in skip_parts:
+            continue
+        offset = i * part_size
+        parts.append((part_number, offset, min(part_size, file_size - offset)))
+    return parts
+
+
+def max_parts_in_flight(part_size, part_concurrency, buffer_limit):
+    """根据并发数和内存上限计算同时在途的分片数（至少为1）
+
+    分片请求体为 mmap 映射的页缓存（config.PART_BODY_MMAP），内存上限限制的是同时映射的文件范围，
+    并不等于实际占用的堆内存；分片大小已由 choose_part_size 控制在 buffer_limit // part_concurrency 以内，
+    通常不会因此降低并发。
+    """
+    by_memory = buffer_limit // part_size if buffer_limit else part_concurrency
+    return max(1, min(part_concurrency, by_memory))
+
+
+def _response_header(ret, name):
+    """兼容不同版本SDK的分片上传返回值，读取响应头"""
+    if ret is None:
+        return None
+    if hasattr(ret, 'getheader'):
+        return ret.getheader(name)
+    metadata = getattr(ret, 'response_metadata', None)
+    if metadata is not None:
+        return metadata.headers.get(name)
+    return None
+
+
+def make_part_info(size, crc64):
+    """构造用于完成上传时CRC校验的分片信息，兼容新旧版本SDK的 PartInfo"""
+    try:
+        part_info = PartInfo()
+    except TypeError:
+        # 旧版本SDK: PartInfo(size, crc)
+        return PartInfo(size, crc64)
+    part_info.size = size
+    part_info.part_crc = crc64
+    return part_info
+
+
+def find_multipart_upload(bucket, key, upload_id=None):
+    """查找 key 对应的未完成分片上传任务
+
+    Args:
+        bucket: Bucket 对象
+        key: 目标对象key
+        upload_id: 指定的上传ID，为空时返回该key下的第一个任务
+
+    Returns:
+        MultiPartUpload or None
+    """
+    for upload in bucket.get_all_multipart_uploads(prefix=key):
+        if upload.key_name == key and (upload_id is None or upload.id == upload_id):
+            return upload
+    return None
+
+
+def sdk_md5(md5_hex):
+    """由已计算的MD5生成SDK上传接口 md5 参数所需的 (十六进制, base64) 元组，避免SDK再读一遍数据"""
+    return md5_hex, base64.b64encode(bytes.fromhex(md5_hex)).decode('utf-8')
+
+
+def read_range(file_path, offset, size):
+    """读取文件中的一段数据"""
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size)
+    if len(data) != size:
+        raise IOError(f"读取文件失败: {file_path} 在偏移 {offset + len(data)} 处提前结束")
+    return data
+
+
+class PartBody:
+    """分片请求体：文件中一段数据的只读文件对象，read 返回 memoryview 切片而不复制数据
+
+    默认通过 mmap 映射该段文件，分片MD5、整文件摘要和发送请求体都直接读取页缓存，
+    不再先读入 bytes、再经 BytesIO 按块复制出来。config.PART_BODY_MMAP 关闭时整段读入内存。
+    """
+
+    def __init__(self, file_path, offset, size, use_mmap=None):
+        self.name = file_path
+        self.size = size
+        self._mmap = None
+        self._position = 0
+        if use_mmap is None:
+            use_mmap = config.PART_BODY_MMAP
+        if use_mmap and size > 0:
+            # mmap 的偏移必须按分配粒度对齐
+            start = offset - offset % mmap.ALLOCATIONGRANULARITY
+            with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < offset + size:
+                    raise IOError(f"读取文件失败: {file_path} 长度不足 {offset + size} 字节")
+                self._mmap = mmap.mmap(f.fileno(), offset + size - start, access=mmap.ACCESS_READ, offset=start)
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+            self.view = memoryview(self._mmap)[offset - start:]
+        else:
+            self.view = memoryview(read_range(file_path, offset, size))
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self._position
+        end = min(self.size, self._position + size)
+        data = self.view[self._position:end]
+        self._position = end
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self._position = max(0, min(self.size, offset))
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        """解除映射；HTTP层仍持有切片时由最后一个切片释放后回收"""
+        self.view.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def upload_part(mp, file_path, part_number, offset, size, digester=None):
+    """上传单个分片
+
+    分片数据只读取一次：同时用于分片MD5、整文件摘要（digester）和上传请求体。
+    请求体经过进程内共享的令牌桶限速。
+
+    Returns:
+        PartResult: 分片上传结果
+    """
+    try:
+        body = PartBody(file_path, offset, size)
+    except Exception:
+        if digester is not None:
+            digester.fail()
+        raise
+    with body:
+        if digester is not None:
+            digester.feed(offset, body.view)
+        md5 = sdk_md5(hashlib.md5(body.view).hexdigest())
+        start = time.monotonic()
+        ret = mp.upload_part_from_file(throttled(body), part_num=part_number, md5=md5)
+        elapsed = time.monotonic() - start
+    get_transfer_stats().record(size, elapsed)
+    return PartResult(
+        part_number,
+        size,
+        etag=_response_header(ret, 'ETag'),
+        crc64=_response_header(ret, 'x-kss-checksum-crc64ecma'),
+        elapsed=elapsed
+    )
+
+
+def upload_parts_concurrently(mp, file_path, parts, part_concurrency, buffer_limit, part_size, on_part_done=None,
+                              digester=None, controller=None):
+    """并发上传分片，在途分片数受并发数和内存上限约束，结果按完成顺序回调
+
+    Args:
+        mp: 分片上传任务对象（MultiPartUpload）
+        file_path: 本地文件路径
+        parts: 待上传分片列表，元素为 (part_number, offset, size)
+        part_concurrency: 最大并发分片数
+        buffer_limit: 在途分片的内存上限（字节）
+        part_size: 分片大小（字节）
+        on_part_done: 分片完成回调，参数为 PartResult，在调用线程中执行
+        digester: 可选的 OrderedDigester，上传时顺带计算整文件摘要
+        controller: 可选的 AimdController，在途分片数不超过其当前并发数（同时受 part_concurrency 约束），
+                    并向其反馈每个分片的耗时和失败
+
+    Returns:
+        list: 本次上传的 PartResult 列表，按分片号升序
+
+    Raises:
+        Exception: 任一分片失败时，等待已在途的分片结束后抛出首个异常
+    """
+    in_flight_limit = max_parts_in_flight(part_size, part_concurrency, buffer_limit)
+    results = []
+
+    def current_limit():
+        if controller is None:
+            return in_flight_limit
+        return max(1, min(in_flight_limit, controller.limit))
+
+    def part_finished(result=None):
+        if controller is None:
+            return
+        if result is None:
+            controller.record_failure()
+        else:
+            controller.record_success(result.size, result.elapsed)
+
+    # 串行模式，保持原有的逐片上传行为
+    if in_flight_limit == 1:
+        for part_number, offset, size in parts:
+            try:
+                result = upload_part(mp, file_path, part_number, offset, size, digester)
+            except Exception:
+                part_finished()
+                raise
+            part_finished(result)
+            results.append(result)
+            if on_part_done:
+                on_part_done(result)
+        return results
+
+    pending_parts = iter(parts)
+    first_error = None
+    with ThreadPoolExecutor(max_workers=in_flight_limit) as executor:
+        in_flight = set()
+
+        def submit_next():
+            part = next(pending_parts, None)
+            if part is None:
+                return False
+            in_flight.add(executor.submit(upload_part, mp, file_path, *part, digester))
+            return True
+
+        while len(in_flight) < current_limit() and submit_next():
+            pass
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            in_flight -= done
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    part_finished()
+                    if first_error is None:
+                        first_error = e
+                    continue
+                part_finished(result)
+                results.append(result)
+                if on_part_done:
+                    on_part_done(result)
+            # 出错后不再提交新的分片，只等待在途分片结束
+            if first_error is None:
+                while len(in_flight) < current_limit() and submit_next():
+                    pass
+
+    if first_error is not None:
+        raise first_error
+    results.sort(key=lambda r: r.part_number)
+    return results
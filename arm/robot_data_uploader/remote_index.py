@@ -0,0 +1,49 @@
+"""远程对象索引：一次分页列举目标目录，供批量上传时判断文件是否已存在"""
+from collections import namedtuple
+
+from robot_data_uploader import config
+
+# 与列举结果中的 Key 对象字段一致，可直接用于 _verify_file_content
+RemoteEntry = namedtuple("RemoteEntry", ["name", "size", "etag", "last_modified"])
+
+
+class RemoteKeyIndex:
+    """远程对象索引（key -> RemoteEntry）
+
+    构建后只读，多个工作线程可直接并发查询，无需加锁。
+    """
+
+    def __init__(self, prefix, entries=None):
+        self.prefix = prefix
+        self._entries = entries or {}
+
+    @classmethod
+    def build(cls, bucket, prefix, page_size=None):
+        """分页列举 prefix 下的全部对象（不按目录分层）构建索引
+
+        Args:
+            bucket: Bucket 对象
+            prefix: 列举前缀，如 "data/<数据集>/"
+            page_size: 每页对象数，默认取 config.REMOTE_INDEX_PAGE_SIZE
+
+        Returns:
+            RemoteKeyIndex
+        """
+        entries = {}
+        for key in bucket.list(prefix=prefix, delimiter='', max_keys=page_size or config.REMOTE_INDEX_PAGE_SIZE):
+            size = getattr(key, 'size', None)
+            if size is None:
+                # 公共前缀（目录）
+                continue
+            entries[key.name] = RemoteEntry(key.name, size, key.etag, getattr(key, 'last_modified', None))
+        return cls(prefix, entries)
+
+    def get(self, key_name):
+        """查询对象，不存在时返回 None"""
+        return self._entries.get(key_name)
+
+    def __contains__(self, key_name):
+        return key_name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,57 @@
+"""按内容去重：相同内容的文件通过服务端复制写入"""
+import os
+
+import pytest
+from conftest import quietly, remote_key
+
+from robot_data_uploader import config
+
+
+@pytest.fixture(autouse=True)
+def dedup_enabled(monkeypatch):
+    monkeypatch.setattr(config, "DEDUP_ENABLED", True)
+
+
+def test_duplicate_file_is_copied(stub, make_uploader, dataset):
+    data = os.urandom(64 * 1024)
+    (dataset / "a.parquet").write_bytes(data)
+    (dataset / "b.parquet").write_bytes(data)
+    uploader = make_uploader()
+
+    assert quietly(uploader.upload_file, str(dataset / "a.parquet"), "robot/first")["success"]
+    assert quietly(uploader.upload_file, str(dataset / "b.parquet"), "robot/second")["success"]
+    assert stub.requests["PutObject"] == 1
+    assert stub.requests["CopyObject"] == 1
+    assert stub.get_object(config.BUCKET_NAME, remote_key("robot/second", "b.parquet")) == data
+
+
+def test_missing_source_falls_back_to_upload(stub, make_uploader, dataset):
+    data = os.urandom(64 * 1024)
+    (dataset / "a.parquet").write_bytes(data)
+    (dataset / "b.parquet").write_bytes(data)
+    uploader = make_uploader()
+    quietly(uploader.upload_file, str(dataset / "a.parquet"), "robot/first")
+
+    # 源对象已被删除：从索引中移除，改为正常上传
+    del stub.objects[(config.BUCKET_NAME, remote_key("robot/first", "a.parquet"))]
+    assert quietly(uploader.upload_file, str(dataset / "b.parquet"), "robot/second")["success"]
+    assert stub.requests["CopyObject"] == 0
+    assert stub.requests["PutObject"] == 2
+    assert stub.get_object(config.BUCKET_NAME, remote_key("robot/second", "b.parquet")) == data
+
+
+def test_multipart_object_is_a_copy_source(stub, make_uploader, dataset, monkeypatch):
+    # 超过预先计算摘要的大小：首次分片上传时摘要缓存未命中，整文件摘要在上传过程中才算出
+    monkeypatch.setattr(config, "DEDUP_HASH_MAX_SIZE", 1024 * 1024)
+    data = os.urandom(6 * 1024 * 1024)
+    video = dataset / "a.mp4"
+    video.write_bytes(data)
+    uploader = make_uploader()
+
+    assert quietly(uploader.upload_file, str(video), "robot/first")["success"]
+    parts = stub.requests["UploadPart"]
+    # 同一文件再上传到另一目标：复制首次上传的分片对象
+    assert quietly(uploader.upload_file, str(video), "robot/second")["success"]
+    assert stub.requests["UploadPart"] == parts
+    assert stub.requests["CopyObject"] >= 1
+    assert stub.get_object(config.BUCKET_NAME, remote_key("robot/second", "a.mp4")) == data
@@ -0,0 +1,529 @@
+"""asyncio 批量上传引擎：数万个小文件的数据集，在少量线程上同时保持数百个 PUT 请求
+
+每个小文件（不超过 SIMPLE_UPLOAD_MAX_SIZE）由一个协程完成：读文件和计算摘要在少量 IO 线程中执行，
+请求签名（KS3 V2 HMAC-SHA1）在事件循环中直接完成，HTTP/1.1 长连接由 AsyncKs3Client 复用。
+大文件仍交给线程池走分片上传（与线程引擎相同）。
+"""
+import asyncio
+import functools
+import mimetypes
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+
+from colorama import Fore
+from ks3.auth import add_auth_header, url_encode
+from ks3.exception import S3ResponseError
+from tqdm import tqdm
+
+from robot_data_uploader import config
+from robot_data_uploader.bandwidth import get_rate_controller
+from robot_data_uploader.compression import compression_codec
+from robot_data_uploader.credentials import Credentials
+from robot_data_uploader.digest_cache import digest_bytes, upload_digest_algorithms
+from robot_data_uploader.local_store import file_identity
+from robot_data_uploader.manifest import entry_identity
+from robot_data_uploader.parallel_upload import sdk_md5
+from robot_data_uploader.part_sizing import get_transfer_stats
+from robot_data_uploader.remote_digest import digest_metadata_headers
+from robot_data_uploader.retry_policy import (AUTH_REFRESH, RETRYABLE, CircuitBreaker, RetryBudget,
+                                              backoff_delay, classify_error)
+from robot_data_uploader.scheduler import FileWorkQueue
+
+SIMPLE_UPLOAD_MAX_SIZE = 5 * 1024 * 1024  # 与 upload_file 中简单上传的大小上限一致
+_SEND_CHUNK = 256 * 1024  # 发送请求体时每次写入的字节数（按此粒度限速）
+
+
+class AsyncResponse:
+    """HTTP 响应"""
+
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self.headers = headers  # 响应头名称均为小写
+        self.body = body
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name.lower(), default)
+
+
+class AsyncKs3Client:
+    """基于 asyncio 流的最小 KS3 客户端（HTTP/1.1 长连接 + V2 签名）
+
+    同时进行的请求数不超过 max_connections，空闲连接留在池中供后续请求复用。
+    非 2xx 响应抛出 S3ResponseError，与 SDK 一致，便于复用重试策略的错误分类。
+    """
+
+    def __init__(self, bucket_name, credentials_getter, endpoint=None, port=None, is_secure=None,
+                 max_connections=None, timeout=None, path_style=None):
+        """
+        Args:
+            bucket_name: 存储桶名称
+            credentials_getter: 无参可调用对象，返回当前 Credentials
+            endpoint: KS3 端点，默认取 config.ENDPOINT
+            port: 端口，默认取 config.KS3_PORT，未配置时按 is_secure 取 443 或 80
+            is_secure: 是否使用 HTTPS，默认取 config.KS3_IS_SECURE
+            max_connections: 最大连接数，默认取 config.ASYNC_MAX_IN_FLIGHT
+            timeout: 单个请求的超时时间（秒），默认取 config.ASYNC_REQUEST_TIMEOUT
+            path_style: 是否以路径方式（/<bucket>/<key>）访问存储桶，默认取 config.KS3_PATH_STYLE
+        """
+        self.bucket_name = bucket_name
+        self._credentials_getter = credentials_getter
+        is_secure = config.KS3_IS_SECURE if is_secure is None else is_secure
+        self.path_style = config.KS3_PATH_STYLE if path_style is None else path_style
+        endpoint = endpoint or config.ENDPOINT
+        # 默认与 SDK 的虚拟主机方式一致：<bucket>.<endpoint>
+        self.host = endpoint if self.path_style else f"{bucket_name}.{endpoint}"
+        self.is_secure = is_secure
+        self.port = port or config.KS3_PORT or (443 if is_secure else 80)
+        self.max_connections = max(1, max_connections or config.ASYNC_MAX_IN_FLIGHT)
+        self.timeout = config.ASYNC_REQUEST_TIMEOUT if timeout is None else timeout
+        self._ssl = ssl.create_default_context() if is_secure else None
+        self._idle = []
+        self._slots = asyncio.Semaphore(self.max_connections)
+
+    async def put_object(self, key, data, headers=None):
+        """上传对象
+
+        Args:
+            key: 对象键
+            data: 对象内容（bytes）
+            headers: 额外的请求头（如 Content-MD5、x-kss-meta-*）
+
+        Returns:
+            AsyncResponse
+        """
+        headers = dict(headers or {})
+        headers.setdefault('Content-Type', mimetypes.guess_type(key)[0] or 'application/octet-stream')
+        headers['Content-Length'] = str(len(data))
+        return await self.request('PUT', key, data, headers)
+
+    async def request(self, method, key, body=b'', headers=None):
+        """发送请求并读取完整响应
+
+        Raises:
+            S3ResponseError: 服务端返回非 2xx
+            ConnectionError: 连接失败或连接被关闭
+            TimeoutError: 请求超时
+        """
+        headers = dict(headers or {})
+        credentials = self._credentials_getter()
+        if credentials.security_token:
+            headers['x-kss-security-token'] = credentials.security_token
+        headers['Date'] = formatdate(time.time(), usegmt=True)
+        add_auth_header(credentials.access_key_id, credentials.access_key_secret, headers, method,
+                        self.bucket_name, key, None)
+        path = ('/%s' % url_encode(key)).replace('//', '/%2F')
+        if self.path_style:
+            path = f"/{self.bucket_name}{path}"
+        host = self.host if self.port in (80, 443) else f"{self.host}:{self.port}"
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", "Accept-Encoding: identity"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        request_head = ("\r\n".join(lines) + "\r\n\r\n").encode('utf-8')
+
+        async with self._slots:
+            for attempt in range(2):
+                # 建立连接也计入超时；连接一旦取得即登记，出错时据此关闭
+                conn = []
+                try:
+                    response, keep_alive = await asyncio.wait_for(
+                        self._roundtrip(conn, request_head, body, method), self.timeout)
+                except asyncio.TimeoutError:
+                    self._discard_conn(conn)
+                    raise TimeoutError(f"请求超时: {method} {key}")
+                except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+                    self._discard_conn(conn)
+                    # 复用的空闲连接可能已被服务端关闭，换新连接重试一次
+                    if conn and conn[0][2] and attempt == 0:
+                        continue
+                    raise ConnectionError(f"请求失败: {method} {key}: {e}") from e
+                except BaseException:
+                    # 其他异常（如响应解析失败、任务取消）后连接状态未知，不放回连接池
+                    self._discard_conn(conn)
+                    raise
+                reader, writer, _ = conn[0]
+                self._release(reader, writer, keep_alive)
+                break
+
+        if response.status >= 300:
+            raise S3ResponseError(response.status, response.reason, response.body)
+        return response
+
+    async def _acquire(self):
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            self._discard(writer)
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self._ssl)
+        return reader, writer, False
+
+    async def _roundtrip(self, conn, request_head, body, method):
+        reader, writer, reused = await self._acquire()
+        conn.append((reader, writer, reused))
+        return await self._exchange(reader, writer, request_head, body, method)
+
+    def _discard_conn(self, conn):
+        if conn:
+            self._discard(conn[0][1])
+
+    def _release(self, reader, writer, keep_alive):
+        if keep_alive and len(self._idle) < self.max_connections:
+            self._idle.append((reader, writer))
+        else:
+            self._discard(writer)
+
+    @staticmethod
+    def _discard(writer):
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+    async def _exchange(self, reader, writer, request_head, body, method):
+        writer.write(request_head)
+        limiter = get_rate_controller().limiter
+        # memoryview 切片不复制请求体
+        body = memoryview(body)
+        for offset in range(0, len(body), _SEND_CHUNK):
+            chunk = body[offset:offset + _SEND_CHUNK]
+            # 与线程上传共用进程内的令牌桶，不阻塞事件循环
+            wait = limiter.reserve(len(chunk))
+            if wait:
+                await asyncio.sleep(wait)
+            writer.write(chunk)
+            await writer.drain()
+        await writer.drain()
+        return await self._read_response(reader, method)
+
+    async def _read_response(self, reader, method):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("连接已被服务端关闭")
+        parts = status_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+        version, status = parts[0], int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ''
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if method == 'HEAD' or status in (204, 304):
+            body = b''
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            body = await self._read_chunked(reader)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            # 没有长度信息时读到连接关闭为止
+            body = await reader.read()
+            keep_alive = False
+        return AsyncResponse(status, reason, headers, body), keep_alive
+
+    @staticmethod
+    async def _read_chunked(reader):
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # 跳过尾部头部直到空行
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    async def close(self):
+        """关闭所有空闲连接"""
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            self._discard(writer)
+
+
+class _ByteBudget:
+    """在途文件数据的内存上限（字节），超过单个上限的文件独占全部额度"""
+
+    def __init__(self, limit):
+        self.limit = max(1, limit)
+        self._used = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self, nbytes):
+        nbytes = min(nbytes, self.limit)
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._used + nbytes <= self.limit)
+            self._used += nbytes
+        return nbytes
+
+    async def release(self, nbytes):
+        async with self._cond:
+            self._used -= nbytes
+            self._cond.notify_all()
+
+
+def _read_with_digests(file_path, identity=None):
+    """读取文件并计算摘要（在 IO 线程中执行）；identity 为扫描清单时记录的文件身份标识"""
+    if identity is None:
+        identity = file_identity(file_path)
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return identity, data, digest_bytes(data, upload_digest_algorithms())
+
+
+def _run_coroutine(coroutine):
+    """在当前线程运行协程；当前线程已有事件循环时改在新线程中运行"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+class AsyncUploadEngine:
+    """asyncio 批量上传引擎
+
+    与线程引擎（BaaiRobotDataUploader._upload_with_threads）接收相同的参数、返回相同结构的结果，
+    由 _execute_upload 按 config.UPLOAD_ENGINE 选择。重试预算、熔断器、凭证刷新、带宽限制和摘要缓存与线程引擎共用同一套实现。
+    """
+
+    def __init__(self, uploader, max_in_flight=None, io_threads=None, buffer_limit=None, outbox_batch=None):
+        """
+        Args:
+            uploader: 发起批量上传的 BaaiRobotDataUploader，提供凭证、连接池和进度上报
+            max_in_flight: 同时进行的上传数，默认取 config.ASYNC_MAX_IN_FLIGHT
+            io_threads: 读文件、计算摘要的线程数，默认取 config.ASYNC_IO_THREADS
+            buffer_limit: 在途文件数据的内存上限（字节），默认取 config.ASYNC_BUFFER_LIMIT
+            outbox_batch: 批量清单（OutboxBatch），逐个文件记录上传状态
+        """
+        self.uploader = uploader
+        self.max_in_flight = max(1, max_in_flight or config.ASYNC_MAX_IN_FLIGHT)
+        self.io_threads = max(1, io_threads or config.ASYNC_IO_THREADS)
+        self.buffer_limit = buffer_limit or config.ASYNC_BUFFER_LIMIT
+        self.outbox_batch = outbox_batch
+
+    def run(self, files_info, target_directory, show_progress=False, base_dir=None, skip_exist=False,
+            verify_method="size", remote_index=None):
+        """执行批量上传
+
+        Args:
+            files_info: 文件信息列表，每个元素为 (file_path, file_size)
+            target_directory: 远程数据集目录路径
+            show_progress: 是否显示进度条
+            base_dir: 基础目录路径（仅用于目录模式）
+            skip_exist: 是否跳过已上传的文件
+            verify_method: 文件内容验证方法
+            remote_index: 目标目录的远程对象索引（RemoteKeyIndex），为空时逐个文件检查
+
+        Returns:
+            tuple: (成功文件列表, 失败文件列表, 跳过文件列表, 文件摘要)
+        """
+        return _run_coroutine(self._run(files_info, target_directory, show_progress, base_dir, skip_exist,
+                                        verify_method, remote_index))
+
+    def concurrency_levels(self):
+        """本次上传的并发数，格式与 get_concurrency_levels 一致"""
+        return {"files": self.max_in_flight, "parts": self.uploader.part_concurrency}
+
+    def _credentials_getter(self):
+        if self.uploader.use_direct_auth:
+            credentials = Credentials(config.ACCESS_KEY, config.SECRET_KEY, None, float('inf'))
+            return lambda: credentials
+        # 凭证即将过期时由取凭证的协程同步刷新一次（约每小时一次）
+        return self.uploader._get_credential_provider().get
+
+    async def _run(self, files_info, target_directory, show_progress, base_dir, skip_exist, verify_method,
+                   remote_index):
+        large_count = sum(1 for _, size in files_info if size > SIMPLE_UPLOAD_MAX_SIZE)
+        self._io = ThreadPoolExecutor(max_workers=self.io_threads)
+        # 大文件走线程中的分片上传，线程数与线程引擎的 max_worker 一致
+        self._large = ThreadPoolExecutor(max_workers=max(1, min(self.uploader.max_worker, large_count)))
+        self._connection_pool = self.uploader._get_connection_pool()
+        self._budget = RetryBudget.for_batch(len(files_info))
+        self._breaker = CircuitBreaker()
+        self._memory = _ByteBudget(self.buffer_limit)
+        self._progress = self.uploader._create_progress_reporter(files_info)
+        self._client = AsyncKs3Client(config.BUCKET_NAME, self._credentials_getter(),
+                                      max_connections=self.max_in_flight)
+        pbar = tqdm(total=sum(size for _, size in files_info), unit='B', unit_scale=True, colour="GREEN",
+                    dynamic_ncols=True, desc="🟢 asyncio") if show_progress else None
+
+        success_files, failure_files, skipped_files = [], [], []
+        file_digests = {}
+        work_queue = FileWorkQueue(files_info, base_dir=base_dir)
+
+        async def worker():
+            # 各协程从同一个队列按优先级通道领取文件，在途数量固定为协程数
+            while True:
+                item = work_queue.get()
+                if item is None:
+                    return
+                file_path, file_size = item
+                if self.outbox_batch:
+                    self.outbox_batch.mark_in_flight(file_path)
+                file_start = time.monotonic()
+                status, digests = await self._upload_one(file_path, file_size, target_directory, base_dir,
+                                                         skip_exist, verify_method, remote_index,
+                                                         entry_identity(item))
+                if status == "success":
+                    success_files.append(file_path)
+                    if digests:
+                        file_digests[file_path] = digests
+                    if self.outbox_batch:
+                        self.outbox_batch.mark_done(file_path, digests)
+                elif status == "skipped":
+                    skipped_files.append(file_path)
+                    if self.outbox_batch:
+                        self.outbox_batch.mark_skipped(file_path)
+                else:
+                    failure_files.append(file_path)
+                    if self.outbox_batch:
+                        self.outbox_batch.mark_failed(file_path)
+                self._progress.file_done(success=status == "success", skipped=status == "skipped",
+                                         elapsed=time.monotonic() - file_start)
+                if pbar is not None:
+                    pbar.update(file_size)
+
+        print(f"{Fore.BLUE}asyncio 引擎: 同时上传 {self.max_in_flight} 个文件，IO 线程 {self.io_threads} 个")
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.max_in_flight, len(files_info)))))
+        finally:
+            await self._client.close()
+            self._progress.close()
+            self._io.shutdown(wait=False)
+            self._large.shutdown(wait=True)
+            if pbar is not None:
+                pbar.close()
+        return success_files, failure_files, skipped_files, file_digests
+
+    async def _upload_one(self, file_path, file_size, target_directory, base_dir, skip_exist, verify_method,
+                          remote_index, identity=None):
+        """上传单个文件
+
+        Returns:
+            tuple: (状态 "success" / "skipped" / "failed", 上传时顺带计算的摘要)
+        """
+        loop = asyncio.get_running_loop()
+        # 大文件和需要压缩的文件在线程池中走 upload_file（分片上传、压缩后上传）
+        if file_size > SIMPLE_UPLOAD_MAX_SIZE or compression_codec(file_path):
+            worker = self.uploader._create_worker_uploader(self._connection_pool, self._budget, self._breaker,
+                                                           progress_reporter=self._progress)
+            result = await loop.run_in_executor(self._large, functools.partial(
+                worker.upload_file, file_path, target_directory, base_dir=base_dir, skip_exist=skip_exist,
+                show_progress=False, verify_method=verify_method, remote_index=remote_index, identity=identity))
+            if result.get("success"):
+                return "success", result.get("digests")
+            return ("skipped" if result.get("skipped") else "failed"), None
+
+        try:
+            key = self.uploader._object_key(file_path, target_directory, base_dir)
+        except ValueError as e:
+            print(f"{Fore.RED}上传失败 {file_path}: {str(e)}")
+            return "failed", None
+
+        if skip_exist and await self._exists_unchanged(file_path, key, verify_method, remote_index):
+            print(f"{Fore.YELLOW}文件已存在且内容一致，跳过上传: {file_path}")
+            return "skipped", None
+
+        max_retries = config.MAX_UPLOAD_RETRIES
+        retry_count = 0
+        auth_refreshed = False
+        while True:
+            await self._wait_for_breaker()
+            try:
+                # 内容相同的文件已上传过时，用服务端复制代替重新上传
+                digests = None
+                if self.uploader.dedup_index is not None:
+                    digests = await loop.run_in_executor(self._io, self.uploader._copy_if_duplicate,
+                                                         file_path, key, file_size)
+                if digests is not None:
+                    self._breaker.record_success()
+                    print(f"{Fore.GREEN}成功上传（服务端复制相同内容）: {file_path} 到 {key}")
+                    return "success", digests
+                digests = await self._put_small_file(file_path, file_size, key, identity)
+                self._breaker.record_success()
+                print(f"{Fore.GREEN}成功上传: {file_path} 到 {key}")
+                return "success", digests
+            except Exception as e:
+                retry_count += 1
+                category = classify_error(e)
+                if self._breaker.record_error(e):
+                    print(f"{Fore.RED}服务端连续不可用，暂停所有上传 {self._breaker.reset_timeout} 秒: {str(e)}")
+
+                # 凭证失效：刷新凭证后立即重试（每个文件只刷新一次，不占用重试预算）
+                if category == AUTH_REFRESH and not auth_refreshed and retry_count < max_retries:
+                    auth_refreshed = True
+                    if await loop.run_in_executor(self._io, self.uploader.refresh_credentials):
+                        print(f"{Fore.YELLOW}上传凭证失效 {file_path}: {str(e)}，已刷新凭证，重新上传...")
+                        continue
+
+                if category != RETRYABLE:
+                    reason = "错误不可重试"
+                elif retry_count >= max_retries:
+                    reason = f"已重试 {retry_count - 1} 次"
+                elif not self._budget.try_spend():
+                    reason = "本批次重试次数已用完"
+                else:
+                    reason = None
+                if reason:
+                    print(f"{Fore.RED}上传失败 {file_path}: {str(e)}，{reason}，放弃上传")
+                    return "failed", None
+
+                # 指数退避加随机抖动，等待期间不占用线程
+                delay = backoff_delay(retry_count - 1, e)
+                print(f"{Fore.YELLOW}上传失败 {file_path}: {str(e)}，{delay:.1f} 秒后进行第 {retry_count} 次重试...")
+                await asyncio.sleep(delay)
+
+    async def _wait_for_breaker(self):
+        """熔断打开时协程在此等待，不占用线程"""
+        while True:
+            wait = self._breaker.try_request()
+            if not wait:
+                return
+            await asyncio.sleep(min(wait, 1.0))
+
+    async def _exists_unchanged(self, file_path, key, verify_method, remote_index):
+        """远程已存在内容一致的同名文件"""
+        loop = asyncio.get_running_loop()
+        try:
+            if remote_index is not None:
+                remote_entry = remote_index.get(key)
+            else:
+                existing = await loop.run_in_executor(self._io, lambda: list(
+                    self._connection_pool.get_bucket().list(prefix=key, delimiter='/', max_keys=1)))
+                remote_entry = existing[0] if existing else None
+            if remote_entry is None:
+                return False
+            if await loop.run_in_executor(self._io, self.uploader._verify_file_content,
+                                          file_path, remote_entry, verify_method):
+                return True
+            print(f"{Fore.BLUE}文件已存在但内容不一致，将覆盖上传: {file_path}")
+        except Exception:
+            # 如果检查失败，继续上传
+            pass
+        return False
+
+    async def _put_small_file(self, file_path, file_size, key, identity=None):
+        """读取文件、计算摘要并上传，摘要写入对象元数据和本地缓存"""
+        loop = asyncio.get_running_loop()
+        reserved = await self._memory.acquire(file_size)
+        try:
+            identity, data, digests = await loop.run_in_executor(self._io, _read_with_digests, file_path, identity)
+            headers = digest_metadata_headers(digests)
+            headers['Content-MD5'] = sdk_md5(digests["md5"])[1]
+            start = time.monotonic()
+            await self._client.put_object(key, data, headers)
+            get_transfer_stats().record(len(data), time.monotonic() - start)
+            self._progress.add_bytes(len(data))
+        finally:
+            await self._memory.release(reserved)
+        await loop.run_in_executor(self._io, self.uploader.digest_cache.store_if_unchanged,
+                                   file_path, identity, digests)
+        if self.uploader.dedup_index is not None:
+            await loop.run_in_executor(self._io, self.uploader._remember_upload, key, file_size, digests)
+        return digests
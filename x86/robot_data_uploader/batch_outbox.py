@@ -0,0 +1,237 @@
+"""批量上传清单与断点记录：进程中途退出后，下次运行从停下的位置继续"""
+import hashlib
+import json
+import os
+import time
+
+from robot_data_uploader.local_store import SqliteStore, file_identity, open_store
+from robot_data_uploader.manifest import entry_identity
+
+# 文件状态
+PENDING = "pending"      # 尚未开始
+IN_FLIGHT = "in_flight"  # 上传中（进程退出时处于该状态的文件下次重新上传，分片由断点续传日志恢复）
+DONE = "done"            # 上传成功
+SKIPPED = "skipped"      # 远程已存在内容一致的文件
+FAILED = "failed"        # 上传失败（下次运行重试）
+
+COMPLETED_STATES = (DONE, SKIPPED)
+
+
+def batch_key(target_directory, base_dir=None, files_info=None):
+    """批量上传任务的标识：目录模式为 (本地目录, 目标目录)，文件列表模式为 (文件列表, 目标目录)"""
+    if base_dir:
+        source = "dir:" + os.path.abspath(base_dir)
+    else:
+        paths = sorted(os.path.abspath(file_path) for file_path, _ in files_info or ())
+        source = "files:" + hashlib.sha1("\n".join(paths).encode("utf-8")).hexdigest()
+    return f"{source}->{target_directory}"
+
+
+class BatchOutbox(SqliteStore):
+    """基于SQLite的批量上传清单
+
+    每个批量任务开始时一次性写入完整文件清单（含文件身份标识），上传过程中逐个文件更新状态。
+    进程重启后按任务标识找回清单，并与本次扫描到的文件合并：新增的文件登记为待上传，修改过的文件重置为待上传，
+    已不存在的文件移除；已完成且未被修改的文件直接计入结果，不再列举远程或重新计算摘要，其余文件继续上传。
+    任务全部成功后删除清单。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS batches (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        batch_key TEXT NOT NULL UNIQUE,
+        target_directory TEXT NOT NULL,
+        source_type TEXT NOT NULL,
+        base_dir TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS batch_files (
+        batch INTEGER NOT NULL,
+        file_path TEXT NOT NULL,
+        dev INTEGER NOT NULL,
+        ino INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        state TEXT NOT NULL,
+        digests TEXT,
+        error TEXT,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (batch, file_path)
+    );
+    """
+
+    def find_batch(self, key):
+        """查找未完成的批量任务
+
+        Returns:
+            dict or None: {"id", "target_directory", "source_type", "base_dir"}
+        """
+        rows = self.query(
+            "SELECT id, target_directory, source_type, base_dir FROM batches WHERE batch_key=?", (key,)
+        )
+        if not rows:
+            return None
+        batch, target_directory, source_type, base_dir = rows[0]
+        return {"id": batch, "target_directory": target_directory, "source_type": source_type, "base_dir": base_dir}
+
+    @staticmethod
+    def _identity(item):
+        file_path, file_size = item
+        # 扫描清单已带有 stat 结果时直接使用
+        identity = entry_identity(item)
+        if identity is None:
+            try:
+                identity = file_identity(file_path)
+            except OSError:
+                identity = (0, 0, file_size, 0)
+        return tuple(identity)
+
+    def create_batch(self, key, target_directory, source_type, base_dir, files_info):
+        """登记新的批量任务及其文件清单，覆盖同一标识的旧任务
+
+        Returns:
+            int: 任务ID
+        """
+        now = time.time()
+        rows = []
+        for item in files_info:
+            rows.append((item[0],) + self._identity(item) + (PENDING, now))
+        with self.transaction() as conn:
+            self._delete(conn, key)
+            cursor = conn.execute(
+                "INSERT INTO batches (batch_key, target_directory, source_type, base_dir, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, target_directory, source_type, base_dir, now, now)
+            )
+            batch = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO batch_files (batch, file_path, dev, ino, size, mtime_ns, state, updated_at) "
+                "VALUES (%d, ?, ?, ?, ?, ?, ?, ?)" % batch,
+                rows
+            )
+        return batch
+
+    def sync_files(self, batch, files_info):
+        """按本次扫描到的文件更新任务清单
+
+        新增的文件登记为待上传；身份标识（大小、修改时间等）变化的文件重置为待上传；
+        清单中已不存在的文件移除，被删除的文件不会让任务一直处于有失败文件的状态。
+
+        Returns:
+            tuple: (新增文件数, 重置文件数, 移除文件数)
+        """
+        stored = {file_path: identity for file_path, identity, _, _ in self.load_files(batch)}
+        now = time.time()
+        inserts, resets, current = [], [], set()
+        for item in files_info:
+            file_path = item[0]
+            current.add(file_path)
+            identity = self._identity(item)
+            previous = stored.get(file_path)
+            if previous is None:
+                inserts.append((file_path,) + identity + (PENDING, now))
+            elif tuple(previous) != identity:
+                resets.append(identity + (PENDING, now, batch, file_path))
+        removed = [(batch, file_path) for file_path in stored if file_path not in current]
+        if inserts or resets or removed:
+            with self.transaction() as conn:
+                conn.executemany(
+                    "INSERT INTO batch_files (batch, file_path, dev, ino, size, mtime_ns, state, updated_at) "
+                    "VALUES (%d, ?, ?, ?, ?, ?, ?, ?)" % batch,
+                    inserts
+                )
+                conn.executemany(
+                    "UPDATE batch_files SET dev=?, ino=?, size=?, mtime_ns=?, state=?, digests=NULL, error=NULL, "
+                    "updated_at=? WHERE batch=? AND file_path=?",
+                    resets
+                )
+                conn.executemany("DELETE FROM batch_files WHERE batch=? AND file_path=?", removed)
+                conn.execute("UPDATE batches SET updated_at=? WHERE id=?", (now, batch))
+        return len(inserts), len(resets), len(removed)
+
+    def load_files(self, batch):
+        """读取任务的文件清单
+
+        Returns:
+            list: [(file_path, identity, state, digests)]，按登记顺序
+        """
+        return [
+            (file_path, (dev, ino, size, mtime_ns), state, json.loads(digests) if digests else None)
+            for file_path, dev, ino, size, mtime_ns, state, digests in self.query(
+                "SELECT file_path, dev, ino, size, mtime_ns, state, digests FROM batch_files "
+                "WHERE batch=? ORDER BY rowid", (batch,)
+            )
+        ]
+
+    def mark(self, batch, file_path, state, digests=None, error=None):
+        """更新单个文件的状态"""
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE batch_files SET state=?, digests=?, error=?, updated_at=? WHERE batch=? AND file_path=?",
+                (state, json.dumps(digests) if digests else None, error, now, batch, file_path)
+            )
+            conn.execute("UPDATE batches SET updated_at=? WHERE id=?", (now, batch))
+
+    def finish_batch(self, key):
+        """任务全部成功后删除清单"""
+        with self.transaction() as conn:
+            self._delete(conn, key)
+
+    @staticmethod
+    def _delete(conn, key):
+        conn.execute("DELETE FROM batch_files WHERE batch IN (SELECT id FROM batches WHERE batch_key=?)", (key,))
+        conn.execute("DELETE FROM batches WHERE batch_key=?", (key,))
+
+
+class OutboxBatch:
+    """一次批量上传在清单中的记录，供各上传线程更新文件状态"""
+
+    def __init__(self, outbox, key, batch, resumed=False):
+        self.outbox = outbox
+        self.key = key
+        self.batch = batch
+        self.resumed = resumed
+
+    @classmethod
+    def open(cls, outbox, key, target_directory, source_type, base_dir, files_info, resume=True):
+        """找回同一标识的未完成任务并与本次扫描到的文件合并，没有时登记新任务"""
+        existing = outbox.find_batch(key) if resume else None
+        if existing is not None:
+            outbox.sync_files(existing["id"], files_info)
+            return cls(outbox, key, existing["id"], resumed=True)
+        return cls(outbox, key, outbox.create_batch(key, target_directory, source_type, base_dir, files_info))
+
+    def completed(self):
+        """上次运行已完成、且之后未被修改的文件
+
+        打开任务时已按本次扫描结果把修改过的文件重置为待上传、移除已不存在的文件，这里不再 stat。
+
+        Returns:
+            dict: file_path -> (状态, 摘要)
+        """
+        return {file_path: (state, digests)
+                for file_path, _, state, digests in self.outbox.load_files(self.batch)
+                if state in COMPLETED_STATES}
+
+    def mark_in_flight(self, file_path):
+        self.outbox.mark(self.batch, file_path, IN_FLIGHT)
+
+    def mark_done(self, file_path, digests=None):
+        self.outbox.mark(self.batch, file_path, DONE, digests=digests)
+
+    def mark_skipped(self, file_path):
+        self.outbox.mark(self.batch, file_path, SKIPPED)
+
+    def mark_failed(self, file_path, error=None):
+        self.outbox.mark(self.batch, file_path, FAILED, error=error)
+
+    def finish(self):
+        """全部文件完成后删除清单"""
+        self.outbox.finish_batch(self.key)
+
+
+def get_batch_outbox(db_path):
+    """获取进程内共享的批量上传清单实例"""
+    return open_store(BatchOutbox, db_path)
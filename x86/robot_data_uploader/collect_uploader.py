@@ -1,18 +1,39 @@
+import io
 import os
-import json
 import time
 import requests
 import threading
 import argparse
 import sys
-import math
-import hashlib
-from filechunkio import FileChunkIO
 from concurrent.futures import ThreadPoolExecutor
 from ks3.connection import Connection
-from ks3.multipart import PartInfo
 # TODO:打包放开
 from robot_data_uploader import config
+from robot_data_uploader.parallel_upload import upload_parts_concurrently, sdk_md5
+from robot_data_uploader.bandwidth import throttled
+from robot_data_uploader.part_sizing import choose_part_size, get_transfer_stats
+from robot_data_uploader.scheduler import FileWorkQueue
+from robot_data_uploader import batch_outbox
+from robot_data_uploader.batch_outbox import OutboxBatch, get_batch_outbox
+from robot_data_uploader.dedup import copy_if_duplicate, get_dedup_index, remember_upload
+from robot_data_uploader.compression import (ENCODING_FIELD, ORIGINAL_SIZE_FIELD, compress_file,
+                                              compression_codec)
+from robot_data_uploader.progress_reporter import ProgressReporter, latest_only_queue
+from robot_data_uploader.concurrency import AimdController
+from robot_data_uploader.connection_pool import Ks3ConnectionPool, ks3_connection_options
+from robot_data_uploader.credentials import StsConnection, StsCredentialProvider
+from robot_data_uploader.digest_cache import (get_digest_cache, digest_bytes, upload_digest_algorithms,
+                                              parse_multipart_etag)
+from robot_data_uploader.local_store import file_identity
+from robot_data_uploader.file_rules import MATCH_ALL, FileRules
+from robot_data_uploader.manifest import build_manifest, entry_identity
+from robot_data_uploader.resume_journal import JournaledUpload, get_resume_journal
+from robot_data_uploader.remote_index import RemoteKeyIndex
+from robot_data_uploader.async_engine import AsyncUploadEngine
+from robot_data_uploader.retry_policy import (AUTH_REFRESH, RETRYABLE, CircuitBreaker, RetryBudget,
+                                              backoff_delay, classify_error)
+from robot_data_uploader.remote_digest import (digest_metadata_headers, read_digest_metadata,
+                                               stream_remote_digests, write_digest_metadata)
 # NOTE:开发调试
 # import config
 from tqdm import tqdm
@@ -170,18 +191,51 @@ class BaaiRobotDataUploader:
         # 上传工具相关参数
         self.sts_token = None
         self.connection = None
+        self.connection_pool = None
         self.resume_dir = ".upload_resume"
         self.file_filters = ["*.*"]  # "*.txt", "*.csv", "*.json", "*.dat" , "*.tar", "*.png" # 默认文件过滤器
+        # 文件过滤器与 config.FILE_SELECTION_RULES 编译成的匹配器，扫描目录时剪掉被排除的子目录
+        self.file_rules = FileRules.from_config(self.file_filters)
         self.use_direct_auth = use_direct_auth
         self.max_worker = 4
+        self.part_concurrency = config.PART_CONCURRENCY  # 单文件内并发上传的分片数
+        self.part_buffer_limit = config.PART_BUFFER_LIMIT  # 单文件在途分片内存上限
+        self.file_concurrency_controller = None  # 批量上传时文件级自适应并发控制器
+        self.part_concurrency_controller = None  # 分片级自适应并发控制器
+        self.retry_budget = None  # 批量上传各线程共享的重试预算
+        self.circuit_breaker = None  # 批量上传各线程共享的熔断器
+        self.credential_provider = None  # STS凭证提供者，批量上传时各线程共享
+        self.progress_reporter = None  # 上传进度上报器，批量上传时各线程共享
+        self.progress_listeners = []  # 本地进度监听函数，参数为进度快照
         
         # 创建断点续传目录
         if not os.path.exists(self.resume_dir):
             os.makedirs(self.resume_dir)
+        # 文件摘要缓存，进程内各上传器实例共享
+        self.digest_cache = get_digest_cache(os.path.join(self.resume_dir, config.DIGEST_CACHE_FILE))
+        # 分片上传断点续传日志，同一主机上的多个上传进程可共享
+        self.resume_journal = get_resume_journal(os.path.join(self.resume_dir, config.RESUME_JOURNAL_FILE))
+        # 批量上传清单，进程中途退出后从停下的位置继续
+        self.batch_outbox = get_batch_outbox(os.path.join(self.resume_dir, config.BATCH_OUTBOX_FILE))
+        # 内容去重索引（可选），相同内容的文件通过服务端复制上传
+        self.dedup_index = (get_dedup_index(os.path.join(self.resume_dir, config.DEDUP_INDEX_FILE))
+                            if config.DEDUP_ENABLED else None)
             
     
     def set_sts_token(self, sts_token):
         self.sts_token = sts_token
+        if self.credential_provider is not None and sts_token:
+            self.credential_provider.update(sts_token)
+    
+    def set_credential_provider(self, credential_provider):
+        """设置共享的STS凭证提供者（批量上传时各工作线程共享，凭证刷新后所有连接即时生效）"""
+        self.credential_provider = credential_provider
+    
+    def _get_credential_provider(self):
+        """获取（必要时创建）STS凭证提供者，凭证即将过期时通过 STS_PATH 自动刷新"""
+        if self.credential_provider is None:
+            self.credential_provider = StsCredentialProvider(self._request_sts_token, sts_token=self.sts_token)
+        return self.credential_provider
     
     def set_eai_token(self, eai_token):
         self.eai_token = eai_token
@@ -189,36 +243,93 @@ class BaaiRobotDataUploader:
     def set_max_worker(self, max_worker):
         self.max_worker = max_worker
         
+    def set_part_concurrency(self, part_concurrency, buffer_limit=None):
+        """设置单文件内并发上传的分片数及在途分片内存上限"""
+        self.part_concurrency = max(1, part_concurrency)
+        if buffer_limit is not None:
+            self.part_buffer_limit = buffer_limit
+        
+    def set_concurrency_controllers(self, file_controller=None, part_controller=None):
+        """设置自适应并发控制器（批量上传时各工作线程共享）"""
+        self.file_concurrency_controller = file_controller
+        self.part_concurrency_controller = part_controller
+        
+    def set_retry_policy(self, retry_budget=None, circuit_breaker=None):
+        """设置重试预算和熔断器（批量上传时各工作线程共享）"""
+        self.retry_budget = retry_budget
+        self.circuit_breaker = circuit_breaker
+        
+    def set_progress_reporter(self, progress_reporter):
+        """设置进度上报器（批量上传时各工作线程共享）"""
+        self.progress_reporter = progress_reporter
+    
+    def add_progress_listener(self, listener):
+        """添加本地进度监听函数，批量上传期间按 config.PROGRESS_REPORT_INTERVAL 收到进度快照（在上报线程中调用）"""
+        self.progress_listeners.append(listener)
+    
+    def subscribe_progress(self, maxsize=1):
+        """订阅批量上传进度队列，只保留最新的 maxsize 条快照，上传结束时最后一条快照的 finished 为 True"""
+        progress_queue, listener = latest_only_queue(maxsize)
+        self.add_progress_listener(listener)
+        return progress_queue
+
+    def get_concurrency_levels(self):
+        """当前的文件级、分片级并发数
+        
+        Returns:
+            dict: {"files": 文件级并发数, "parts": 单文件分片并发数}
+        """
+        return {
+            "files": self.file_concurrency_controller.limit if self.file_concurrency_controller else self.max_worker,
+            "parts": self.part_concurrency_controller.limit if self.part_concurrency_controller else self.part_concurrency
+        }
+        
         
     def set_file_filters(self, filters):
         """设置文件过滤器"""
         self.file_filters = filters
+        self.file_rules = FileRules.from_config(filters)
+    
+    def set_file_rules(self, file_rules):
+        """设置文件选择规则（FileRules），可包含排除目录、路径前缀和大小限制"""
+        self.file_rules = file_rules
+        self.file_filters = file_rules.include or [MATCH_ALL]
     
     def _is_file_allowed(self, filename):
         """检查文件是否符合过滤规则"""
-        import fnmatch
-        # 如果过滤器包含"*.*"，表示允许所有文件
-        if "*.*" in self.file_filters:
-            return True
-        # 否则检查是否匹配任一过滤规则
-        return any(fnmatch.fnmatch(filename.lower(), pattern.lower()) 
-                  for pattern in self.file_filters)
+        return self.file_rules.allows_name(filename)
     
     def _get_file_md5(self, file_path):
-        """计算文件MD5"""
-        hash_md5 = hashlib.md5()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+        """计算文件MD5（优先读取摘要缓存）"""
+        return self.digest_cache.get_digests(file_path, ("md5",))["md5"]
     
     def _get_file_sha256(self, file_path):
-        """计算文件SHA256"""
-        hash_sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_sha256.update(chunk)
-        return hash_sha256.hexdigest()
+        """计算文件SHA256（优先读取摘要缓存）"""
+        return self.digest_cache.get_digests(file_path, ("sha256",))["sha256"]
+    
+    def _get_remote_digests(self, remote_key, algorithms):
+        """获取远程对象的摘要
+        
+        优先读取上传时写入对象元数据的摘要（一次HEAD请求），缺失的算法再流式下载计算，
+        内存占用与对象大小无关。
+        
+        Args:
+            remote_key: 远程文件对象
+            algorithms: 需要的摘要算法列表
+            
+        Returns:
+            dict: 算法名 -> 摘要
+        """
+        bucket = self._get_bucket()
+        try:
+            metadata = read_digest_metadata(bucket, remote_key.name)
+        except Exception:
+            metadata = {}
+        digests = {algorithm: metadata[algorithm] for algorithm in algorithms if algorithm in metadata}
+        missing = [algorithm for algorithm in algorithms if algorithm not in digests]
+        if missing:
+            digests.update(stream_remote_digests(bucket, remote_key.name, remote_key.size, missing))
+        return digests
     
     def _verify_file_content(self, local_file_path, remote_key, verify_method="md5"):
         """验证本地文件和远程文件内容是否一致
@@ -232,6 +343,12 @@ class BaaiRobotDataUploader:
             bool: 内容是否一致
         """
         try:
+            # 压缩上传的对象大小和ETag对应压缩后的数据，改为比对元数据中记录的原始大小和摘要
+            if compression_codec(local_file_path):
+                verified = self._verify_compressed_object(local_file_path, remote_key, verify_method)
+                if verified is not None:
+                    return verified
+            
             # 获取本地文件信息
             local_size = os.path.getsize(local_file_path)
             
@@ -253,11 +370,20 @@ class BaaiRobotDataUploader:
             
             if verify_method == "md5":
                 # MD5验证
-                local_md5 = self._get_file_md5(local_file_path)
                 if not remote_etag:
                     print(f"{Fore.YELLOW}远程文件缺少ETag，无法进行MD5验证")
                     return False
                 
+                # 分片上传的对象ETag为 md5(各分片MD5)-分片数，在本地按同样的分片大小计算后比对
+                if parse_multipart_etag(remote_etag) is not None:
+                    local_etag = self.digest_cache.get_multipart_etag(local_file_path, remote_etag)
+                    if local_etag != remote_etag:
+                        print(f"{Fore.BLUE}文件分片ETag不一致: 本地={local_etag}, 远程={remote_etag}")
+                        return False
+                    print(f"{Fore.GREEN}文件分片ETag验证通过: {local_etag}")
+                    return True
+                
+                local_md5 = self._get_file_md5(local_file_path)
                 if local_md5 != remote_etag:
                     print(f"{Fore.BLUE}文件MD5不一致: 本地={local_md5}, 远程={remote_etag}")
                     return False
@@ -266,13 +392,11 @@ class BaaiRobotDataUploader:
                 return True
                 
             elif verify_method == "sha256":
-                # SHA256验证（需要从远程文件下载计算）
+                # SHA256验证（优先读取对象元数据中的摘要，没有时流式下载计算，不整体载入内存）
                 local_sha256 = self._get_file_sha256(local_file_path)
                 
-                # 从远程文件计算SHA256
                 try:
-                    remote_content = remote_key.get_contents_as_string()
-                    remote_sha256 = hashlib.sha256(remote_content).hexdigest()
+                    remote_sha256 = self._get_remote_digests(remote_key, ("sha256",))["sha256"]
                     
                     if local_sha256 != remote_sha256:
                         print(f"{Fore.BLUE}文件SHA256不一致: 本地={local_sha256}, 远程={remote_sha256}")
@@ -285,20 +409,25 @@ class BaaiRobotDataUploader:
                     return False
                     
             elif verify_method == "strict":
-                # 严格验证：同时验证MD5和SHA256
-                local_md5 = self._get_file_md5(local_file_path)
-                local_sha256 = self._get_file_sha256(local_file_path)
-                
-                # 验证MD5
-                if not remote_etag or local_md5 != remote_etag:
-                    print(f"{Fore.BLUE}文件MD5验证失败: 本地={local_md5}, 远程={remote_etag}")
-                    return False
+                # 严格验证：同时验证MD5和SHA256（单次读取同时计算两种摘要）
+                local_digests = self.digest_cache.get_digests(local_file_path, ("md5", "sha256"))
+                local_md5 = local_digests["md5"]
+                local_sha256 = local_digests["sha256"]
                 
-                # 验证SHA256
                 try:
-                    remote_content = remote_key.get_contents_as_string()
-                    remote_sha256 = hashlib.sha256(remote_content).hexdigest()
+                    # 验证MD5（分片上传的对象比对本地计算的分片ETag）
+                    if parse_multipart_etag(remote_etag) is not None:
+                        local_etag = self.digest_cache.get_multipart_etag(local_file_path, remote_etag)
+                        if local_etag != remote_etag:
+                            print(f"{Fore.BLUE}文件分片ETag验证失败: 本地={local_etag}, 远程={remote_etag}")
+                            return False
+                    elif not remote_etag or local_md5 != remote_etag:
+                        print(f"{Fore.BLUE}文件MD5验证失败: 本地={local_md5}, 远程={remote_etag}")
+                        return False
+                    
+                    remote_sha256 = self._get_remote_digests(remote_key, ("sha256",))["sha256"]
                     
+                    # 验证SHA256
                     if local_sha256 != remote_sha256:
                         print(f"{Fore.BLUE}文件SHA256验证失败: 本地={local_sha256}, 远程={remote_sha256}")
                         return False
@@ -318,59 +447,87 @@ class BaaiRobotDataUploader:
             # 验证失败时，为了安全起见，不跳过上传
             return False
     
-    def _get_resume_info(self, file_path):
-        """获取断点续传信息"""
-        resume_file = os.path.join(
-            self.resume_dir, 
-            f"{self._get_file_md5(file_path)}.json"
-        )
-        if os.path.exists(resume_file):
-            with open(resume_file, 'r') as f:
-                return json.load(f)
-        return None
+    def _verify_compressed_object(self, local_file_path, remote_key, verify_method="md5"):
+        """验证压缩上传的对象与本地文件是否一致（一次HEAD请求读取元数据）
+        
+        Returns:
+            bool or None: 内容是否一致；远程对象不是压缩上传的时返回 None，按普通对象验证
+        """
+        metadata = read_digest_metadata(self._get_bucket(), remote_key.name)
+        if ENCODING_FIELD not in metadata:
+            return None
+        local_size = os.path.getsize(local_file_path)
+        remote_size = metadata.get(ORIGINAL_SIZE_FIELD)
+        if str(local_size) != remote_size:
+            print(f"{Fore.BLUE}文件大小不一致: 本地={local_size}, 远程(压缩前)={remote_size}")
+            return False
+        if verify_method == "size":
+            print(f"{Fore.GREEN}文件大小验证通过: {local_size}")
+            return True
+        algorithms = {"md5": ("md5",), "sha256": ("sha256",), "strict": ("md5", "sha256")}.get(verify_method)
+        if algorithms is None:
+            print(f"{Fore.YELLOW}不支持的验证方法: {verify_method}")
+            return False
+        local_digests = self.digest_cache.get_digests(local_file_path, algorithms)
+        for algorithm in algorithms:
+            if local_digests[algorithm] != metadata.get(algorithm):
+                print(f"{Fore.BLUE}文件{algorithm.upper()}不一致: 本地={local_digests[algorithm]}, "
+                      f"远程={metadata.get(algorithm)}")
+                return False
+        print(f"{Fore.GREEN}压缩对象验证通过: {', '.join(algorithms)}")
+        return True
     
-    def _save_resume_info(self, file_path, info):
-        """保存断点续传信息"""
-        resume_file = os.path.join(
-            self.resume_dir,
-            f"{self._get_file_md5(file_path)}.json"
-        )
-        with open(resume_file, 'w') as f:
-            json.dump(info, f)
-    
-    def _delete_resume_info(self, file_path):
-        """删除断点续传信息"""
-        resume_file = os.path.join(
-            self.resume_dir,
-            f"{self._get_file_md5(file_path)}.json"
+    def _open_journaled_upload(self, bucket, file_path, key, headers=None):
+        """恢复或新建分片上传任务，断点续传信息记录在本地日志中
+        
+        新任务的分片大小按文件大小和实测网络状况选择，记录在日志中，续传时沿用原分片大小
+        """
+        part_size = choose_part_size(os.path.getsize(file_path), get_transfer_stats(),
+                                     part_concurrency=self.part_concurrency, buffer_limit=self.part_buffer_limit)
+        return JournaledUpload(self.resume_journal, bucket, file_path, key, part_size, headers=headers).open()
+    
+    def set_connection_pool(self, connection_pool):
+        """设置共享的KS3连接池（批量上传时由各工作线程共享）"""
+        self.connection_pool = connection_pool
+    
+    def _create_connection(self):
+        """根据认证方式创建新的KS3连接"""
+        if self.use_direct_auth:
+            return Connection(
+                access_key_id=config.ACCESS_KEY,
+                access_key_secret=config.SECRET_KEY,
+                **ks3_connection_options()
+            )
+        # STS凭证由凭证提供者统一管理，过期前自动刷新
+        return StsConnection(
+            self._get_credential_provider(),
+            **ks3_connection_options()
         )
-        if os.path.exists(resume_file):
-            os.remove(resume_file)
+    
+    def _get_connection_pool(self):
+        """获取（必要时创建）批量上传共享的连接池"""
+        if self.connection_pool is None:
+            self.connection_pool = Ks3ConnectionPool(self._create_connection)
+        return self.connection_pool
+    
+    def _get_bucket(self):
+        """获取目标存储桶对象，优先使用连接池中缓存的 Bucket"""
+        if self.connection_pool is not None:
+            return self.connection_pool.get_bucket(config.BUCKET_NAME)
+        return self.get_connection().get_bucket(config.BUCKET_NAME)
     
     def get_connection(self):
         """获取连接对象，根据配置使用STS或直接认证"""
+        if self.connection_pool is not None:
+            return self.connection_pool.get_connection()
         if self.connection:
             return self.connection
         try:
             if self.use_direct_auth:
                 print(f"{Fore.BLUE}使用直接认证方式...")
-                self.connection = Connection(
-                    access_key_id=config.ACCESS_KEY,
-                    access_key_secret=config.SECRET_KEY,
-                    host=config.ENDPOINT
-                )
             else:
                 print(f"{Fore.BLUE}使用STS临时凭证认证方式...")
-                # response = requests.get(f"{config.SERVER_URL}/get_sts_token", verify=False)
-                # self.sts_token = response.json()
-                
-                self.connection = Connection(
-                    access_key_id=self.sts_token['accessKeyId'],
-                    access_key_secret=self.sts_token['secretAccessKey'],
-                    security_token=self.sts_token['securityToken'],
-                    host=config.ENDPOINT
-                )
-                
+            self.connection = self._create_connection()
             return self.connection
         except Exception as e:
             print(f"{Fore.RED}获取连接失败: {str(e)}")
@@ -380,24 +537,46 @@ class BaaiRobotDataUploader:
                 print(f"{Fore.RED}STS服务可能不可用，请尝试使用直接认证方式")
             sys.exit(1)
             
-    def get_ks3_sts(self):
-        """获取金山云ks3的sts信息
-        Args:
-            token: 具身数据平台token
+    def refresh_credentials(self):
+        """上传凭证失效（如服务端返回403）时立即刷新STS凭证，所有连接的后续请求使用新凭证
+        
+        多个线程同时遇到凭证失效时，config.AUTH_REFRESH_MIN_INTERVAL 秒内只刷新一次。
+        
         Returns:
-            _type_: 成功/失败
+            bool: 凭证是否已刷新（直接认证方式无法刷新，返回 False）
+        """
+        if self.use_direct_auth:
+            return False
+        return self._get_credential_provider().refresh()
+    
+    def _request_sts_token(self):
+        """通过 STS_PATH 请求新的STS凭证
+        
+        Returns:
+            dict or None: 接口返回的凭证（accessKeyId、secretAccessKey、securityToken 等），失败时返回 None
         """
         try:
-            # 获取STS服务上传凭证
             headers = {"Authorization": f"Bearer {self.eai_token}"}
             response = requests.get(f"{config.SERVER_URL}{config.STS_PATH}", headers=headers)
             if "code" in response.json() and response.json()["code"]==200:
-                self.sts_token = response.json()["data"]
-                return True
+                return response.json()["data"]
         except Exception as e:
             print(f"{Fore.RED}获取sts凭证失败: {str(e)}")
-        return False
-
+        return None
+    
+    def get_ks3_sts(self):
+        """获取金山云ks3的sts信息
+        Args:
+            token: 具身数据平台token
+        Returns:
+            _type_: 成功/失败
+        """
+        # 获取STS服务上传凭证
+        sts_token = self._request_sts_token()
+        if not sts_token:
+            return False
+        self.set_sts_token(sts_token)
+        return True
             
                     
     def get_eai_token(self, ak, sk):
@@ -452,7 +631,8 @@ class BaaiRobotDataUploader:
         try:
             headers = {"Authorization": self.eai_token}
             # 获取具身真机平台token
-            response = requests.post(f"{config.SERVER_URL}{config.START_UPLOAD_PATH}", headers=headers, json=data)
+            response = requests.post(f"{config.SERVER_URL}{config.START_UPLOAD_PATH}", headers=headers, json=data,
+                                     timeout=config.PLATFORM_REQUEST_TIMEOUT)
             if response.status_code == 200:
                 if "code" in response.json() and response.json()["code"]==200:
                     self.eai_upload_task_id = response.json()["data"]["uploadTaskId"]
@@ -473,7 +653,8 @@ class BaaiRobotDataUploader:
         try:
             headers = {"Authorization": self.eai_token}
             # 获取具身真机平台token
-            response = requests.post(f"{config.SERVER_URL}{config.UPDATE_UPLOAD_PATH}", headers=headers, json=data)
+            response = requests.post(f"{config.SERVER_URL}{config.UPDATE_UPLOAD_PATH}", headers=headers, json=data,
+                                     timeout=config.PLATFORM_REQUEST_TIMEOUT)
             if response.status_code == 200:
                 if "code" in response.json() and response.json()["code"]==200:
                     # self.eai_upload_task_id = response.json()["data"]["uploadTaskId"]
@@ -494,7 +675,8 @@ class BaaiRobotDataUploader:
         try:
             headers = {"Authorization": self.eai_token}
             # 获取具身真机平台token
-            response = requests.post(f"{config.SERVER_URL}{config.COMPLETE_UPLOAD_PATH}", headers=headers, json={"upload_task_id":self.eai_upload_task_id, "status": status})
+            response = requests.post(f"{config.SERVER_URL}{config.COMPLETE_UPLOAD_PATH}", headers=headers, json={"upload_task_id":self.eai_upload_task_id, "status": status},
+                                     timeout=config.PLATFORM_REQUEST_TIMEOUT)
             if response.status_code == 200:
                 if "code" in response.json() and response.json()["code"]==200:
                     # self.eai_upload_task_id = response.json()["data"]["uploadTaskId"]
@@ -505,7 +687,40 @@ class BaaiRobotDataUploader:
             print(f"{Fore.YELLOW}完成数据集上传通知异常: {str(e)}") 
             
     
-    def upload_file(self, file_path, target_directory, base_dir=None, skip_exist=False, show_progress=False, verify_method="size"):
+    def _object_key(self, file_path, target_directory, base_dir=None):
+        """计算文件在存储桶中的目标键
+        
+        Args:
+            file_path: 本地文件路径
+            target_directory: 远程数据集目录
+            base_dir: 基础目录路径，提供时保留文件相对该目录的路径，否则只使用文件名
+            
+        Returns:
+            str: 目标键
+            
+        Raises:
+            ValueError: 文件不在基础目录下
+        """
+        # 计算相对路径
+        if base_dir:
+            # 将 base_dir 和 file_path 都转换为绝对路径
+            abs_base = os.path.abspath(base_dir)   # 本地数据文件所在目录的绝对路径
+            abs_file = os.path.abspath(file_path)  # 本地数据文件的绝对路径
+            
+            # 确保 file_path 在 base_dir 下
+            if not abs_file.startswith(abs_base):
+                error_msg = f"文件路径 {file_path} 不在基础目录 {base_dir} 下"
+                raise ValueError(error_msg)
+            
+            # 计算相对路径，将Windows路径分隔符转换为正斜杠
+            rel_path = os.path.relpath(abs_file, abs_base).replace('\\', '/').lstrip('/')
+            # 构建目标键,避免操作系统路径问题
+            return f"{config.UPLOAD_TARGET}/{target_directory}/{rel_path}"
+        # 如果没有指定 base_dir，则直接使用文件名
+        return f"{config.UPLOAD_TARGET}/{target_directory}/{os.path.basename(file_path)}"
+    
+    def upload_file(self, file_path, target_directory, base_dir=None, skip_exist=False, show_progress=False, verify_method="size",
+                    remote_index=None, identity=None):
         """上传文件
         Args:
             file_path: 本地文件路径
@@ -514,6 +729,8 @@ class BaaiRobotDataUploader:
             skip_exist: 是否跳过目录存在检查
             show_progress: 是否展示进度(批量上传时默认为false)
             verify_method: 文件内容验证方法 ("size", "md5", "sha256", "strict")
+            remote_index: 目标目录的远程对象索引（RemoteKeyIndex），提供时直接查询索引，不再逐个文件列举
+            identity: 扫描清单时记录的文件身份标识 (dev, ino, size, mtime_ns)，提供时不再 stat 文件
             
         Returns:
             dict: 包含上传结果的字典
@@ -527,12 +744,12 @@ class BaaiRobotDataUploader:
             print(f"{Fore.RED}错误：{error_msg}")
             return {"success": False, "skipped": False, "message": error_msg, "file_path": file_path}
             
-        if not os.path.exists(file_path):
+        if identity is None and not os.path.exists(file_path):
             error_msg = f"文件不存在 - {file_path}"
             print(f"{Fore.RED}错误：{error_msg}")
             return {"success": False, "skipped": False, "message": error_msg, "file_path": file_path}
             
-        if not os.path.isfile(file_path):
+        if identity is None and not os.path.isfile(file_path):
             error_msg = f"路径不是文件 - {file_path}"
             print(f"{Fore.RED}错误：{error_msg}")
             return {"success": False, "skipped": False, "message": error_msg, "file_path": file_path}
@@ -543,40 +760,29 @@ class BaaiRobotDataUploader:
             return {"success": False, "skipped": True, "message": skip_msg, "file_path": file_path}
             
             
-        # 最大重试次数
-        max_retries = 5
+        # 最大尝试次数
+        max_retries = config.MAX_UPLOAD_RETRIES
         retry_count = 0
+        auth_refreshed = False
         
         while retry_count < max_retries:
+            # 熔断打开时在此等待，服务恢复前不再发起请求
+            if self.circuit_breaker:
+                self.circuit_breaker.before_request()
             try:
-                connection = self.get_connection()
-                
-                # 计算相对路径
-                if base_dir:
-                    # 将 base_dir 和 file_path 都转换为绝对路径
-                    abs_base = os.path.abspath(base_dir)   # 本地数据文件所在目录的绝对路径
-                    abs_file = os.path.abspath(file_path)  # 本地数据文件的绝对路径
-                    
-                    # 确保 file_path 在 base_dir 下
-                    if not abs_file.startswith(abs_base):
-                        error_msg = f"文件路径 {file_path} 不在基础目录 {base_dir} 下"
-                        raise ValueError(error_msg)
-                    
-                    # 计算相对路径，将Windows路径分隔符转换为正斜杠
-                    rel_path = os.path.relpath(abs_file, abs_base).replace('\\', '/').lstrip('/')
-                    # 构建目标键,避免操作系统路径问题
-                    key = f"{config.UPLOAD_TARGET}/{target_directory}/{rel_path}"
-                else:
-                    # 如果没有指定 base_dir，则直接使用文件名
-                    key = f"{config.UPLOAD_TARGET}/{target_directory}/{os.path.basename(file_path)}"
+                key = self._object_key(file_path, target_directory, base_dir)
 
                 # 是否跳过已存在的文件
                 if skip_exist:
                     # 跳过则检查是否存在当前上传文件
-                    bucket = connection.get_bucket(config.BUCKET_NAME)
                     # 检查具体的文件是否存在
                     try:
-                        existing = list(bucket.list(prefix=key, delimiter='/', max_keys=1))
+                        if remote_index is not None:
+                            remote_entry = remote_index.get(key)
+                            existing = [remote_entry] if remote_entry else []
+                        else:
+                            bucket = self._get_bucket()
+                            existing = list(bucket.list(prefix=key, delimiter='/', max_keys=1))
                         if existing:
                             # 文件存在，需要验证内容是否一致
                             if self._verify_file_content(file_path, existing[0], verify_method):
@@ -589,34 +795,82 @@ class BaaiRobotDataUploader:
                         # 如果检查失败，继续上传
                         pass
                 
-                file_size = os.path.getsize(file_path)
+                file_size = identity[2] if identity else os.path.getsize(file_path)
                 
-                # 大小文件的上传逻辑
-                if file_size > 5 * 1024 * 1024:  # 5MB
-                    self._multipart_upload_ks3_sdk(file_path, key, show_progress)
-                    # self._multipart_upload(file_path, key, show_progress)
+                # 内容相同的文件已上传过时，用服务端复制代替重新上传
+                digests = self._copy_if_duplicate(file_path, key, file_size)
+                if digests is not None:
+                    success_msg = f"成功上传（服务端复制相同内容）: {file_path} 到 {key}"
                 else:
-                    self._simple_upload(file_path, key, show_progress)
-                    
-                success_msg = f"成功上传: {file_path} 到 {key}"
+                    # 匹配压缩规则的文件压缩后上传，压缩效果不明显时返回 None，按原文件上传
+                    codec = compression_codec(file_path)
+                    if codec:
+                        digests = self._compressed_upload(file_path, key, codec, show_progress)
+                    if digests is None:
+                        # 大小文件的上传逻辑
+                        if file_size > 5 * 1024 * 1024:  # 5MB
+                            digests = self._multipart_upload_ks3_sdk(file_path, key, show_progress)
+                            # self._multipart_upload(file_path, key, show_progress)
+                        else:
+                            digests = self._simple_upload(file_path, key, show_progress, identity=identity)
+                    self._remember_upload(key, file_size, digests)
+                    success_msg = f"成功上传: {file_path} 到 {key}"
                 print(f"{Fore.GREEN}{success_msg}")      
-                # 上传成功，跳出循环
-                return {"success": True, "skipped": False, "message": success_msg, "file_path": file_path}
+                if self.circuit_breaker:
+                    self.circuit_breaker.record_success()
+                # 上传成功，跳出循环（digests 为上传时顺带计算的文件摘要）
+                return {"success": True, "skipped": False, "message": success_msg, "file_path": file_path,
+                        "digests": digests}
 
             except Exception as e:
                 retry_count += 1
-                if retry_count < max_retries:
-                    print(f"{Fore.YELLOW}上传失败 {file_path}: {str(e)}，正在进行第 {retry_count} 次重试...")
+                category = classify_error(e)
+                if self.circuit_breaker and self.circuit_breaker.record_error(e):
+                    print(f"{Fore.RED}服务端连续不可用，暂停所有上传 {self.circuit_breaker.reset_timeout} 秒: {str(e)}")
+                
+                # 凭证失效：刷新凭证后立即重试（每个文件只刷新一次，不占用重试预算）
+                if category == AUTH_REFRESH and not auth_refreshed and retry_count < max_retries:
+                    auth_refreshed = True
+                    if self.refresh_credentials():
+                        print(f"{Fore.YELLOW}上传凭证失效 {file_path}: {str(e)}，已刷新凭证，重新上传...")
+                        continue
+                
+                if category == RETRYABLE:
+                    # 超时、连接错误、限流等反馈给自适应并发控制器
+                    if self.file_concurrency_controller:
+                        self.file_concurrency_controller.record_failure()
+                    if retry_count >= max_retries:
+                        reason = f"已重试 {retry_count - 1} 次"
+                    elif self.retry_budget is not None and not self.retry_budget.try_spend():
+                        reason = "本批次重试次数已用完"
+                    else:
+                        reason = None
                 else:
-                    error_msg = f"上传失败 {file_path}: {str(e)}，已重试 {retry_count} 次，放弃上传"
+                    reason = "错误不可重试"
+                if reason:
+                    error_msg = f"上传失败 {file_path}: {str(e)}，{reason}，放弃上传"
                     print(f"{Fore.RED}{error_msg}")
                     return {"success": False, "skipped": False, "message": error_msg, "file_path": file_path}
                 
-                import time
-                # 重试前等待一段时间
-                time.sleep(2)
+                # 指数退避加随机抖动，避免各线程同时重试
+                delay = backoff_delay(retry_count - 1, e)
+                print(f"{Fore.YELLOW}上传失败 {file_path}: {str(e)}，{delay:.1f} 秒后进行第 {retry_count} 次重试...")
+                time.sleep(delay)
 
 
+    def _copy_if_duplicate(self, file_path, key, file_size):
+        """开启去重时，远程已有相同内容的对象则通过服务端复制写入 key
+        
+        Returns:
+            dict or None: 复制成功时返回文件摘要，未开启去重或没有可复制的对象时返回 None
+        """
+        if self.dedup_index is None:
+            return None
+        return copy_if_duplicate(self._get_bucket(), self.dedup_index, self.digest_cache, file_path, key, file_size)
+    
+    def _remember_upload(self, key, file_size, digests):
+        """上传成功后记录对象内容，之后相同内容的文件可直接复制"""
+        remember_upload(self.dedup_index, config.BUCKET_NAME, key, file_size, digests)
     
     def _handle_duplicate_dataset(self, sub_dir):
         """处理重复的数据集名称
@@ -640,7 +894,7 @@ class BaaiRobotDataUploader:
                     print(f"{Fore.RED}错误: 必须至少含有1个路径分隔符'/',如:a/b")
                     continue
                 # 递归检查新名称是否也存在
-                bucket = self.get_connection().get_bucket(config.BUCKET_NAME)
+                bucket = self._get_bucket()
                 prefix = f"{config.UPLOAD_TARGET}/{new_name}"
                 existing = list(bucket.list(prefix=prefix, delimiter='/', max_keys=1))
                 
@@ -654,9 +908,11 @@ class BaaiRobotDataUploader:
             else:
                 print(f"{Fore.RED}无效选择，请重新输入")
     
-    def _simple_upload(self, file_path, key, show_progress=False):
-        """简单上传"""
-        file_size = os.path.getsize(file_path)
+    def _simple_upload(self, file_path, key, show_progress=False, identity=None):
+        """简单上传（identity 为扫描清单时记录的文件身份标识，提供时不再 stat 文件）"""
+        if identity is None:
+            identity = file_identity(file_path)
+        file_size = identity[2]
         
         if show_progress:
             pbar = tqdm(total=file_size,
@@ -667,92 +923,118 @@ class BaaiRobotDataUploader:
                         unit_scale=True, 
                         desc=os.path.basename(file_path))
         
+        # 文件只读取一次：同时用于上传和计算摘要，摘要写入缓存供后续校验使用
         with open(file_path, 'rb') as f:
-            bucket = self.get_connection().get_bucket(config.BUCKET_NAME)
-            k = bucket.new_key(key)
-            
-            
-            k.set_contents_from_file(f)
-            if show_progress:
-                pbar.update(file_size)
+            data = f.read()
+        digests = digest_bytes(data, upload_digest_algorithms())
+        
+        bucket = self._get_bucket()
+        k = bucket.new_key(key)
+        
+        # 摘要写入对象元数据，校验时只需一次HEAD请求
+        upload_start = time.monotonic()
+        k.set_contents_from_file(throttled(io.BytesIO(data)), headers=digest_metadata_headers(digests), md5=sdk_md5(digests["md5"]))
+        get_transfer_stats().record(len(data), time.monotonic() - upload_start)
+        if self.progress_reporter:
+            self.progress_reporter.add_bytes(len(data))
+        self.digest_cache.store_if_unchanged(file_path, identity, digests)
+        if show_progress:
+            pbar.update(file_size)
         
         if show_progress:
             pbar.close()
+        return digests
     
-    def _multipart_upload(self, file_path, key, show_progress=False):
-        """分片上传"""        
-        chunk_size = 5 * 1024 * 1024  # 5MB分片
-        file_size = os.path.getsize(file_path)
-        
-        bucket = self.connection.get_bucket(config.BUCKET_NAME)
-        
-        # 检查是否有未完成的上传
-        resume_info = self._get_resume_info(file_path)
-        if resume_info and resume_info['key'] == key:
-            # 恢复未完成的上传
-            mp = bucket.get_all_multipart_uploads(prefix=key)[0]
-            upload_id = resume_info['upload_id']
-            completed_parts = resume_info['completed_parts']
-            
-            # todo 恢复mp的part_crc_infos状态(mp对象上传时会在本地内存维护part_info，用于完成上传时校验整个文件的crc。part_info不完整会导致本地计算crc出错。)
-            for part in completed_parts:
-                # from ks3.multipart import PartInfo
-                mp.part_crc_infos[part['PartNumber']] = PartInfo(part['PartSize'], part['Crc64ecma'])
+    def _compressed_upload(self, file_path, key, codec, show_progress=False):
+        """压缩后上传
+        
+        流式压缩，压缩结果不超过内存缓存上限时简单上传，否则转存为临时文件后分片上传。
+        对象元数据记录压缩算法、原始大小和原文件摘要，校验时与本地文件比对。
+        
+        Args:
+            file_path: 本地文件路径
+            key: 目标存储键
+            codec: 压缩算法
+            show_progress: 是否显示进度条
             
-            start_part = len(completed_parts) + 1
+        Returns:
+            dict or None: 原文件摘要；压缩后没有明显变小时不上传，返回 None
+        """
+        identity = file_identity(file_path)
+        with compress_file(file_path, codec, spool_dir=self.resume_dir) as compressed:
+            if not compressed.worthwhile():
+                return None
+            digests = compressed.digests
+            headers = compressed.headers()
+            headers.update(digest_metadata_headers(digests))
+            if compressed.in_memory:
+                data = compressed.getvalue()
+                k = self._get_bucket().new_key(key)
+                upload_start = time.monotonic()
+                k.set_contents_from_file(throttled(io.BytesIO(data)), headers=headers, md5=sdk_md5(compressed.md5))
+                get_transfer_stats().record(compressed.size, time.monotonic() - upload_start)
+                if self.progress_reporter:
+                    self.progress_reporter.add_bytes(compressed.original_size)
+            else:
+                try:
+                    self._multipart_upload_ks3_sdk(compressed.path, key, show_progress,
+                                                   extra_headers=headers, content_digests=digests)
+                except Exception:
+                    # 临时文件随即删除，日志记录不再可用；压缩结果是确定的，重试时服务端已上传的分片按ETag核对后沿用
+                    self.resume_journal.discard(file_identity(compressed.path), key)
+                    raise
+                # 分片进度按压缩后的字节数上报，完成后补齐到原文件大小
+                if self.progress_reporter:
+                    self.progress_reporter.add_bytes(compressed.original_size - compressed.size)
+        print(f"{Fore.GREEN}压缩上传({codec}): {file_path} {compressed.original_size} -> {compressed.size} 字节")
+        self.digest_cache.store_if_unchanged(file_path, identity, digests)
+        return digests
+    
+    def _multipart_upload(self, file_path, key, show_progress=False):
+        """分片上传（逐片串行）"""
+        bucket = self._get_bucket()
+        
+        # 检查是否有未完成的上传，断点续传信息记录在本地日志中
+        upload = self._open_journaled_upload(bucket, file_path, key)
+        # 上传时顺带计算整文件摘要，之后校验无需再次读盘
+        digester = upload.new_digester(upload_digest_algorithms())
+        if upload.resumed:
             # if show_progress:
-            print(f"{Fore.GREEN}发现{key}的断点续传信息，从第 {start_part} 部分继续上传")
-        else:
-            # 初始化新的分片上传
-            mp = bucket.initiate_multipart_upload(key)
-            upload_id = mp.id
-            completed_parts = []
-            start_part = 1
-            
-        # 计算分片数量
-        chunk_count = int(math.ceil(file_size * 1.0 / chunk_size))
+            print(f"{Fore.GREEN}发现{key}的断点续传信息，已完成 {len(upload.uploaded_parts)} 个分片，继续上传")
         
         if show_progress:
-            pbar = tqdm(total=file_size, 
+            pbar = tqdm(total=upload.file_size, 
                         bar_format = "{l_bar}{bar:40}| {percentage:.0f}% [{elapsed}<{remaining}, {rate_fmt}{postfix}]",
                         colour = "GREEN" , # 使用标准绿色而非十六进制颜色码 
                         dynamic_ncols = True , # 自动适应终端宽度
                         unit='B', 
                         unit_scale=True, 
                         desc=os.path.basename(file_path))
-            completed_bytes = (start_part - 1) * chunk_size
-            pbar.update(completed_bytes)
+            pbar.update(upload.completed_bytes)
+        
+        def on_part_done(part_result):
+            if show_progress:
+                pbar.update(part_result.size)
+            # 每完成一个分片追加一条断点续传记录
+            upload.record(part_result)
         
         try:
-            for i in range(start_part - 1, chunk_count):
-                offset = chunk_size * i
-                bytes_to_read = min(chunk_size, file_size - offset)
-                
-                with FileChunkIO(file_path, 'r', offset=offset, bytes=bytes_to_read) as fp:
-                    # 上传分片                   
-                    part_num = i + 1
-                    ret = mp.upload_part_from_file(fp, part_num=part_num)
-                    
-                    if show_progress:
-                        pbar.update(bytes_to_read)
-                    
-                    completed_parts.append({
-                        'PartNumber': part_num,
-                        # todo 额外保存块大小、块crc64信息
-                        'PartSize': bytes_to_read,
-                        'ETag': ret.response_metadata.headers['ETag'],  # todo 改为了保存ETag信息
-                        'Crc64ecma': ret.response_metadata.headers['x-kss-checksum-crc64ecma']
-                    })
-                    
-                    # 保存断点续传信息
-                    self._save_resume_info(file_path, {
-                        'key': key,
-                        'upload_id': upload_id,
-                        'completed_parts': completed_parts
-                    })
-            
-            mp.complete_upload()
-            self._delete_resume_info(file_path)
+            upload_parts_concurrently(
+                upload.mp,
+                file_path,
+                upload.pending_parts(),
+                part_concurrency=1,
+                buffer_limit=None,
+                part_size=upload.part_size,
+                on_part_done=on_part_done,
+                digester=digester
+            )
+            upload.complete()
+            digests = digester.hexdigests()
+            # 同时记录本次分片大小对应的对象ETag，供之后MD5校验直接比对
+            self.digest_cache.store_if_unchanged(file_path, upload.identity,
+                                                 dict(digests or {}, **upload.multipart_digests()))
+            return digests
          
         except Exception as e:
             print(f"{Fore.RED}上传失败 {file_path}: {str(e)}")
@@ -761,63 +1043,92 @@ class BaaiRobotDataUploader:
             if show_progress:
                 pbar.close()
     
-    def _multipart_upload_ks3_sdk(self, file_path, key, show_progress=False):
+    def _multipart_upload_ks3_sdk(self, file_path, key, show_progress=False, extra_headers=None, content_digests=None):
         """
-        使用 key.upload_file 方法进行大文件分片上传，通过回调函数展示进度
+        大文件分片并发上传，通过本地断点续传日志支持断点续传
         
         Args:
             file_path: 本地文件路径
             key: 目标存储键
             show_progress: 是否显示进度条
+            extra_headers: 附加的对象请求头（如压缩编码元数据），补写元数据时一并保留
+            content_digests: 写入对象元数据的内容摘要（如压缩上传时原文件的摘要），默认取上传数据本身的摘要
         """
-        file_size = os.path.getsize(file_path)
+        bucket = self._get_bucket()
+        object_headers = {'x-kss-storage-class': 'STANDARD'}  # 标准存储
+        object_headers.update(extra_headers or {})
+        headers = dict(object_headers)
+        # 摘要缓存中已有整文件摘要时，初始化分片上传时直接写入对象元数据
+        cached_digests = content_digests or self.digest_cache.lookup(file_identity(file_path),
+                                                                     config.DIGEST_METADATA_ALGORITHMS)
+        meta_headers = digest_metadata_headers(cached_digests)
+        headers.update(meta_headers)
+        upload = self._open_journaled_upload(bucket, file_path, key, headers=headers)
+        # 续传的任务初始化时未必带有元数据，完成后需补写
+        metadata_written = (not upload.resumed
+                            and len(meta_headers) == len(config.DIGEST_METADATA_ALGORITHMS))
+        # 上传时顺带计算整文件摘要，之后校验无需再次读盘
+        digester = upload.new_digester(upload_digest_algorithms())
         
         # 准备进度条
+        pbar = None
         if show_progress:
-            pbar = tqdm(total=file_size,
+            pbar = tqdm(total=upload.file_size,
+                        initial=upload.completed_bytes,
                         bar_format="{l_bar}{bar:40}| {percentage:.0f}% [{elapsed}<{remaining}, {rate_fmt}{postfix}]",
                         colour="GREEN",
                         dynamic_ncols=True,
                         unit='B',
                         unit_scale=True,
                         desc=os.path.basename(file_path))
+        if self.progress_reporter:
+            self.progress_reporter.add_bytes(upload.completed_bytes)
 
-            try:
-                bucket = self.connection.get_bucket(config.BUCKET_NAME)
-                k = bucket.new_key(key)
-                
-                k.upload_file(
-                    filename=file_path,
-                    part_size=5 * 1024 * 1024,  # 5MB 分片
-                    threads_num=5,              # 5线程并发
-                    resumable=True,             # 开启断点续传
-                    resumable_filename=os.path.join(self.resume_dir, f"{self._get_file_md5(file_path)}.ks3resume"),
-                    headers={'x-kss-storage-class': 'STANDARD'} # 标准存储
-                )
-                
-            except Exception as e:
+        def on_part_done(part_result):
+            if pbar:
+                pbar.update(part_result.size)
+            if self.progress_reporter:
+                self.progress_reporter.add_bytes(part_result.size)
+            upload.record(part_result)
+
+        try:
+            # 自适应时分片并发数由控制器在其上限内动态调整
+            controller = self.part_concurrency_controller
+            upload_parts_concurrently(
+                upload.mp,
+                file_path,
+                upload.pending_parts(),
+                part_concurrency=controller.maximum if controller else self.part_concurrency,
+                buffer_limit=self.part_buffer_limit,
+                part_size=upload.part_size,
+                on_part_done=on_part_done,
+                digester=digester,
+                controller=controller
+            )
+            upload.complete()
+            digests = digester.hexdigests()
+            if content_digests is None:
+                # 同时记录本次分片大小对应的对象ETag，供之后MD5校验直接比对
+                self.digest_cache.store_if_unchanged(file_path, upload.identity,
+                                                     dict(digests or {}, **upload.multipart_digests()))
+            # 开启去重时也要补写：去重复制前按源对象元数据中的摘要核对内容
+            backfill = config.DIGEST_METADATA_BACKFILL or self.dedup_index is not None
+            if backfill and not metadata_written and (content_digests or digests):
+                # 整文件摘要在上传过程中才算出，通过原地复制补写到对象元数据（多一次整对象复制）
+                try:
+                    write_digest_metadata(bucket, key, upload.file_size, content_digests or digests,
+                                          headers=object_headers)
+                except Exception as e:
+                    print(f"{Fore.YELLOW}写入摘要元数据失败 {key}: {str(e)}")
+            return digests
+        except Exception as e:
+            if show_progress:
                 print(f"{Fore.RED}上传失败 {file_path}: {str(e)}")
-                raise e
-            finally:
+            raise e
+        finally:
+            if pbar:
                 pbar.close()
-                
-        else:
-            # 不显示进度条的上传
-            try:
-                bucket = self.connection.get_bucket(config.BUCKET_NAME)
-                k = bucket.new_key(key)
-                
-                k.upload_file(
-                    filename=file_path,
-                    part_size=5 * 1024 * 1024,
-                    threads_num=5,
-                    resumable=True,
-                    resumable_filename=os.path.join(self.resume_dir, f"{self._get_file_md5(file_path)}.ks3resume"),
-                    headers={'x-kss-storage-class': 'STANDARD'}
-                )
-            except Exception as e:
-                raise e
-    
+
     def batch_upload(self, directory=None, target_directory=None, file_list=None, skip_exist=False, show_progress=False, verify_method="size") -> UploadResult:
         """批量上传目录下的文件或指定文件列表
         
@@ -997,18 +1308,12 @@ class BaaiRobotDataUploader:
         #         return UploadResult.cancelled("用户取消上传")
         #     target_directory = new_sub_dir
             
-        # 收集符合条件的文件及其大小
-        files_info = []
-        total_size = 0
-        for root, _, filenames in os.walk(directory):
-            for filename in filenames:
-                if self._is_file_allowed(filename):
-                    file_path = os.path.join(root, filename)
-                    size = os.path.getsize(file_path)
-                    files_info.append((file_path, size))
-                    total_size += size
-                else:
-                    print(f"{Fore.YELLOW}跳过不符合过滤规则的文件: {filename}")
+        # 收集符合条件的文件及其大小；上次未完成的同一批量任务也重新扫描，新采集的文件并入清单
+        # os.scandir 并行扫描各子目录，扫描时的 stat 结果随清单传给上传线程，不再逐个文件重复 stat
+        files_info = build_manifest(
+            directory, self.file_rules,
+            on_skip=lambda filename: print(f"{Fore.YELLOW}跳过不符合过滤规则的文件: {filename}"))
+        total_size = sum(size for _, size in files_info)
         
         if not files_info:
             warning_msg = f"在目录 {directory} 中没有找到符合过滤规则的文件"
@@ -1020,6 +1325,39 @@ class BaaiRobotDataUploader:
         # 执行上传
         return self._execute_upload(files_info, target_directory, show_progress, source_type="directory", base_dir=directory, skip_exist=skip_exist, verify_method=verify_method)
     
+    def _build_remote_index(self, target_directory):
+        """分页列举一次目标目录，建立远程对象索引
+        
+        Returns:
+            RemoteKeyIndex or None: 列举失败时返回 None（退回逐个文件检查）
+        """
+        prefix = f"{config.UPLOAD_TARGET}/{target_directory}/"
+        try:
+            remote_index = RemoteKeyIndex.build(self._get_connection_pool().get_bucket(), prefix)
+            print(f"{Fore.BLUE}远程目录 {prefix} 已有 {len(remote_index)} 个文件")
+            return remote_index
+        except Exception as e:
+            # 列举失败时退回逐个文件检查
+            print(f"{Fore.YELLOW}列举远程目录失败，将逐个检查文件是否存在: {str(e)}")
+            return None
+    
+    def _create_worker_uploader(self, connection_pool, retry_budget=None, circuit_breaker=None,
+                                file_controller=None, part_controller=None, progress_reporter=None):
+        """创建批量上传工作线程使用的上传器实例，与当前实例共享连接池、凭证、分片并发设置、重试策略和进度上报器"""
+        worker = BaaiRobotDataUploader(use_direct_auth=self.use_direct_auth)
+        worker.set_sts_token(self.sts_token)
+        # 所有线程共享同一个连接池，复用连接和 Bucket 对象
+        worker.set_connection_pool(connection_pool)
+        # 沿用调用方设置的分片并发数和在途分片内存上限
+        worker.set_part_concurrency(self.part_concurrency, self.part_buffer_limit)
+        worker.set_concurrency_controllers(file_controller, part_controller)
+        worker.set_retry_policy(retry_budget, circuit_breaker)
+        worker.set_progress_reporter(progress_reporter)
+        if not self.use_direct_auth:
+            # 所有线程共享同一个凭证提供者，凭证过期前统一刷新
+            worker.set_credential_provider(self._get_credential_provider())
+        return worker
+    
     def _execute_upload(self, files_info, target_directory, show_progress=False, source_type="directory", base_dir=None, skip_exist=False, verify_method="size") -> UploadResult:
         """执行批量上传的核心逻辑
         
@@ -1034,34 +1372,100 @@ class BaaiRobotDataUploader:
         Returns:
             UploadResult: 上传结果
         """
-        # 按文件大小排序，便于均匀分配
-        files_info.sort(key=lambda x: x[1], reverse=True)
+        # 批量清单逐个文件记录状态，进程中途退出后下次运行从停下的位置继续
+        outbox_batch = self._open_outbox_batch(target_directory, source_type, base_dir, files_info)
+        completed = outbox_batch.completed() if outbox_batch.resumed else {}
+        pending_info = [item for item in files_info if item[0] not in completed]
+        if outbox_batch.resumed:
+            print(f"{Fore.BLUE}继续上次未完成的批量上传: 已完成 {len(completed)} 个文件，剩余 {len(pending_info)} 个文件")
+        
+        # 跳过已存在文件时，预先分页列举一次目标目录建立索引，各线程直接查询；
+        # 断点继续且剩余文件不足一页时逐个检查，不再列举整个目录
+        remote_index = None
+        if skip_exist and pending_info and (not outbox_batch.resumed
+                                            or len(pending_info) > config.REMOTE_INDEX_PAGE_SIZE):
+            remote_index = self._build_remote_index(target_directory)
         
-        # 将文件分配给不同线程，尽量保证每个线程处理的数据量接近
-        max_workers = min(self.max_worker, len(files_info)) 
-        thread_files = [[] for _ in range(max_workers)]   
-        thread_sizes = [0] * max_workers
+        if not pending_info:
+            success_files, failure_files, skipped_files, file_digests = [], [], [], {}
+            concurrency = self.get_concurrency_levels()
+        elif config.UPLOAD_ENGINE == "asyncio":
+            # 大量小文件时使用 asyncio 引擎，少量线程上保持数百个并发请求
+            engine = AsyncUploadEngine(self, outbox_batch=outbox_batch)
+            success_files, failure_files, skipped_files, file_digests = engine.run(
+                pending_info, target_directory, show_progress, base_dir, skip_exist, verify_method, remote_index)
+            concurrency = engine.concurrency_levels()
+        else:
+            success_files, failure_files, skipped_files, file_digests = self._upload_with_threads(
+                pending_info, target_directory, show_progress, source_type, base_dir, skip_exist, verify_method,
+                remote_index, outbox_batch)
+            concurrency = self.get_concurrency_levels()
         
-        # 使用贪心算法分配文件
-        for file_path, size in files_info:
-            # 找到当前总大小最小的线程
-            min_size_thread = min(range(max_workers), key=lambda i: thread_sizes[i])
-            thread_files[min_size_thread].append(file_path)
-            thread_sizes[min_size_thread] += size
+        # 上次运行已完成的文件直接计入结果
+        for file_path, (state, digests) in completed.items():
+            if state == batch_outbox.DONE:
+                success_files.append(file_path)
+                if digests:
+                    file_digests[file_path] = digests
+            else:
+                skipped_files.append(file_path)
+        # 全部成功后删除清单；有失败文件时保留，下次运行只重试失败的文件
+        if not failure_files:
+            outbox_batch.finish()
+        
+        return self._build_batch_result(files_info, target_directory, source_type, base_dir,
+                                        success_files, failure_files, skipped_files, file_digests, concurrency)
+    
+    def _open_outbox_batch(self, target_directory, source_type, base_dir, files_info):
+        """找回同一批量任务未完成的清单并并入本次的文件，没有时登记新清单"""
+        key = batch_outbox.batch_key(target_directory, base_dir if source_type == "directory" else None, files_info)
+        return OutboxBatch.open(self.batch_outbox, key, target_directory, source_type, base_dir, files_info,
+                                resume=config.BATCH_OUTBOX_RESUME)
+    
+    def _upload_with_threads(self, files_info, target_directory, show_progress, source_type, base_dir, skip_exist,
+                             verify_method, remote_index, outbox_batch):
+        """线程引擎：多个工作线程从共享队列领取文件上传
+        
+        Returns:
+            tuple: (成功文件列表, 失败文件列表, 跳过文件列表, 文件摘要)
+        """
+        # 所有线程共享一个文件队列，上传完一个文件再领取下一个；元数据等小文件按优先级通道先行
+        work_queue = FileWorkQueue(files_info, base_dir=base_dir)
+        connection_pool = self._get_connection_pool()
+        
+        # 自适应并发：按上限创建工作线程，同时上传的文件数由控制器在 max_worker 基础上动态调整
+        if config.ADAPTIVE_CONCURRENCY:
+            file_controller = AimdController(self.max_worker, maximum=max(self.max_worker, config.MAX_FILE_CONCURRENCY))
+            part_controller = AimdController(self.part_concurrency,
+                                             maximum=max(self.part_concurrency, config.MAX_PART_CONCURRENCY))
+            self.set_concurrency_controllers(file_controller, part_controller)
+            max_workers = min(file_controller.maximum, len(files_info))
+        else:
+            file_controller = part_controller = None
+            max_workers = min(self.max_worker, len(files_info))
+        
+        # 重试预算和熔断器由所有线程共享：大面积失败时尽快放弃，服务不可用时暂停所有线程
+        retry_budget = RetryBudget.for_batch(len(files_info))
+        circuit_breaker = CircuitBreaker()
+        
+        # 进度由上报线程按固定间隔通知本地监听者，上传线程只更新计数
+        progress_reporter = self._create_progress_reporter(files_info)
         
         # 定义线程上传任务
-        def upload_task_thread(thread_id, files, total_size):
+        def upload_task_thread(thread_id):
             try:
                 # 为每个线程创建独立的上传器实例
-                thread_uploader = BaaiRobotDataUploader(use_direct_auth=self.use_direct_auth)
-                thread_uploader.set_sts_token(self.sts_token)
+                thread_uploader = self._create_worker_uploader(connection_pool, retry_budget, circuit_breaker,
+                                                               file_controller, part_controller, progress_reporter)
                 # 使用线程本地变量跟踪当前线程的成功、失败和跳过文件
                 local_success_files = []
                 local_failed_files = []
                 local_skipped_files = []
+                local_file_digests = {}
                 
                 if show_progress:
-                    pbar = tqdm(total=total_size, 
+                    # 线程处理的文件在运行时动态领取，进度条总量随领取逐步增加
+                    pbar = tqdm(total=0, 
                             unit='B', 
                             colour = "GREEN" , # 使用标准绿色而非十六进制颜色码
                             dynamic_ncols = True , # 自动适应终端宽度
@@ -1069,8 +1473,21 @@ class BaaiRobotDataUploader:
                             desc=f"🟢 线程-{thread_id}", leave=True,
                             position=thread_id)
                                     
-                for file_path in files:
-                    file_size = os.path.getsize(file_path)
+                while True:
+                    if file_controller:
+                        file_controller.acquire()
+                    item = work_queue.get()
+                    if item is None:
+                        if file_controller:
+                            file_controller.release()
+                        break
+                    file_path, file_size = item
+                    if show_progress:
+                        pbar.total += file_size
+                        pbar.refresh()
+                    file_start = time.monotonic()
+                    file_uploaded = False
+                    outbox_batch.mark_in_flight(file_path)
                     try:
                         # 根据来源类型决定是否传入基础目录参数
                         if source_type == "directory" and base_dir:
@@ -1080,7 +1497,9 @@ class BaaiRobotDataUploader:
                                 base_dir=base_dir,  # 添加基础目录参数
                                 skip_exist=skip_exist, 
                                 show_progress=False,
-                                verify_method=verify_method
+                                verify_method=verify_method,
+                                remote_index=remote_index,
+                                identity=entry_identity(item)
                             )
                         else:
                             result = thread_uploader.upload_file(
@@ -1088,34 +1507,53 @@ class BaaiRobotDataUploader:
                                 target_directory,
                                 skip_exist=skip_exist, 
                                 show_progress=False,
-                                verify_method=verify_method
+                                verify_method=verify_method,
+                                remote_index=remote_index,
+                                identity=entry_identity(item)
                             )
                         
                         # 处理上传结果
                         if result:
                             if result.get("success", False):
                                 local_success_files.append(file_path)
+                                progress_reporter.file_done(success=True, elapsed=time.monotonic() - file_start)
+                                outbox_batch.mark_done(file_path, result.get("digests"))
+                                file_uploaded = True
+                                if result.get("digests"):
+                                    local_file_digests[file_path] = result["digests"]
                             elif result.get("skipped", False):
                                 local_skipped_files.append(file_path)
+                                progress_reporter.file_done(skipped=True)
+                                outbox_batch.mark_skipped(file_path)
                             else:
                                 local_failed_files.append(file_path)
+                                progress_reporter.file_done(success=False)
+                                outbox_batch.mark_failed(file_path, result.get("message"))
                         else:
                             local_failed_files.append(file_path)
+                            progress_reporter.file_done(success=False)
+                            outbox_batch.mark_failed(file_path)
                             
                     except Exception as e:
                         print(f"{Fore.RED}上传失败 {file_path}: {str(e)}")
-                        local_failed_files.append(file_path)                            
+                        local_failed_files.append(file_path)
+                        progress_reporter.file_done(success=False)
+                        outbox_batch.mark_failed(file_path, str(e))
                     finally:
+                        if file_controller:
+                            file_controller.release()
+                            if file_uploaded:
+                                file_controller.record_success(file_size, time.monotonic() - file_start)
                         if show_progress:
                             # 更新进度条
                             pbar.update(file_size)
 
                 if show_progress:
                     pbar.close()
-                return local_success_files, local_failed_files, local_skipped_files
+                return local_success_files, local_failed_files, local_skipped_files, local_file_digests
             except Exception as e:
                 print(f"{thread_id}-error:{e}")
-                return [], [], []
+                return [], [], [], {}
                 
         # 由于使用了tqdm的position参数来显示多个进度条
         # 需要预先打印足够的空行为进度条预留显示空间
@@ -1123,32 +1561,19 @@ class BaaiRobotDataUploader:
             print("\n" * (max_workers + 1))
         
         # 使用线程池并行上传
-        success_count = 0
-        failure_count = 0
-        skipped_count = 0
         success_files, failure_files, skipped_files = [], [], []
+        file_digests = {}
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            for i in range(max_workers):
-                if thread_files[i]:  # 只为有文件的线程创建任务
-                    future = executor.submit(
-                        upload_task_thread,
-                        i,  # thread_id
-                        thread_files[i],  # 该线程负责的文件列表
-                        thread_sizes[i]   # 该线程负责的文件总大小
-                    )
-                    futures.append(future)
+            futures = [executor.submit(upload_task_thread, i) for i in range(max_workers)]
             
             # 等待所有任务完成
             for future in futures:
-                local_success, local_failed, local_skipped = future.result()
-                success_count += len(local_success)
+                local_success, local_failed, local_skipped, local_digests = future.result()
                 success_files.extend(local_success)
-                failure_count += len(local_failed)
                 failure_files.extend(local_failed)
-                skipped_count += len(local_skipped)
                 skipped_files.extend(local_skipped)
-
+                file_digests.update(local_digests)
+        progress_reporter.close()
         
         # 由于tqdm进度条会占用终端空间
         # 任务完成后需要打印相同数量的换行来"清理"这些进度条
@@ -1156,6 +1581,33 @@ class BaaiRobotDataUploader:
         if show_progress:
             print("\n" * (max_workers + 1))
         
+        return success_files, failure_files, skipped_files, file_digests
+    
+    def _create_progress_reporter(self, files_info):
+        """创建并启动批量上传的进度上报器（通知本地监听者）"""
+        return ProgressReporter(listeners=self.progress_listeners, total_files=len(files_info),
+                                total_bytes=sum(size for _, size in files_info)).start()
+    
+    def _build_batch_result(self, files_info, target_directory, source_type, base_dir, success_files, failure_files,
+                            skipped_files, file_digests, concurrency) -> UploadResult:
+        """汇总批量上传结果，打印统计信息并构建 UploadResult
+        
+        Args:
+            files_info: 文件信息列表，每个元素为 (file_path, file_size)
+            target_directory: 远程数据集目录路径
+            source_type: 来源类型 ("directory" 或 "file_list")
+            base_dir: 基础目录路径（仅用于目录模式）
+            success_files / failure_files / skipped_files: 成功、失败、跳过的文件列表
+            file_digests: 上传时顺带计算的文件摘要 {文件路径: {算法: 摘要}}
+            concurrency: 结束时的并发数
+            
+        Returns:
+            UploadResult: 上传结果
+        """
+        success_count = len(success_files)
+        failure_count = len(failure_files)
+        skipped_count = len(skipped_files)
+        
         # 计算总大小
         total_size = sum(size for _, size in files_info)
         
@@ -1169,6 +1621,8 @@ class BaaiRobotDataUploader:
             "success_files": success_files,
             "failure_files": failure_files,
             "skipped_files": skipped_files,
+            "file_digests": file_digests,
+            "concurrency": concurrency,  # 结束时的并发数
             "total_size_mb": total_size / 1024 / 1024,
             "target_directory": target_directory,
             "source_type": source_type
@@ -1187,6 +1641,9 @@ class BaaiRobotDataUploader:
             print(f"{Fore.YELLOW}跳过: {skipped_count} 个文件")
         if failure_count > 0:
             print(f"{Fore.RED}失败: {failure_count} 个文件，文件列表:{failure_files}")
+        if self.file_concurrency_controller:
+            levels = result_data["concurrency"]
+            print(f"{Fore.BLUE}自适应并发: 文件 {levels['files']}，分片 {levels['parts']}")
         
         # 根据失败情况返回不同的结果
         if failure_count == 0:
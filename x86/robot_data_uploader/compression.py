@@ -0,0 +1,256 @@
+"""按文件类型压缩上传：压缩后的内容写入原对象key，编码和原始大小记录在对象元数据中"""
+import fnmatch
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+import zlib
+
+from colorama import Fore
+
+from robot_data_uploader import config
+from robot_data_uploader.digest_cache import new_digesters, upload_digest_algorithms
+from robot_data_uploader.remote_digest import DIGEST_META_PREFIX
+
+ENCODING_FIELD = "encoding"             # 对象元数据 x-kss-meta-encoding：压缩算法
+ORIGINAL_SIZE_FIELD = "original-size"   # 对象元数据 x-kss-meta-original-size：压缩前的文件大小
+
+_zstd_warned = threading.Event()
+
+
+def _gzip_compressor(level):
+    # wbits=16+MAX_WBITS 生成带 gzip 头的数据，可直接按 Content-Encoding: gzip 解码
+    return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def _zstd_compressor(level):
+    import zstandard
+    return zstandard.ZstdCompressor(level=level).compressobj()
+
+
+COMPRESSORS = {
+    "zstd": _zstd_compressor,
+    "gzip": _gzip_compressor,
+}
+
+
+def _zstd_available():
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_codec(codec):
+    """确认压缩算法可用，未安装 zstandard 时 zstd 退回 gzip（只提示一次）
+
+    Returns:
+        str or None: 实际使用的压缩算法，不支持的算法返回 None
+    """
+    if codec == "zstd" and not _zstd_available():
+        if not _zstd_warned.is_set():
+            _zstd_warned.set()
+            print(f"{Fore.YELLOW}未安装 zstandard，zstd 压缩改用 gzip")
+        return "gzip"
+    return codec if codec in COMPRESSORS else None
+
+
+def compression_codec(file_path, rules=None):
+    """按文件名匹配压缩规则
+
+    Args:
+        file_path: 本地文件路径
+        rules: 文件名规则 -> 压缩算法，默认取 config.UPLOAD_COMPRESSION_RULES
+
+    Returns:
+        str or None: 压缩算法，不需要压缩时返回 None
+    """
+    rules = config.UPLOAD_COMPRESSION_RULES if rules is None else rules
+    if not rules:
+        return None
+    filename = os.path.basename(file_path).lower()
+    for pattern, codec in rules.items():
+        if fnmatch.fnmatch(filename, pattern.lower()):
+            return resolve_codec(codec)
+    return None
+
+
+# 下载方普遍支持透明解压的编码，只对这些编码设置 Content-Encoding
+_HTTP_CONTENT_ENCODINGS = {"gzip"}
+# 其余编码按压缩格式本身设置 Content-Type，下载方需自行解压
+_CONTENT_TYPES = {"zstd": "application/zstd"}
+
+
+def compression_headers(codec, original_size):
+    """压缩上传的对象请求头：gzip 设置 Content-Encoding 供下载方透明解压，
+    zstd 多数客户端无法解码，只标注为 application/zstd；元数据供校验时比对原文件"""
+    headers = {
+        DIGEST_META_PREFIX + ENCODING_FIELD: codec,
+        DIGEST_META_PREFIX + ORIGINAL_SIZE_FIELD: str(original_size),
+    }
+    if codec in _HTTP_CONTENT_ENCODINGS:
+        headers["Content-Encoding"] = codec
+    else:
+        headers["Content-Type"] = _CONTENT_TYPES.get(codec, "application/octet-stream")
+    return headers
+
+
+class CompressedFile:
+    """压缩结果的缓存：不超过 spool_size 时保存在内存中，超过后转存到临时文件
+
+    同时记录压缩后数据的 MD5（上传请求需要）以及原文件的摘要。
+    """
+
+    def __init__(self, codec, original_size, spool_dir=None, spool_size=None):
+        self.codec = codec
+        self.original_size = original_size
+        self.size = 0
+        self.digests = None  # 原文件摘要
+        self.path = None     # 转存到临时文件时的路径
+        self._spool_dir = spool_dir
+        self._spool_size = config.COMPRESSION_SPOOL_SIZE if spool_size is None else spool_size
+        self._buffer = io.BytesIO()
+        self._file = None
+        self._md5 = hashlib.md5()
+
+    @property
+    def in_memory(self):
+        return self._file is None
+
+    @property
+    def md5(self):
+        """压缩后数据的MD5"""
+        return self._md5.hexdigest()
+
+    def worthwhile(self, min_saving=None):
+        """压缩后是否足够小，值得上传压缩内容"""
+        min_saving = config.COMPRESSION_MIN_SAVING if min_saving is None else min_saving
+        return self.size <= self.original_size * (1 - min_saving)
+
+    def headers(self):
+        return compression_headers(self.codec, self.original_size)
+
+    def write(self, data):
+        if not data:
+            return
+        self._md5.update(data)
+        self.size += len(data)
+        if self._file is None and self._buffer.tell() + len(data) > self._spool_size:
+            self._file = tempfile.NamedTemporaryFile(prefix="compressed-", dir=self._spool_dir, delete=False)
+            self.path = self._file.name
+            self._file.write(self._buffer.getbuffer())
+            self._buffer = None
+        (self._file or self._buffer).write(data)
+
+    def finish(self):
+        """写入结束，转存的临时文件落盘后可按路径读取"""
+        if self._file is not None:
+            self._file.close()
+
+    def getvalue(self):
+        """内存中的压缩数据"""
+        return self._buffer.getvalue()
+
+    def close(self):
+        """删除临时文件"""
+        if self._file is not None:
+            self._file.close()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def compress_file(file_path, codec, spool_dir=None, algorithms=None, level=None, spool_size=None):
+    """流式压缩文件，读取时顺带计算原文件摘要，内存占用不超过读缓冲区加内存缓存上限
+
+    Args:
+        file_path: 本地文件路径
+        codec: 压缩算法
+        spool_dir: 压缩结果超过内存缓存上限时临时文件所在目录
+        algorithms: 顺带计算的原文件摘要算法，默认取 upload_digest_algorithms()
+        level: 压缩级别，默认取 config.COMPRESSION_LEVELS
+        spool_size: 内存缓存上限（字节），默认取 config.COMPRESSION_SPOOL_SIZE
+
+    Returns:
+        CompressedFile: 用完后需调用 close()（或用 with）删除临时文件
+    """
+    if level is None:
+        level = config.COMPRESSION_LEVELS.get(codec)
+    compressor = COMPRESSORS[codec](level)
+    digesters = new_digesters(algorithms or upload_digest_algorithms())
+    compressed = CompressedFile(codec, os.path.getsize(file_path), spool_dir, spool_size)
+    buf = bytearray(config.HASH_BUFFER_SIZE)
+    view = memoryview(buf)
+    try:
+        with open(file_path, 'rb') as f:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                chunk = view[:n]
+                for digester in digesters.values():
+                    digester.update(chunk)
+                compressed.write(compressor.compress(chunk))
+        compressed.write(compressor.flush())
+        compressed.finish()
+    except BaseException:
+        compressed.close()
+        raise
+    compressed.digests = {name: digester.hexdigest() for name, digester in digesters.items()}
+    return compressed
+
+
+def measure_compression(file_paths, codecs=("zstd", "gzip")):
+    """按扩展名统计各压缩算法的压缩率和速度，用于决定 UPLOAD_COMPRESSION_RULES
+
+    只计数不保存压缩结果；未安装 zstandard 时跳过 zstd。
+
+    Args:
+        file_paths: 样本文件路径列表
+        codecs: 参与比较的压缩算法
+
+    Returns:
+        dict: 扩展名 -> {算法: {"files", "original_bytes", "compressed_bytes", "ratio", "mb_per_s"}}
+    """
+    codecs = [codec for codec in codecs if codec in COMPRESSORS and (codec != "zstd" or _zstd_available())]
+    report = {}
+    buf = bytearray(config.HASH_BUFFER_SIZE)
+    view = memoryview(buf)
+    for file_path in file_paths:
+        ext = os.path.splitext(file_path)[1].lower() or "(none)"
+        for codec in codecs:
+            compressor = COMPRESSORS[codec](config.COMPRESSION_LEVELS.get(codec))
+            original = compressed = 0
+            start = time.perf_counter()
+            with open(file_path, 'rb') as f:
+                while True:
+                    n = f.readinto(buf)
+                    if not n:
+                        break
+                    original += n
+                    compressed += len(compressor.compress(view[:n]))
+            compressed += len(compressor.flush())
+            elapsed = time.perf_counter() - start
+            stats = report.setdefault(ext, {}).setdefault(
+                codec, {"files": 0, "original_bytes": 0, "compressed_bytes": 0, "seconds": 0.0})
+            stats["files"] += 1
+            stats["original_bytes"] += original
+            stats["compressed_bytes"] += compressed
+            stats["seconds"] += elapsed
+    for by_codec in report.values():
+        for stats in by_codec.values():
+            seconds = stats.pop("seconds")
+            stats["ratio"] = stats["compressed_bytes"] / stats["original_bytes"] if stats["original_bytes"] else 1.0
+            stats["mb_per_s"] = stats["original_bytes"] / seconds / (1024 * 1024) if seconds > 0 else 0.0
+    return report
@@ -16,8 +16,6 @@
 # ====================================================================================
 
 import os
-import sys
-import json
 
 # ====================
 # 环境配置 - 只需修改此处即可切换环境
@@ -61,10 +59,90 @@ TASK_PATH = "/api/eai/task"
 START_UPLOAD_PATH = "/api/eai/dataset/upload/start"
 UPDATE_UPLOAD_PATH = "/api/eai/dataset/upload/process"
 COMPLETE_UPLOAD_PATH = "/api/eai/dataset/upload/complete"
+PLATFORM_REQUEST_TIMEOUT = 10  # 开始、进度、完成上传通知的请求超时（秒）
+PROGRESS_REPORT_INTERVAL = 5   # 上传进度上报间隔（秒），进度无变化时不上报
+PROGRESS_CLOSE_TIMEOUT = 15    # 上传结束后等待最终进度和完成通知发送的最长时间（秒）
 
 # 金山云存储端点配置
 ENDPOINT = "ks3-cn-beijing-internal.ksyuncs.com"  # 内网专线（优先）
 ENDPOINT_BACKUP = "ks3-cn-beijing.ksyuncs.com"    # 公网线路（备用）
+# 自定义端点（"host" 或 "host:port"），设置后不再探测内网/公网线路，以路径方式（/<bucket>/<key>）访问存储桶；
+# 用于指向本地KS3替身服务（python -m robot_data_uploader.ks3_stub）离线测试和性能分析，也可通过同名环境变量设置
+KS3_ENDPOINT_OVERRIDE = os.environ.get("KS3_ENDPOINT_OVERRIDE", "")
+KS3_PORT = None          # KS3 端口，默认按 KS3_IS_SECURE 取 443 或 80
+KS3_IS_SECURE = False    # 是否通过 HTTPS 访问 KS3
+KS3_PATH_STYLE = False   # 以路径方式访问存储桶（端点不支持 <bucket>.<endpoint> 域名时开启）
+
+# ====================
+# 上传参数配置
+# ====================
+PART_SIZE = 5 * 1024 * 1024              # 最小分片大小（5MB），实际分片大小按文件大小和网络状况选择
+MAX_PART_SIZE = 64 * 1024 * 1024         # 分片大小上限（为满足分片数量限制时可超过）
+TARGET_PART_COUNT = 1000                 # 单个文件的目标分片数，文件越大分片越大
+MAX_PART_COUNT = 10000                   # 单个文件的分片数量上限（KS3限制）
+PART_RTT_FACTOR = 20                     # 单个分片的传输时间至少为往返时延的倍数
+PART_CONCURRENCY = 4                     # 单个文件内同时上传的分片数（1 表示逐片串行上传）
+PART_BUFFER_LIMIT = 64 * 1024 * 1024     # 单个文件在途分片的内存上限（字节），分片大小不超过该值除以分片并发数；分片请求体为 mmap 时限制的是同时映射的文件范围
+PART_BODY_MMAP = True                    # 分片请求体通过 mmap 映射文件直接发送，减少内存复制；上传期间文件可能被截断时关闭（访问已截断的映射会使进程崩溃）
+ADAPTIVE_CONCURRENCY = True              # 批量上传时按吞吐量和错误自适应调整文件级、分片级并发数（AIMD）
+MAX_FILE_CONCURRENCY = 32                # 自适应时同时上传的文件数上限（初始值为 max_worker）
+MAX_PART_CONCURRENCY = 16                # 自适应时单文件内同时上传的分片数上限（初始值为 PART_CONCURRENCY）
+AIMD_WINDOW = 5                          # 自适应并发的统计窗口（秒）
+AIMD_DECREASE_FACTOR = 0.5               # 出错或延迟上升时并发数的缩减系数
+AIMD_LATENCY_TOLERANCE = 2.0             # 单位数据耗时超过历史最小值的该倍数时视为延迟上升
+AIMD_MIN_IMPROVEMENT = 0.05              # 吞吐量提升超过该比例时才继续增加并发
+UPLOAD_RATE_LIMIT = 0                    # 进程内所有上传线程的总速率上限（字节/秒），0 表示不限速
+KS3_POOL_SIZE = 8                        # 批量上传时各线程共享的KS3连接数
+KS3_POOL_HEALTH_CHECK_INTERVAL = 60      # 连接健康检查间隔（秒），0 表示不检查
+# 批量上传的优先级通道：按相对数据集根目录的路径匹配（fnmatch，第一个匹配的通道生效），
+# 通道之间按权重分配领取次数，权重低的通道也始终能领到文件；order 为通道内顺序：
+# "smallest" 小文件优先、"newest" 最近修改的优先、"largest" 大文件优先；未匹配的文件大文件优先
+UPLOAD_PRIORITY_LANES = [
+    {"name": "meta", "patterns": ["meta/*", "*/meta/*"], "weight": 16, "order": "smallest"},  # 平台登记数据集所需的元数据
+    {"name": "episodes", "patterns": ["data/*", "*/data/*", "*.json", "*.jsonl", "*.parquet", "*.hdf5"],
+     "weight": 4, "order": "newest"},  # episode 数据，最新采集的优先
+    {"name": "media", "patterns": ["*"], "weight": 1, "order": "largest"},  # 视频、图片等大体积媒体文件
+]
+UPLOAD_ENGINE = "thread"                 # 批量上传引擎："thread"（线程池）或 "asyncio"（适合数万个小文件的数据集）
+ASYNC_MAX_IN_FLIGHT = 256                # asyncio 引擎同时进行的上传请求数（即长连接数）
+ASYNC_IO_THREADS = 4                     # asyncio 引擎读文件、计算摘要使用的线程数
+ASYNC_BUFFER_LIMIT = 256 * 1024 * 1024   # asyncio 引擎在途文件数据的内存上限（字节）
+ASYNC_REQUEST_TIMEOUT = 60               # asyncio 引擎单个请求的超时时间（秒）
+MAX_UPLOAD_RETRIES = 5                   # 单个文件的最大尝试次数
+RETRY_BASE_DELAY = 1.0                   # 重试退避的基准时间（秒），每次失败翻倍并加随机抖动
+RETRY_SLOW_DOWN_DELAY = 5.0              # 服务端限流（429/SlowDown）时的退避基准时间（秒）
+RETRY_MAX_DELAY = 60.0                   # 单次重试的最长等待时间（秒）
+RETRY_BUDGET_MIN = 10                    # 批量上传的最少重试预算（次）
+RETRY_BUDGET_RATIO = 0.2                 # 批量上传的重试预算随文件数增加的比例
+AUTH_REFRESH_MIN_INTERVAL = 10           # 凭证刷新的最小间隔（秒），多个线程同时遇到凭证失效时只刷新一次
+STS_REFRESH_AHEAD = 600                  # STS凭证在过期前多少秒自动刷新
+STS_DEFAULT_LIFETIME = 3600              # STS接口未返回过期时间时，按此有效期（秒）估算
+STS_REFRESH_RETRY_INTERVAL = 30          # 提前刷新失败后再次尝试的间隔（秒）
+CIRCUIT_FAILURE_THRESHOLD = 5            # 连续多少次服务不可用的失败后熔断，暂停所有上传线程
+CIRCUIT_RESET_TIMEOUT = 30               # 熔断持续时间（秒），之后放行一个探测请求
+HASH_BUFFER_SIZE = 1024 * 1024           # 计算文件摘要时的读缓冲区大小（字节）
+UPLOAD_DIGEST_ALGORITHMS = ("md5", "sha256", "crc64")  # 上传时顺带计算并缓存的整文件摘要，供后续校验使用
+DIGEST_METADATA_ALGORITHMS = ("md5", "sha256")  # 上传时写入对象元数据（x-kss-meta-<算法>）的摘要，校验时只需一次HEAD；为空则不写入
+DIGEST_METADATA_BACKFILL = False         # 分片上传初始化时摘要缓存未命中（如首次上传）时，是否在完成后通过原地复制补写摘要元数据；每个分片对象多一次服务端整对象复制请求，默认关闭，校验时改为流式计算远程摘要；开启 DEDUP_ENABLED 时总是补写（去重复制前需核对源对象的摘要元数据）
+REMOTE_HASH_RANGE_SIZE = 8 * 1024 * 1024  # 流式计算远程对象摘要时每个范围请求的大小（字节）
+REMOTE_HASH_CONCURRENCY = 4              # 流式计算远程对象摘要时并发下载的范围数（1 表示单个GET顺序读取）
+MULTIPART_ETAG_PART_SIZES = (5 * 1024 * 1024, 8 * 1024 * 1024, 10 * 1024 * 1024, 16 * 1024 * 1024,
+                             32 * 1024 * 1024, 64 * 1024 * 1024, 128 * 1024 * 1024)  # 本地计算分片上传ETag时尝试的分片大小（上传时未记录分片大小的文件）
+REMOTE_INDEX_PAGE_SIZE = 1000            # 批量上传前列举目标目录时每页的对象数（单次列举上限1000）
+COPY_OBJECT_MAX_SIZE = 5 * 1024 * 1024 * 1024  # 单次复制对象的大小上限，超过时不通过原地复制写入摘要元数据
+DIGEST_CACHE_FILE = "digests.db"         # 文件摘要缓存（位于断点续传目录下）
+RESUME_JOURNAL_FILE = "resume.db"        # 分片上传断点续传日志（位于断点续传目录下）
+BATCH_OUTBOX_FILE = "outbox.db"          # 批量上传清单（位于断点续传目录下），记录每个文件的上传状态
+BATCH_OUTBOX_RESUME = True               # 同一目录（或文件列表）到同一目标的批量上传中途退出后，下次运行沿用清单从停下的位置继续
+MANIFEST_SCAN_WORKERS = 8                # 扫描数据集目录的线程数（按子目录如 chunk-XXX 并行 os.scandir），1 表示单线程扫描
+FILE_SELECTION_RULES = {}                # 目录上传的文件选择规则，如 {"exclude": ["images/", "*.tmp"], "prefixes": ["data/", "meta/", "videos/"], "max_size": 10 * 1024 ** 3}；以 / 结尾的排除规则扫描时整个目录剪掉
+DEDUP_ENABLED = False                    # 按内容去重：相同内容（sha256 和大小）的文件已上传过时，用服务端复制代替重新上传
+DEDUP_INDEX_FILE = "dedup.db"            # 内容去重索引（位于断点续传目录下），记录已上传对象的摘要
+DEDUP_HASH_MAX_SIZE = 64 * 1024 * 1024   # 摘要缓存中没有该文件时，不超过此大小的文件先计算摘要再判断是否重复；更大的文件只用已缓存的摘要
+UPLOAD_COMPRESSION_RULES = {}            # 按文件名规则压缩上传，如 {"*.json": "zstd", "*.jsonl": "zstd", "*.avi": "zstd"}；编码和原始大小写入对象元数据，为空则不压缩；gzip 对象带 Content-Encoding 可被浏览器/HTTP 客户端透明解压，zstd 对象存为 application/zstd，下载方需自行用 zstd 解压
+COMPRESSION_LEVELS = {"zstd": 3, "gzip": 6}  # 各压缩算法的压缩级别
+COMPRESSION_MIN_SAVING = 0.1             # 压缩后至少减小该比例才上传压缩内容，否则上传原文件（如已压缩过的视频）
+COMPRESSION_SPOOL_SIZE = 5 * 1024 * 1024  # 压缩结果在内存中缓存的上限（字节），超过后写入断点续传目录下的临时文件并分片上传
 
 
 def load_environment_config(environment=None):
@@ -114,6 +192,8 @@ def get_optimal_endpoint():
     import socket
     from colorama import Fore
     
+    if KS3_ENDPOINT_OVERRIDE:
+        return KS3_ENDPOINT_OVERRIDE, "自定义端点"
     # 尝试连接内网端点
     try:
         sock = socket.create_connection((ENDPOINT, 80), timeout=1)
@@ -126,6 +206,26 @@ def get_optimal_endpoint():
 CURRENT_ENDPOINT, ENDPOINT_TYPE = get_optimal_endpoint()
 ENDPOINT = CURRENT_ENDPOINT
 
+
+def use_endpoint(endpoint, path_style=True, endpoint_type="自定义端点"):
+    """改用指定的 KS3 端点（如本地替身服务），之后新建的连接生效
+    
+    Args:
+        endpoint: "host" 或 "host:port"
+        path_style: 是否以路径方式访问存储桶
+        endpoint_type: 端点类型描述
+    """
+    global ENDPOINT, CURRENT_ENDPOINT, ENDPOINT_TYPE, KS3_PORT, KS3_PATH_STYLE
+    host, _, port = endpoint.partition(":")
+    ENDPOINT = CURRENT_ENDPOINT = host
+    ENDPOINT_TYPE = endpoint_type
+    KS3_PORT = int(port) if port else None
+    KS3_PATH_STYLE = path_style
+
+
+if KS3_ENDPOINT_OVERRIDE:
+    use_endpoint(KS3_ENDPOINT_OVERRIDE)
+
 # 在启动时输出当前环境和端点信息
 def print_config_info():
     """输出当前配置信息"""
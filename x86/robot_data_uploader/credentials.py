@@ -0,0 +1,232 @@
+"""STS临时凭证：记录过期时间，在过期前自动刷新，所有连接即时使用新凭证"""
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from ks3.connection import Connection
+from ks3.provider import Provider
+
+from robot_data_uploader import config
+
+# expiration 为过期时间（Unix 时间戳，秒）
+Credentials = namedtuple("Credentials", ["access_key_id", "access_key_secret", "security_token", "expiration"])
+
+# STS 接口返回的过期时间字段（不同版本的接口命名不一）
+_EXPIRATION_FIELDS = ("expiration", "Expiration", "expiredTime", "expireTime", "expiresAt")
+
+
+def _parse_expiration(value):
+    """解析过期时间：支持秒/毫秒时间戳和 ISO 8601 字符串，无法解析时返回 None"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.strip().isdigit()):
+        timestamp = float(value)
+        # 毫秒时间戳
+        return timestamp / 1000 if timestamp > 1e12 else timestamp
+    try:
+        parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_sts_token(sts_token, now=None):
+    """把 STS 接口返回的凭证转换为 Credentials
+
+    接口未返回过期时间时，按 config.STS_DEFAULT_LIFETIME 估算。
+
+    Args:
+        sts_token: STS 接口返回的 data，包含 accessKeyId、secretAccessKey、securityToken
+        now: 当前时间戳，默认取 time.time()
+
+    Returns:
+        Credentials
+    """
+    now = time.time() if now is None else now
+    expiration = None
+    for field in _EXPIRATION_FIELDS:
+        expiration = _parse_expiration(sts_token.get(field))
+        if expiration is not None:
+            break
+    if expiration is None:
+        expiration = now + config.STS_DEFAULT_LIFETIME
+    return Credentials(sts_token['accessKeyId'], sts_token['secretAccessKey'],
+                       sts_token.get('securityToken'), expiration)
+
+
+class StsCredentialProvider:
+    """STS临时凭证提供者
+
+    每次请求前调用 get 获取当前凭证。凭证距过期不足 refresh_ahead 秒时，由一个线程通过
+    fetch 重新获取，其余线程在旧凭证仍有效期间继续使用旧凭证、不等待；凭证已过期时才等待刷新完成。
+    新凭证整体替换旧凭证（单次引用赋值），不会出现新旧 AK/SK 混用。
+    """
+
+    def __init__(self, fetch, sts_token=None, refresh_ahead=None, retry_interval=None):
+        """
+        Args:
+            fetch: 无参可调用对象，从 STS 接口获取新凭证，返回接口的 data（dict），失败时返回 None
+            sts_token: 已获取的凭证（STS 接口返回的 data）
+            refresh_ahead: 提前刷新的时间（秒），默认取 config.STS_REFRESH_AHEAD
+            retry_interval: 刷新失败后再次尝试的间隔（秒），默认取 config.STS_REFRESH_RETRY_INTERVAL
+        """
+        self._fetch = fetch
+        self.refresh_ahead = config.STS_REFRESH_AHEAD if refresh_ahead is None else refresh_ahead
+        self.retry_interval = config.STS_REFRESH_RETRY_INTERVAL if retry_interval is None else retry_interval
+        self._lock = threading.Lock()
+        self._credentials = parse_sts_token(sts_token) if sts_token else None
+        self._last_refresh = time.monotonic() if sts_token else 0.0
+        self._next_attempt = 0.0
+
+    def update(self, sts_token):
+        """用外部已获取的凭证替换当前凭证"""
+        credentials = parse_sts_token(sts_token)
+        with self._lock:
+            self._credentials = credentials
+            self._last_refresh = time.monotonic()
+            self._next_attempt = 0.0
+
+    def _needs_refresh(self, credentials, now):
+        return credentials is None or now >= credentials.expiration - self.refresh_ahead
+
+    def get(self):
+        """获取当前可用的凭证，即将过期时提前刷新
+
+        Returns:
+            Credentials
+
+        Raises:
+            RuntimeError: 没有可用凭证且刷新失败
+        """
+        credentials = self._credentials
+        now = time.time()
+        if not self._needs_refresh(credentials, now):
+            return credentials
+        if credentials is not None and now < credentials.expiration:
+            # 旧凭证仍有效：只有拿到锁的线程去刷新，其余线程继续使用旧凭证
+            if time.monotonic() >= self._next_attempt and self._lock.acquire(blocking=False):
+                try:
+                    self._refresh_locked()
+                finally:
+                    self._lock.release()
+            return self._credentials
+        with self._lock:
+            if self._needs_refresh(self._credentials, time.time()):
+                self._refresh_locked()
+            credentials = self._credentials
+        if credentials is None:
+            raise RuntimeError("获取STS凭证失败")
+        return credentials
+
+    def refresh(self, min_interval=None):
+        """立即刷新凭证（如服务端返回凭证失效时）
+
+        多个线程同时要求刷新时，min_interval 秒内只刷新一次。
+
+        Args:
+            min_interval: 最小刷新间隔（秒），默认取 config.AUTH_REFRESH_MIN_INTERVAL
+
+        Returns:
+            bool: 当前凭证是否为新获取的
+        """
+        min_interval = config.AUTH_REFRESH_MIN_INTERVAL if min_interval is None else min_interval
+        with self._lock:
+            if self._credentials is not None and time.monotonic() - self._last_refresh < min_interval:
+                return True
+            return self._refresh_locked()
+
+    def _refresh_locked(self):
+        try:
+            sts_token = self._fetch()
+        except Exception:
+            sts_token = None
+        if not sts_token:
+            self._next_attempt = time.monotonic() + self.retry_interval
+            return False
+        self._credentials = parse_sts_token(sts_token)
+        self._last_refresh = time.monotonic()
+        self._next_attempt = 0.0
+        return True
+
+    def expires_in(self):
+        """当前凭证的剩余有效时间（秒），没有凭证时返回 None"""
+        credentials = self._credentials
+        if credentials is None:
+            return None
+        return credentials.expiration - time.time()
+
+
+class _StsProvider(Provider):
+    """SDK 的 Provider，凭证字段改为读取连接当前使用的凭证"""
+
+    def __init__(self, name, credentials_getter):
+        self._credentials_getter = credentials_getter
+        super().__init__(name)
+
+    @property
+    def access_key(self):
+        return self._credentials_getter().access_key_id
+
+    @access_key.setter
+    def access_key(self, value):
+        pass
+
+    @property
+    def secret_key(self):
+        return self._credentials_getter().access_key_secret
+
+    @secret_key.setter
+    def secret_key(self, value):
+        pass
+
+    @property
+    def security_token(self):
+        return self._credentials_getter().security_token
+
+    @security_token.setter
+    def security_token(self, value):
+        pass
+
+
+class StsConnection(Connection):
+    """从 StsCredentialProvider 读取凭证的KS3连接
+
+    每个请求开始时取一次当前凭证并在本线程内固定，请求签名使用的 AK/SK/Token 始终来自同一份凭证；
+    凭证刷新后，池中所有连接的后续请求立即使用新凭证，正在进行的请求（如分片上传）不受影响。
+    """
+
+    def __init__(self, credential_provider, **kwargs):
+        self._credential_provider = credential_provider
+        self._request_credentials = threading.local()
+        super().__init__(None, None, provider=_StsProvider('kss', self._current_credentials), **kwargs)
+
+    def _current_credentials(self):
+        credentials = getattr(self._request_credentials, 'value', None)
+        return credentials or self._credential_provider.get()
+
+    # SDK 在构造函数中直接赋值 access_key_id / access_key_secret，这里改为读取当前凭证
+    @property
+    def access_key_id(self):
+        return self._current_credentials().access_key_id
+
+    @access_key_id.setter
+    def access_key_id(self, value):
+        pass
+
+    @property
+    def access_key_secret(self):
+        return self._current_credentials().access_key_secret
+
+    @access_key_secret.setter
+    def access_key_secret(self, value):
+        pass
+
+    def make_request(self, *args, **kwargs):
+        self._request_credentials.value = self._credential_provider.get()
+        try:
+            return super().make_request(*args, **kwargs)
+        finally:
+            self._request_credentials.value = None
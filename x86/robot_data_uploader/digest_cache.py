@@ -0,0 +1,339 @@
+"""文件摘要计算及持久化缓存"""
+import hashlib
+import os
+import threading
+
+from robot_data_uploader import config
+from robot_data_uploader.local_store import SqliteStore, file_identity, open_store
+from robot_data_uploader.part_sizing import choose_part_size
+
+
+def _new_crc64():
+    """创建CRC64-ECMA计算器（与KS3服务端 x-kss-checksum-crc64ecma 一致）"""
+    from ks3.utils import Crc64
+    return Crc64()
+
+
+class _Crc64Digest:
+    """将 Crc64 适配为 hashlib 风格的接口"""
+
+    def __init__(self):
+        self._crc = _new_crc64()
+
+    def update(self, data):
+        self._crc.update(data)
+
+    def hexdigest(self):
+        return str(self._crc.crc)
+
+
+DIGEST_FACTORIES = {
+    "md5": hashlib.md5,
+    "sha256": hashlib.sha256,
+    "crc64": _Crc64Digest,
+}
+
+
+def new_digesters(algorithms):
+    """按算法名称创建摘要计算器字典"""
+    return {name: DIGEST_FACTORIES[name]() for name in algorithms}
+
+
+def upload_digest_algorithms():
+    """上传时顺带计算的摘要算法（总是包含上传请求本身需要的 md5）"""
+    return tuple(dict.fromkeys(("md5",) + tuple(config.UPLOAD_DIGEST_ALGORITHMS)))
+
+
+def digest_bytes(data, algorithms):
+    """计算内存中数据的多个摘要"""
+    digesters = new_digesters(algorithms)
+    for digester in digesters.values():
+        digester.update(data)
+    return {name: digester.hexdigest() for name, digester in digesters.items()}
+
+
+def compute_digests(file_path, algorithms=("md5",), buffer_size=None, offset=0, size=None):
+    """单次读取文件，同时计算多个摘要
+
+    使用预分配的大缓冲区 readinto 读取，避免逐块分配内存。
+
+    Args:
+        file_path: 文件路径
+        algorithms: 摘要算法列表，可选 "md5"、"sha256"、"crc64"
+        buffer_size: 读缓冲区大小，默认取 config.HASH_BUFFER_SIZE
+        offset: 起始偏移（字节），用于只计算文件中的一段（如单个分片）
+        size: 读取长度（字节），默认读到文件末尾
+
+    Returns:
+        dict: 算法名 -> 十六进制摘要（crc64 为十进制字符串）
+    """
+    digesters = new_digesters(algorithms)
+    buf = bytearray(buffer_size or config.HASH_BUFFER_SIZE)
+    view = memoryview(buf)
+    with open(file_path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                pass
+        if offset:
+            f.seek(offset)
+        remaining = size
+        while remaining is None or remaining > 0:
+            n = f.readinto(buf if remaining is None or remaining >= len(buf) else view[:remaining])
+            if not n:
+                break
+            if remaining is not None:
+                remaining -= n
+            chunk = view[:n]
+            for digester in digesters.values():
+                digester.update(chunk)
+    return {name: digester.hexdigest() for name, digester in digesters.items()}
+
+
+def multipart_etag_algorithm(part_size):
+    """分片上传ETag在摘要缓存中的算法名（与分片大小相关）"""
+    return f"etag:{part_size}"
+
+
+def parse_multipart_etag(etag):
+    """解析分片上传对象的ETag
+
+    Returns:
+        int or None: 分片数量，不是分片上传形式的ETag时返回 None
+    """
+    etag = (etag or "").strip('"')
+    digest, sep, part_count = etag.partition("-")
+    if not sep or not part_count.isdigit():
+        return None
+    return int(part_count)
+
+
+def multipart_etag_from_part_md5s(part_md5s):
+    """由各分片MD5（十六进制，按分片号排序）计算分片上传对象的ETag: md5(各分片MD5拼接)-分片数"""
+    combined = hashlib.md5(b"".join(bytes.fromhex(md5.strip('"')) for md5 in part_md5s))
+    return f"{combined.hexdigest()}-{len(part_md5s)}"
+
+
+def compute_multipart_etag(file_path, part_size, buffer_size=None):
+    """按给定分片大小在本地计算分片上传对象的ETag，无需下载远程对象"""
+    file_size = os.path.getsize(file_path)
+    part_md5s = []
+    for offset in range(0, file_size, part_size):
+        part_md5s.append(compute_digests(file_path, ("md5",), buffer_size,
+                                         offset=offset, size=min(part_size, file_size - offset))["md5"])
+    return multipart_etag_from_part_md5s(part_md5s)
+
+
+def candidate_part_sizes(file_size, part_count):
+    """推断上传时可能使用的分片大小：按优先级返回与分片数量相符的候选值
+
+    候选值依次为按文件大小选择的分片大小（不含实测网络状况）、默认分片大小和
+    config.MULTIPART_ETAG_PART_SIZES 中的常用分片大小。
+    """
+    candidates = []
+    for part_size in (choose_part_size(file_size), config.PART_SIZE) + tuple(config.MULTIPART_ETAG_PART_SIZES):
+        if part_size in candidates or part_size <= 0:
+            continue
+        if -(-file_size // part_size) == part_count:
+            candidates.append(part_size)
+    return candidates
+
+
+class OrderedDigester:
+    """边上传边计算整文件摘要
+
+    并发上传时各分片完成顺序不确定，而摘要必须按文件顺序计算。各分片在读入内存后、上传之前
+    调用 feed，按偏移顺序依次送入摘要计算器：排在前面的分片尚未送入时当前线程等待，因此
+    不会额外缓存分片数据，内存占用仍受在途分片上限约束。断点续传时已上传的分片不会再被读入，
+    轮到这些区间时直接从本地文件读取补齐。
+    """
+
+    def __init__(self, file_path, algorithms, file_size, skip_ranges=(), buffer_size=None):
+        """
+        Args:
+            file_path: 文件路径（没有 skip_ranges 时可为 None，如计算远程对象的摘要）
+            algorithms: 摘要算法列表
+            file_size: 文件大小（字节）
+            skip_ranges: 不会经过 feed 的区间 [(offset, size), ...]（如已上传的分片）
+            buffer_size: 补齐区间时的读缓冲区大小
+        """
+        self.file_path = file_path
+        self.file_size = file_size
+        self.buffer_size = buffer_size
+        self._digesters = new_digesters(algorithms)
+        self._skip_ranges = dict(skip_ranges)
+        self._position = 0
+        self._failed = False
+        self._cond = threading.Condition()
+
+    def _update(self, data):
+        for digester in self._digesters.values():
+            digester.update(data)
+
+    def _advance_skipped(self):
+        """当前位置处于跳过区间时，从本地文件读取补齐"""
+        while self._position in self._skip_ranges:
+            offset, size = self._position, self._skip_ranges.pop(self._position)
+            buf = bytearray(self.buffer_size or config.HASH_BUFFER_SIZE)
+            view = memoryview(buf)
+            with open(self.file_path, "rb", buffering=0) as f:
+                f.seek(offset)
+                remaining = size
+                while remaining > 0:
+                    n = f.readinto(view[:min(remaining, len(buf))])
+                    if not n:
+                        raise IOError(f"读取文件失败: {self.file_path} 在偏移 {offset + size - remaining} 处提前结束")
+                    self._update(view[:n])
+                    remaining -= n
+            self._position += size
+
+    def feed(self, offset, data):
+        """送入从 offset 开始的一段数据，等待前面的数据送入后再计算"""
+        with self._cond:
+            while not self._failed:
+                self._advance_skipped()
+                if self._position >= offset:
+                    break
+                self._cond.wait()
+            # 已送入过的数据（如同一分片重试）不再重复计算
+            if self._failed or self._position != offset:
+                return
+            self._update(data)
+            self._position += len(data)
+            self._cond.notify_all()
+
+    def fail(self):
+        """某段数据无法送入（如读取失败），放弃计算并唤醒等待中的线程"""
+        with self._cond:
+            self._failed = True
+            self._cond.notify_all()
+
+    def hexdigests(self):
+        """全部数据送入后返回摘要，数据不完整时返回 None"""
+        with self._cond:
+            if not self._failed:
+                self._advance_skipped()
+            if self._failed or self._position != self.file_size:
+                return None
+            return {name: digester.hexdigest() for name, digester in self._digesters.items()}
+
+
+class DigestCache(SqliteStore):
+    """以 (device, inode, size, mtime_ns) 为键的持久化摘要缓存
+
+    文件被修改后 size 或 mtime_ns 改变，旧记录自然失效，重复上传、校验同一数据集时无需再次读盘。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS digests (
+        dev INTEGER NOT NULL,
+        ino INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        algorithm TEXT NOT NULL,
+        value TEXT NOT NULL,
+        PRIMARY KEY (dev, ino, size, mtime_ns, algorithm)
+    );
+    """
+
+    def lookup(self, identity, algorithms):
+        """查询缓存中已有的摘要
+
+        Returns:
+            dict: 命中的 算法名 -> 摘要
+        """
+        rows = self.query(
+            "SELECT algorithm, value FROM digests WHERE dev=? AND ino=? AND size=? AND mtime_ns=?",
+            identity
+        )
+        return {algorithm: value for algorithm, value in rows if algorithm in algorithms}
+
+    def store(self, identity, digests):
+        """写入摘要，并清理同一文件旧版本的记录"""
+        if not digests:
+            return
+        dev, ino, size, mtime_ns = identity
+        with self.transaction() as conn:
+            conn.execute(
+                "DELETE FROM digests WHERE dev=? AND ino=? AND (size!=? OR mtime_ns!=?)",
+                (dev, ino, size, mtime_ns)
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO digests (dev, ino, size, mtime_ns, algorithm, value) VALUES (?, ?, ?, ?, ?, ?)",
+                [(dev, ino, size, mtime_ns, algorithm, value) for algorithm, value in digests.items()]
+            )
+
+    def multipart_etags(self, identity):
+        """查询缓存中该文件各分片大小对应的分片上传ETag
+
+        Returns:
+            dict: 分片大小 -> ETag
+        """
+        rows = self.query(
+            "SELECT algorithm, value FROM digests WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND algorithm LIKE 'etag:%'",
+            identity
+        )
+        return {int(algorithm.split(":", 1)[1]): value for algorithm, value in rows}
+
+    def get_multipart_etag(self, file_path, remote_etag):
+        """计算与远程ETag对应的本地分片上传ETag
+
+        先查缓存中上传时记录的ETag（已知分片大小），再按分片数量推断的候选分片大小逐个计算，
+        计算结果写入缓存。
+
+        Args:
+            file_path: 文件路径
+            remote_etag: 远程对象的ETag（形如 "<md5>-<分片数>"）
+
+        Returns:
+            str or None: 与远程ETag一致的本地ETag；无法匹配时返回最后一次计算的结果，无候选时返回 None
+        """
+        part_count = parse_multipart_etag(remote_etag)
+        if part_count is None:
+            return None
+        remote_etag = remote_etag.strip('"')
+        identity = file_identity(file_path)
+        cached = self.multipart_etags(identity)
+        for etag in cached.values():
+            if etag == remote_etag:
+                return etag
+        local_etag = None
+        for part_size in candidate_part_sizes(identity[2], part_count):
+            local_etag = cached.get(part_size)
+            if local_etag is None:
+                local_etag = compute_multipart_etag(file_path, part_size)
+                self.store_if_unchanged(file_path, identity, {multipart_etag_algorithm(part_size): local_etag})
+            if local_etag == remote_etag:
+                break
+        return local_etag
+
+    def store_if_unchanged(self, file_path, identity, digests):
+        """文件在计算摘要期间未被修改时写入缓存（用于上传时顺带计算的摘要）"""
+        if digests and file_identity(file_path) == identity:
+            self.store(identity, digests)
+
+    def get_digests(self, file_path, algorithms=("md5",)):
+        """获取文件摘要，未命中的算法单次读取文件一并计算后写入缓存
+
+        Args:
+            file_path: 文件路径
+            algorithms: 需要的摘要算法列表
+
+        Returns:
+            dict: 算法名 -> 摘要
+        """
+        identity = file_identity(file_path)
+        digests = self.lookup(identity, algorithms)
+        missing = [algorithm for algorithm in algorithms if algorithm not in digests]
+        if missing:
+            computed = compute_digests(file_path, missing)
+            digests.update(computed)
+            # 计算期间文件被修改则不写入缓存
+            self.store_if_unchanged(file_path, identity, computed)
+        return digests
+
+
+def get_digest_cache(db_path):
+    """获取进程内共享的摘要缓存实例"""
+    return open_store(DigestCache, db_path)
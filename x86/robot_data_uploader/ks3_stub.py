@@ -0,0 +1,617 @@
+"""本地KS3替身服务：内存中的对象存储，实现上传器用到的接口子集，用于离线测试和性能分析
+
+支持的接口（以路径方式访问存储桶，/<bucket>/<key>）：
+- PUT 上传对象（含 x-kss-copy-source 服务端复制）、HEAD / GET / DELETE 对象（GET 支持 Range）
+- 分片上传：初始化、上传分片、列举分片、列举未完成的分片上传、完成、取消
+- GET 存储桶列举对象（prefix / delimiter / marker / max-keys）、HEAD 存储桶
+
+不校验签名，只要求请求带有 Authorization 头；存储桶不存在时自动创建。
+可设置每个请求的附加时延和带宽上限，模拟真实线路；可让指定操作返回错误（fail），测试重试和续传等失败路径。
+离线测试见 tests/（python -m pytest tests）。
+
+用法:
+    python -m robot_data_uploader.ks3_stub --port 9000 --latency 0.02 --bandwidth 50
+    KS3_ENDPOINT_OVERRIDE=127.0.0.1:9000 python -m robot_data_uploader ...
+
+也可在进程内启动:
+    with Ks3Stub(latency=0.02) as stub:
+        stub.configure()  # 之后新建的KS3连接指向该服务
+        ...
+"""
+import argparse
+import base64
+import bisect
+import fnmatch
+import hashlib
+import threading
+import time
+import uuid
+from collections import Counter
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, unquote_plus, urlsplit
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from ks3.utils import Crc64
+
+from robot_data_uploader import config
+from robot_data_uploader.bandwidth import TokenBucket
+from robot_data_uploader.digest_cache import digest_bytes
+
+_IO_CHUNK = 64 * 1024
+_META_PREFIX = "x-kss-meta-"
+_STORED_HEADERS = ("content-type", "content-encoding", "content-disposition", "cache-control")
+_MAX_KEYS = 1000
+_CRC64_HEADER = "x-kss-checksum-crc64ecma"
+
+
+class StubError(Exception):
+    """以 KS3 错误响应（<Error> XML）返回给客户端的错误"""
+
+    def __init__(self, status, code, message=""):
+        super().__init__(f"{status} {code}: {message}")
+        self.status = status
+        self.code = code
+        self.message = message
+
+    def body(self, resource):
+        return _xml("Error", [("Code", self.code), ("Message", self.message), ("Resource", resource)])
+
+
+class StubObject:
+    """存储的对象：内容、ETag、CRC64、修改时间和需要原样返回的请求头（Content-Type、x-kss-meta-* 等）"""
+
+    __slots__ = ("data", "etag", "crc64", "headers", "last_modified")
+
+    def __init__(self, data, etag, crc64, headers, last_modified=None):
+        self.data = data
+        self.etag = etag
+        self.crc64 = crc64
+        self.headers = headers
+        self.last_modified = time.time() if last_modified is None else last_modified
+
+
+class _MultipartUpload:
+    __slots__ = ("bucket", "key", "headers", "initiated", "parts")
+
+    def __init__(self, bucket, key, headers):
+        self.bucket = bucket
+        self.key = key
+        self.headers = headers
+        self.initiated = time.time()
+        self.parts = {}  # 分片号 -> StubObject
+
+
+def _xml(root, children):
+    """生成简单的响应 XML，children 为 (标签, 文本或子元素列表) 列表"""
+    def render(items):
+        out = []
+        for tag, value in items:
+            if isinstance(value, list):
+                out.append(f"<{tag}>{render(value)}</{tag}>")
+            else:
+                out.append(f"<{tag}>{escape(str(value))}</{tag}>")
+        return "".join(out)
+    return f'<?xml version="1.0" encoding="UTF-8"?><{root}>{render(children)}</{root}>'.encode("utf-8")
+
+
+def _iso_time(timestamp):
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(timestamp))
+
+
+def _stored_headers(headers):
+    """请求头中需要随对象保存的部分，名称统一小写（SDK 按小写前缀匹配 x-kss-meta-*）"""
+    stored = {}
+    for name, value in headers.items():
+        name = name.lower()
+        if name in _STORED_HEADERS or name.startswith(_META_PREFIX):
+            stored[name] = value
+    return stored
+
+
+def _receive(body, headers, stored_headers):
+    """校验 Content-MD5 并生成对象（ETag 为 MD5，同时计算 SDK 校验用的 CRC64）"""
+    digests = digest_bytes(body, ("md5", "crc64"))
+    content_md5 = headers.get("Content-MD5")
+    if content_md5 and base64.b64decode(content_md5) != bytes.fromhex(digests["md5"]):
+        raise StubError(400, "BadDigest", "Content-MD5 与请求体不一致")
+    return StubObject(body, f'"{digests["md5"]}"', digests["crc64"], stored_headers)
+
+
+class Ks3Stub:
+    """内存中的KS3替身服务
+
+    对象保存在进程内存中，服务停止后丢弃。requests 按操作统计请求数，供测试断言和性能分析；
+    fail() 可让指定操作返回错误。
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, bandwidth=None):
+        """
+        Args:
+            host: 监听地址
+            port: 监听端口，0 表示自动选择空闲端口
+            latency: 每个请求的附加时延（秒），在读完请求体后、返回响应前等待
+            bandwidth: 带宽上限（字节/秒），上传和下载方向分别限速，0 或 None 表示不限速
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.objects = {}   # (bucket, key) -> StubObject
+        self.uploads = {}   # upload_id -> _MultipartUpload
+        self.requests = Counter()
+        self.faults = []    # fail() 注入的错误：[操作, 对象键规则, 剩余次数, 状态码, 错误码]
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self._keys = {}     # bucket -> 排序的对象键列表，列举时二分查找
+        self._lock = threading.Lock()
+        self._ingress = TokenBucket(bandwidth)
+        self._egress = TokenBucket(bandwidth)
+        self._server = None
+        self._thread = None
+
+    @property
+    def address(self):
+        """"host:port"，可直接用作 config.KS3_ENDPOINT_OVERRIDE"""
+        return f"{self.host}:{self.port}"
+
+    def _bind(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self.port = self._server.server_address[1]
+
+    def start(self):
+        """在后台线程中启动服务"""
+        self._bind()
+        # 缩短轮询间隔，stop() 无需等待 0.5 秒
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05},
+                                        name="ks3-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def serve_forever(self):
+        """在当前线程中运行服务（命令行使用）"""
+        self._bind()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def configure(self):
+        """让上传器改用本服务（之后新建的KS3连接和 asyncio 客户端生效）"""
+        config.use_endpoint(self.address, endpoint_type="本地替身服务")
+
+    def set_bandwidth(self, bandwidth):
+        """运行时调整带宽上限（字节/秒）"""
+        self._ingress.set_rate(bandwidth)
+        self._egress.set_rate(bandwidth)
+
+    def reset(self):
+        """清空所有对象、未完成的分片上传、统计和注入的错误"""
+        with self._lock:
+            self.objects.clear()
+            self.uploads.clear()
+            self._keys.clear()
+            self.requests.clear()
+            self.faults.clear()
+            self.bytes_received = self.bytes_sent = 0
+
+    def get_object(self, bucket, key):
+        """读取对象内容，不存在时返回 None"""
+        with self._lock:
+            obj = self.objects.get((bucket, key))
+        return None if obj is None else obj.data
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    # ---------- 请求处理 ----------
+
+    def handle(self, method, bucket, key, query, headers, body):
+        """处理一个请求
+
+        Returns:
+            tuple: (状态码, 响应头, 响应体)
+
+        Raises:
+            StubError: 以错误响应返回
+        """
+        operation, handler = self._route(method, bucket, key, query, headers, body)
+        self._raise_injected_fault(operation, key)
+        return handler()
+
+    def _route(self, method, bucket, key, query, headers, body):
+        """确定请求对应的操作
+
+        Returns:
+            tuple: (操作名称, 处理函数)
+        """
+        if not bucket:
+            raise StubError(405, "MethodNotAllowed", "不支持列举存储桶")
+        if not key:
+            if method == "HEAD":
+                return "HeadBucket", lambda: self._count("HeadBucket", 200, {}, b"")
+            if method == "GET" and "uploads" in query:
+                return "ListMultipartUploads", lambda: self._list_multipart_uploads(bucket, query)
+            if method == "GET":
+                return "ListObjects", lambda: self._list_objects(bucket, query)
+            raise StubError(405, "MethodNotAllowed", f"不支持的存储桶操作: {method}")
+        if method == "PUT":
+            if "partNumber" in query:
+                return "UploadPart", lambda: self._upload_part(bucket, key, query, headers, body)
+            if headers.get("x-kss-copy-source"):
+                return "CopyObject", lambda: self._copy_object(bucket, key, headers)
+            return "PutObject", lambda: self._put_object(bucket, key, headers, body)
+        if method == "POST" and "uploads" in query:
+            return "InitiateMultipartUpload", lambda: self._initiate_multipart(bucket, key, headers)
+        if method == "POST" and "uploadId" in query:
+            return "CompleteMultipartUpload", lambda: self._complete_multipart(bucket, key, query, body)
+        if method == "GET" and "uploadId" in query:
+            return "ListParts", lambda: self._list_parts(bucket, key, query)
+        if method in ("GET", "HEAD"):
+            return ("GetObject" if method == "GET" else "HeadObject",
+                    lambda: self._get_object(bucket, key, headers, method))
+        if method == "DELETE" and "uploadId" in query:
+            return "AbortMultipartUpload", lambda: self._abort_multipart(query)
+        if method == "DELETE":
+            return "DeleteObject", lambda: self._delete_object(bucket, key)
+        raise StubError(405, "MethodNotAllowed", f"不支持的对象操作: {method}")
+
+    def fail(self, operation, times=1, key=None, status=500, code="InternalError"):
+        """让之后的请求返回错误，用于测试重试、断点续传等失败路径
+
+        Args:
+            operation: 操作名称（与 requests 的统计键相同，如 "UploadPart"、"PutObject"）
+            times: 返回错误的次数，None 表示一直返回错误
+            key: 只对匹配该规则（fnmatch）的对象键生效，默认所有对象
+            status: HTTP 状态码
+            code: KS3 错误码
+        """
+        with self._lock:
+            self.faults.append([operation, key, times, status, code])
+
+    def _raise_injected_fault(self, operation, key):
+        with self._lock:
+            for fault in self.faults:
+                fault_operation, pattern, remaining, status, code = fault
+                if fault_operation != operation or (pattern is not None and not fnmatch.fnmatchcase(key, pattern)):
+                    continue
+                if remaining is not None:
+                    if remaining <= 0:
+                        continue
+                    fault[2] = remaining - 1
+                self.requests[operation + ".Failed"] += 1
+                raise StubError(status, code, "注入的错误")
+
+    def _count(self, operation, status, headers, body):
+        with self._lock:
+            self.requests[operation] += 1
+        return status, headers, body
+
+    def _store(self, bucket, key, obj):
+        with self._lock:
+            if (bucket, key) not in self.objects:
+                bisect.insort(self._keys.setdefault(bucket, []), key)
+            self.objects[(bucket, key)] = obj
+
+    def _put_object(self, bucket, key, headers, body):
+        obj = _receive(body, headers, _stored_headers(headers))
+        self._store(bucket, key, obj)
+        return self._count("PutObject", 200, {"ETag": obj.etag, _CRC64_HEADER: obj.crc64}, b"")
+
+    def _copy_object(self, bucket, key, headers):
+        source = unquote_plus(headers["x-kss-copy-source"].split("?", 1)[0]).lstrip("/")
+        source_bucket, _, source_key = source.partition("/")
+        with self._lock:
+            src = self.objects.get((source_bucket, source_key))
+        if src is None:
+            raise StubError(404, "NoSuchKey", f"复制源不存在: {source}")
+        if headers.get("x-kss-metadata-directive", "COPY").upper() == "REPLACE":
+            stored = _stored_headers(headers)
+        else:
+            stored = dict(src.headers)
+        obj = StubObject(src.data, src.etag, src.crc64, stored)
+        self._store(bucket, key, obj)
+        body = _xml("CopyObjectResult", [("LastModified", _iso_time(obj.last_modified)), ("ETag", obj.etag)])
+        return self._count("CopyObject", 200, {"Content-Type": "application/xml"}, body)
+
+    def _get_object(self, bucket, key, headers, method):
+        with self._lock:
+            obj = self.objects.get((bucket, key))
+        if obj is None:
+            raise StubError(404, "NoSuchKey", f"对象不存在: {key}")
+        response_headers = {
+            "Content-Type": "application/octet-stream",
+            "ETag": obj.etag,
+            _CRC64_HEADER: obj.crc64,
+            "Last-Modified": formatdate(obj.last_modified, usegmt=True),
+            "Accept-Ranges": "bytes",
+        }
+        response_headers.update(obj.headers)
+        data = obj.data
+        status = 200
+        byte_range = headers.get("Range")
+        if byte_range and method == "GET":
+            start, end = self._parse_range(byte_range, len(data))
+            response_headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            del response_headers[_CRC64_HEADER]
+            data = data[start:end + 1]
+            status = 206
+        if method == "HEAD":
+            response_headers["Content-Length"] = str(len(data))
+            return self._count("HeadObject", 200, response_headers, b"")
+        return self._count("GetObject", status, response_headers, data)
+
+    @staticmethod
+    def _parse_range(value, size):
+        """解析单个 bytes=a-b / bytes=a- / bytes=-n 区间"""
+        unit, _, spec = value.partition("=")
+        first, _, last = spec.partition("-")
+        try:
+            if unit.strip() != "bytes" or "," in spec:
+                raise ValueError(value)
+            if first:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+            else:
+                start, end = max(0, size - int(last)), size - 1
+        except ValueError:
+            raise StubError(400, "InvalidArgument", f"无法解析的 Range: {value}")
+        if start > end or start >= size:
+            raise StubError(416, "InvalidRange", f"Range 超出对象大小: {value}")
+        return start, end
+
+    def _delete_object(self, bucket, key):
+        with self._lock:
+            if self.objects.pop((bucket, key), None) is not None:
+                keys = self._keys[bucket]
+                del keys[bisect.bisect_left(keys, key)]
+        return self._count("DeleteObject", 204, {}, b"")
+
+    def _list_objects(self, bucket, query):
+        prefix = query.get("prefix", [""])[0]
+        delimiter = query.get("delimiter", [""])[0]
+        marker = query.get("marker", [""])[0]
+        max_keys = min(int(query.get("max-keys", [_MAX_KEYS])[0] or _MAX_KEYS), _MAX_KEYS)
+        contents, common_prefixes = [], []
+        truncated, next_marker = False, ""
+        with self._lock:
+            keys = self._keys.get(bucket, [])
+            i = bisect.bisect_right(keys, marker) if marker >= prefix else bisect.bisect_left(keys, prefix)
+            while i < len(keys) and keys[i].startswith(prefix):
+                name = keys[i]
+                if len(contents) + len(common_prefixes) >= max_keys:
+                    truncated = True
+                    break
+                pos = name.find(delimiter, len(prefix)) if delimiter else -1
+                if pos >= 0:
+                    # 同一公共前缀下的对象合并为一项，marker 为该前缀时整体跳过
+                    common = name[:pos + len(delimiter)]
+                    if common != marker:
+                        common_prefixes.append(("CommonPrefixes", [("Prefix", common)]))
+                        next_marker = common
+                    while i < len(keys) and keys[i].startswith(common):
+                        i += 1
+                    continue
+                obj = self.objects[(bucket, name)]
+                contents.append(("Contents", [
+                    ("Key", name), ("LastModified", _iso_time(obj.last_modified)), ("ETag", obj.etag),
+                    ("Size", len(obj.data)), ("StorageClass", "STANDARD")]))
+                next_marker = name
+                i += 1
+        children = [("Name", bucket), ("Prefix", prefix), ("Marker", marker), ("MaxKeys", max_keys),
+                    ("Delimiter", delimiter), ("IsTruncated", "true" if truncated else "false")]
+        if truncated:
+            children.append(("NextMarker", next_marker))
+        body = _xml("ListBucketResult", children + contents + common_prefixes)
+        return self._count("ListObjects", 200, {"Content-Type": "application/xml"}, body)
+
+    def _initiate_multipart(self, bucket, key, headers):
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.uploads[upload_id] = _MultipartUpload(bucket, key, _stored_headers(headers))
+        body = _xml("InitiateMultipartUploadResult", [("Bucket", bucket), ("Key", key), ("UploadId", upload_id)])
+        return self._count("InitiateMultipartUpload", 200, {"Content-Type": "application/xml"}, body)
+
+    def _get_upload(self, query):
+        upload_id = query["uploadId"][0]
+        with self._lock:
+            upload = self.uploads.get(upload_id)
+        if upload is None:
+            raise StubError(404, "NoSuchUpload", f"分片上传不存在: {upload_id}")
+        return upload
+
+    def _upload_part(self, bucket, key, query, headers, body):
+        upload = self._get_upload(query)
+        part_number = int(query["partNumber"][0])
+        part = _receive(body, headers, {})
+        with self._lock:
+            upload.parts[part_number] = part
+        return self._count("UploadPart", 200, {"ETag": part.etag, _CRC64_HEADER: part.crc64}, b"")
+
+    def _list_parts(self, bucket, key, query):
+        upload = self._get_upload(query)
+        with self._lock:
+            parts = sorted(upload.parts.items())
+        children = [("Bucket", bucket), ("Key", key), ("UploadId", query["uploadId"][0]),
+                    ("PartNumberMarker", 0), ("NextPartNumberMarker", parts[-1][0] if parts else 0),
+                    ("MaxParts", _MAX_KEYS), ("IsTruncated", "false")]
+        children.extend(("Part", [("PartNumber", number), ("LastModified", _iso_time(part.last_modified)),
+                                  ("ETag", part.etag), ("Size", len(part.data))])
+                        for number, part in parts)
+        body = _xml("ListPartsResult", children)
+        return self._count("ListParts", 200, {"Content-Type": "application/xml"}, body)
+
+    def _list_multipart_uploads(self, bucket, query):
+        prefix = query.get("prefix", [""])[0]
+        with self._lock:
+            uploads = sorted(((upload.key, upload.initiated, upload_id) for upload_id, upload in self.uploads.items()
+                              if upload.bucket == bucket and upload.key.startswith(prefix)))
+        children = [("Bucket", bucket), ("KeyMarker", ""), ("UploadIdMarker", ""), ("Prefix", prefix),
+                    ("MaxUploads", _MAX_KEYS), ("IsTruncated", "false")]
+        children.extend(("Upload", [("Key", key), ("UploadId", upload_id), ("Initiated", _iso_time(initiated)),
+                                    ("StorageClass", "STANDARD")])
+                        for key, initiated, upload_id in uploads)
+        body = _xml("ListMultipartUploadsResult", children)
+        return self._count("ListMultipartUploads", 200, {"Content-Type": "application/xml"}, body)
+
+    def _complete_multipart(self, bucket, key, query, body):
+        upload = self._get_upload(query)
+        try:
+            requested = [(int(part.findtext("PartNumber")), part.findtext("ETag").strip().strip('"'))
+                         for part in ElementTree.fromstring(body).iter("Part")]
+        except (ElementTree.ParseError, TypeError, ValueError):
+            raise StubError(400, "MalformedXML", "无法解析的分片列表")
+        if not requested or [number for number, _ in requested] != sorted({number for number, _ in requested}):
+            raise StubError(400, "InvalidPartOrder", "分片列表为空或分片号未按升序排列")
+        with self._lock:
+            parts = []
+            for number, etag in requested:
+                part = upload.parts.get(number)
+                if part is None or part.etag.strip('"') != etag:
+                    raise StubError(400, "InvalidPart", f"分片不存在或 ETag 不一致: {number}")
+                parts.append(part)
+            self.uploads.pop(query["uploadId"][0], None)
+        # 与 KS3/S3 一致：多段对象的 ETag 为各分片 MD5 拼接后的 MD5 加分片数
+        combined = hashlib.md5(b"".join(bytes.fromhex(part.etag.strip('"')) for part in parts))
+        etag = f'"{combined.hexdigest()}-{len(parts)}"'
+        crc, combiner = 0, Crc64()
+        for part in parts:
+            crc = combiner.combine(crc, int(part.crc64), len(part.data))
+        obj = StubObject(b"".join(part.data for part in parts), etag, str(crc), upload.headers)
+        self._store(bucket, key, obj)
+        result = _xml("CompleteMultipartUploadResult", [
+            ("Location", f"/{bucket}/{key}"), ("Bucket", bucket), ("Key", key), ("ETag", etag),
+            ("ChecksumCRC64ECMA", obj.crc64)])
+        return self._count("CompleteMultipartUpload", 200,
+                           {"Content-Type": "application/xml", _CRC64_HEADER: obj.crc64}, result)
+
+    def _abort_multipart(self, query):
+        self._get_upload(query)
+        with self._lock:
+            self.uploads.pop(query["uploadId"][0], None)
+        return self._count("AbortMultipartUpload", 204, {}, b"")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """把 HTTP 请求转给 Ks3Stub.handle，支持 HTTP/1.1 长连接"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "KS3Stub"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_HEAD(self):
+        self._dispatch("HEAD")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _read_body(self, stub):
+        chunks = []
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            while True:
+                size = int(self.rfile.readline().split(b";", 1)[0], 16)
+                if not size:
+                    # 跳过 trailer
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(self._read_exact(stub, size))
+                self.rfile.readline()
+        else:
+            remaining = int(self.headers.get("Content-Length") or 0)
+            while remaining:
+                chunk = self._read_exact(stub, min(remaining, _IO_CHUNK))
+                chunks.append(chunk)
+                remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def _read_exact(self, stub, size):
+        data = self.rfile.read(size)
+        if len(data) != size:
+            raise ConnectionError("请求体不完整")
+        stub._ingress.consume(size)
+        with stub._lock:
+            stub.bytes_received += size
+        return data
+
+    def _dispatch(self, method):
+        stub = self.server.stub
+        url = urlsplit(self.path)
+        bucket, _, key = url.path.lstrip("/").partition("/")
+        bucket, key = unquote(bucket), unquote(key)
+        query = parse_qs(url.query, keep_blank_values=True)
+        try:
+            body = self._read_body(stub) if method in ("PUT", "POST") else b""
+        except (ConnectionError, ValueError):
+            self.close_connection = True
+            return
+        if stub.latency:
+            time.sleep(stub.latency)
+        try:
+            if not self.headers.get("Authorization"):
+                raise StubError(403, "AccessDenied", "请求未签名")
+            status, headers, payload = stub.handle(method, bucket, key, query, self.headers, body)
+        except StubError as e:
+            status, headers, payload = e.status, {"Content-Type": "application/xml"}, e.body(url.path)
+        self._respond(stub, status, headers, payload, method == "HEAD")
+
+    def _respond(self, stub, status, headers, payload, head):
+        self.send_response(status)
+        self.send_header("x-kss-request-id", uuid.uuid4().hex)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if "Content-Length" not in headers:
+            self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if head or not payload:
+            return
+        view = memoryview(payload)
+        for offset in range(0, len(view), _IO_CHUNK):
+            chunk = view[offset:offset + _IO_CHUNK]
+            stub._egress.consume(len(chunk))
+            self.wfile.write(chunk)
+        with stub._lock:
+            stub.bytes_sent += len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地KS3替身服务（内存对象存储），用于离线测试和性能分析")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=9000, help="监听端口")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的附加时延（秒）")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="带宽上限（MB/s），0 表示不限速")
+    args = parser.parse_args()
+
+    stub = Ks3Stub(args.host, args.port, latency=args.latency, bandwidth=int(args.bandwidth * 1024 * 1024))
+    print(f"KS3替身服务: http://{args.host}:{args.port}  (KS3_ENDPOINT_OVERRIDE={args.host}:{args.port})")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
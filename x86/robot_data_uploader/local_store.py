@@ -0,0 +1,86 @@
+"""基于SQLite的本地持久化存储"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+def file_identity(file_path=None, stat_result=None):
+    """根据文件的 stat 信息生成文件身份标识
+
+    文件内容被修改后 size 或 mtime_ns 会随之变化，因此该标识可用于判断缓存是否失效，
+    而无需重新读取文件内容。
+
+    Args:
+        file_path: 文件路径（未提供 stat_result 时使用）
+        stat_result: 已有的 os.stat_result，可避免重复 stat
+
+    Returns:
+        tuple: (st_dev, st_ino, st_size, st_mtime_ns)
+    """
+    st = stat_result if stat_result is not None else os.stat(file_path)
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class SqliteStore:
+    """SQLite存储基类
+
+    使用 WAL 模式，每个线程持有独立的数据库连接，写操作通过 busy_timeout 等待，
+    同一主机上的多个上传进程可以安全地共享同一个数据库文件。
+    子类通过 SCHEMA 定义表结构。
+    """
+
+    SCHEMA = ""
+    BUSY_TIMEOUT = 30  # 秒
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        if not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+        self._local = threading.local()
+        # executescript 自带提交，建表语句均为 IF NOT EXISTS，可重复执行
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.BUSY_TIMEOUT * 1000)}")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """写事务，异常时自动回滚"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def query(self, sql, params=()):
+        """执行只读查询，返回所有结果行"""
+        return self._connection().execute(sql, params).fetchall()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(store_cls, db_path):
+    """获取进程内共享的存储实例（同一类型、同一路径只打开一次）"""
+    store_key = (store_cls, os.path.abspath(db_path))
+    with _stores_lock:
+        store = _stores.get(store_key)
+        if store is None:
+            store = store_cls(store_key[1])
+            _stores[store_key] = store
+        return store
@@ -0,0 +1,109 @@
+"""分片大小选择：根据文件大小、实测往返时延和吞吐量确定每个文件的分片大小"""
+import threading
+
+from robot_data_uploader import config
+
+_MIB = 1024 * 1024
+
+
+class TransferStats:
+    """上传请求耗时统计（指数加权平均）
+
+    小请求（不超过 SMALL_REQUEST 字节）的耗时近似为往返时延（RTT）；
+    大请求扣除往返时延后得到单连接吞吐量。
+    """
+
+    SMALL_REQUEST = 256 * 1024  # 字节
+    ALPHA = 0.2  # 指数加权系数
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rtt = None  # 秒
+        self.throughput = None  # 字节/秒（单个连接）
+
+    def _ewma(self, current, sample):
+        return sample if current is None else current + self.ALPHA * (sample - current)
+
+    def record(self, nbytes, elapsed):
+        """记录一次上传请求
+
+        Args:
+            nbytes: 请求体字节数
+            elapsed: 请求耗时（秒）
+        """
+        if elapsed is None or elapsed <= 0:
+            return
+        with self._lock:
+            if nbytes <= self.SMALL_REQUEST:
+                self.rtt = self._ewma(self.rtt, elapsed)
+            else:
+                transfer_time = max(elapsed - (self.rtt or 0), elapsed * 0.1)
+                self.throughput = self._ewma(self.throughput, nbytes / transfer_time)
+
+    def snapshot(self):
+        """返回 (rtt, throughput)，尚无样本的项为 None"""
+        with self._lock:
+            return self.rtt, self.throughput
+
+
+_transfer_stats = TransferStats()
+
+
+def get_transfer_stats():
+    """获取进程内共享的上传耗时统计"""
+    return _transfer_stats
+
+
+def _round_up_part_size(size):
+    """向上取整到 2 的幂次 MiB，便于校验时按常用分片大小推断"""
+    part_size = _MIB
+    while part_size < size:
+        part_size *= 2
+    return part_size
+
+
+def _buffer_part_size_cap(part_concurrency, buffer_limit):
+    """在途分片内存上限内仍能同时上传 part_concurrency 个分片的最大分片大小（向下取整到 2 的幂次 MiB）"""
+    if not buffer_limit:
+        return config.MAX_PART_SIZE
+    cap = buffer_limit // max(1, part_concurrency)
+    part_size = _MIB
+    while part_size * 2 <= cap:
+        part_size *= 2
+    return max(part_size, config.PART_SIZE)
+
+
+def choose_part_size(file_size, stats=None, part_concurrency=None, buffer_limit=None):
+    """为文件选择分片大小
+
+    依次考虑：
+    1. 不小于 config.PART_SIZE
+    2. 分片数不超过 config.TARGET_PART_COUNT（文件越大分片越大，减少请求往返次数）
+    3. 单个分片的传输时间不少于往返时延的 config.PART_RTT_FACTOR 倍（请求开销占比小）
+    以上结果不超过 config.MAX_PART_SIZE，也不超过 buffer_limit // part_concurrency，
+    避免大文件因分片过大而在内存上限内只能逐片串行上传；
+    但为满足 config.MAX_PART_COUNT 的硬性限制，可以超过这两个上限。
+    超过 config.PART_SIZE 时向上取整到 2 的幂次 MiB。
+
+    Args:
+        file_size: 文件大小（字节）
+        stats: TransferStats，提供实测的往返时延和吞吐量，为空时只按文件大小选择
+        part_concurrency: 单文件内并发上传的分片数，默认取 config.PART_CONCURRENCY
+        buffer_limit: 单文件在途分片的内存上限（字节），默认取 config.PART_BUFFER_LIMIT
+
+    Returns:
+        int: 分片大小（字节）
+    """
+    wanted = -(-file_size // config.TARGET_PART_COUNT)
+    if stats is not None:
+        rtt, throughput = stats.snapshot()
+        if rtt and throughput:
+            wanted = max(wanted, int(throughput * rtt * config.PART_RTT_FACTOR))
+    part_concurrency = config.PART_CONCURRENCY if part_concurrency is None else part_concurrency
+    buffer_limit = config.PART_BUFFER_LIMIT if buffer_limit is None else buffer_limit
+    wanted = min(wanted, config.MAX_PART_SIZE, _buffer_part_size_cap(part_concurrency, buffer_limit))
+    # 分片数量上限为硬性限制
+    wanted = max(wanted, -(-file_size // config.MAX_PART_COUNT))
+    if wanted <= config.PART_SIZE:
+        return config.PART_SIZE
+    return _round_up_part_size(wanted)
@@ -0,0 +1,198 @@
+"""上传进度上报：上传线程只更新内存中的计数，后台线程按固定间隔合并后通知平台和本地监听者"""
+import queue
+import threading
+import time
+
+from robot_data_uploader import config
+
+
+def latest_only_queue(maxsize=1):
+    """创建只保留最新进度的队列及对应的监听函数
+
+    队列已满时丢弃最旧的进度再放入新进度，消费者（如服务端推送）处理慢时不会积压，也不会阻塞上报线程。
+
+    Returns:
+        tuple: (queue.Queue, 监听函数)
+    """
+    progress_queue = queue.Queue(maxsize=max(1, maxsize))
+
+    def put_latest(snapshot):
+        while True:
+            try:
+                progress_queue.put_nowait(snapshot)
+                return
+            except queue.Full:
+                try:
+                    progress_queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    return progress_queue, put_latest
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """按最近秩法计算分位数
+
+    Args:
+        values: 数值列表
+        points: 百分位列表
+
+    Returns:
+        dict: "p50" 等 -> 分位数，values 为空时为空字典
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    return {f"p{point}": ordered[max(0, -(-len(ordered) * point // 100) - 1)] for point in points}
+
+
+class ProgressReporter:
+    """异步合并的上传进度上报器
+
+    上传线程调用 add_bytes / file_done 只在锁内更新计数，不做任何网络请求；后台线程每隔 interval 秒
+    取一次快照，进度有变化时先通知本地监听者（回调或队列），再调用 send 通知平台。
+    平台请求慢或失败只会推迟下一次上报，不影响上传线程。
+    """
+
+    def __init__(self, send=None, interval=None, listeners=None, total_files=0, total_bytes=0):
+        """
+        Args:
+            send: 通知平台的可调用对象，参数为进度快照（dict），在后台线程中调用；为空时只通知本地监听者
+            interval: 上报间隔（秒），默认取 config.PROGRESS_REPORT_INTERVAL
+            listeners: 本地监听函数列表，参数为进度快照
+            total_files: 总文件数
+            total_bytes: 总字节数
+        """
+        self._send = send
+        self.interval = config.PROGRESS_REPORT_INTERVAL if interval is None else interval
+        self._listeners = list(listeners or [])
+        self._lock = threading.Lock()
+        self._total_files = total_files
+        self._total_bytes = total_bytes
+        self._uploaded_bytes = 0
+        self._success = 0
+        self._failed = 0
+        self._skipped = 0
+        self._file_seconds = []
+        self._started_at = time.monotonic()
+        self._last_reported = None
+        self._on_close = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add_listener(self, listener):
+        """添加本地监听函数，参数为进度快照"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def subscribe(self, maxsize=1):
+        """订阅进度队列（只保留最新的 maxsize 条进度）
+
+        Returns:
+            queue.Queue: 进度快照队列，上传结束时最后一条快照的 finished 为 True
+        """
+        progress_queue, listener = latest_only_queue(maxsize)
+        self.add_listener(listener)
+        return progress_queue
+
+    def start(self):
+        """启动后台上报线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="progress-reporter", daemon=True)
+            self._thread.start()
+        return self
+
+    def add_bytes(self, nbytes):
+        """记录已上传的字节数（分片或小文件上传完成时调用）"""
+        with self._lock:
+            self._uploaded_bytes += nbytes
+
+    def file_done(self, success=True, skipped=False, elapsed=None):
+        """记录一个文件处理完成
+
+        Args:
+            elapsed: 文件从开始处理到上传完成的耗时（秒），成功上传时用于统计单文件耗时分位数
+        """
+        with self._lock:
+            if skipped:
+                self._skipped += 1
+            elif success:
+                self._success += 1
+                if elapsed is not None:
+                    self._file_seconds.append(elapsed)
+            else:
+                self._failed += 1
+
+    def snapshot(self, finished=False):
+        """当前进度快照
+
+        Returns:
+            dict: 文件数、字节数、平均速率等；最终快照另含单文件耗时分位数 file_seconds
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self._started_at
+            snapshot = {
+                "total_files": self._total_files,
+                "total_bytes": self._total_bytes,
+                "success_file_count": self._success,
+                "failed_file_count": self._failed,
+                "skipped_file_count": self._skipped,
+                "uploaded_bytes": self._uploaded_bytes,
+                "bytes_per_second": self._uploaded_bytes / elapsed if elapsed > 0 else 0.0,
+                "elapsed": elapsed,
+                "finished": finished,
+            }
+            file_seconds = list(self._file_seconds) if finished else None
+        if file_seconds is not None:
+            snapshot["file_seconds"] = percentiles(file_seconds)
+        return snapshot
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._report()
+        # 上传结束：发送最终进度，再执行完成通知
+        self._report(finished=True)
+        if self._on_close is not None:
+            try:
+                self._on_close()
+            except Exception:
+                pass
+
+    def _report(self, finished=False):
+        snapshot = self.snapshot(finished)
+        counters = (snapshot["success_file_count"], snapshot["failed_file_count"],
+                    snapshot["skipped_file_count"], snapshot["uploaded_bytes"])
+        # 进度没有变化时不重复上报
+        if not finished and counters == self._last_reported:
+            return
+        self._last_reported = counters
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(snapshot)
+            except Exception:
+                pass
+        if self._send is not None:
+            try:
+                self._send(snapshot)
+            except Exception:
+                pass
+
+    def close(self, on_close=None, timeout=None):
+        """结束上报：后台线程发送最终进度后执行 on_close（如通知平台上传完成）
+
+        最多等待 timeout 秒，超时后上报在后台继续完成，调用方不再等待。
+
+        Args:
+            on_close: 最终进度发送后调用的无参可调用对象
+            timeout: 最长等待时间（秒），默认取 config.PROGRESS_CLOSE_TIMEOUT
+
+        Returns:
+            bool: 最终进度和 on_close 是否已在超时前完成
+        """
+        self._on_close = on_close
+        self.start()
+        self._stop_event.set()
+        self._thread.join(config.PROGRESS_CLOSE_TIMEOUT if timeout is None else timeout)
+        return not self._thread.is_alive()
@@ -0,0 +1,137 @@
+"""远程对象摘要：流式计算，以及写入/读取对象元数据中的摘要"""
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from robot_data_uploader import config
+from robot_data_uploader.digest_cache import new_digesters, OrderedDigester
+from robot_data_uploader.parallel_upload import plan_parts
+
+DIGEST_META_PREFIX = "x-kss-meta-"
+
+
+class _DigestWriter:
+    """文件风格的写入对象，写入的数据直接送入摘要计算器，不在内存中保留"""
+
+    def __init__(self, algorithms):
+        self._digesters = new_digesters(algorithms)
+
+    def write(self, data):
+        for digester in self._digesters.values():
+            digester.update(data)
+
+    def flush(self):
+        pass
+
+    def hexdigests(self):
+        return {name: digester.hexdigest() for name, digester in self._digesters.items()}
+
+
+def _fetch_range(bucket, key_name, size, offset, length):
+    """下载对象中的一段数据"""
+    key = bucket.new_key(key_name)
+    key.size = size
+    buf = io.BytesIO()
+    key.get_contents_to_file(buf, byte_range=(offset, offset + length - 1))
+    data = buf.getvalue()
+    if len(data) != length:
+        raise IOError(f"下载对象 {key_name} 在偏移 {offset} 处的数据不完整: {len(data)}/{length}")
+    return data
+
+
+def stream_remote_digests(bucket, key_name, size, algorithms=("sha256",), range_size=None, range_concurrency=None):
+    """流式计算远程对象的摘要，内存占用与对象大小无关
+
+    range_concurrency 为 1 或对象不超过一个范围时，单个 GET 请求边下载边计算；
+    否则按范围并发下载，各范围按偏移顺序送入摘要计算器，同时驻留内存的数据不超过
+    range_concurrency 个范围。
+
+    Args:
+        bucket: Bucket 对象
+        key_name: 对象key
+        size: 对象大小（字节）
+        algorithms: 摘要算法列表
+        range_size: 每个范围的大小，默认取 config.REMOTE_HASH_RANGE_SIZE
+        range_concurrency: 并发下载的范围数，默认取 config.REMOTE_HASH_CONCURRENCY
+
+    Returns:
+        dict: 算法名 -> 摘要
+    """
+    range_size = range_size or config.REMOTE_HASH_RANGE_SIZE
+    range_concurrency = range_concurrency or config.REMOTE_HASH_CONCURRENCY
+
+    if range_concurrency <= 1 or size <= range_size:
+        writer = _DigestWriter(algorithms)
+        key = bucket.new_key(key_name)
+        key.size = size
+        key.get_contents_to_file(writer)
+        return writer.hexdigests()
+
+    digester = OrderedDigester(None, algorithms, size)
+
+    def fetch_and_feed(offset, length):
+        try:
+            data = _fetch_range(bucket, key_name, size, offset, length)
+        except Exception:
+            digester.fail()
+            raise
+        # 排在前面的范围未送入时在此等待，工作线程数即内存中的范围数上限
+        digester.feed(offset, data)
+
+    with ThreadPoolExecutor(max_workers=range_concurrency) as executor:
+        futures = [executor.submit(fetch_and_feed, offset, length)
+                   for _, offset, length in plan_parts(size, range_size)]
+        for future in futures:
+            future.result()
+    return digester.hexdigests()
+
+
+def digest_metadata_headers(digests, algorithms=None):
+    """生成将摘要写入对象元数据的请求头
+
+    Args:
+        digests: 算法名 -> 摘要
+        algorithms: 写入的算法，默认取 config.DIGEST_METADATA_ALGORITHMS
+
+    Returns:
+        dict: 如 {"x-kss-meta-sha256": "..."}，没有可写入的摘要时为空字典
+    """
+    if algorithms is None:
+        algorithms = config.DIGEST_METADATA_ALGORITHMS
+    if not digests:
+        return {}
+    return {DIGEST_META_PREFIX + name: digests[name] for name in algorithms if digests.get(name)}
+
+
+def read_digest_metadata(bucket, key_name):
+    """通过一次 HEAD 请求读取对象元数据中记录的摘要
+
+    Returns:
+        dict: 算法名 -> 摘要，对象没有记录摘要时为空字典
+    """
+    key = bucket.get_key(key_name, validate=True)
+    if key is None:
+        return {}
+    digests = {}
+    for name, value in (getattr(key, 'user_meta', None) or {}).items():
+        name = name.lower()
+        if name.startswith(DIGEST_META_PREFIX):
+            digests[name[len(DIGEST_META_PREFIX):]] = value
+    return digests
+
+
+def write_digest_metadata(bucket, key_name, size, digests, headers=None):
+    """上传完成后通过原地复制（REPLACE 元数据）把摘要写入对象元数据
+
+    用于分片上传：初始化分片上传时整文件摘要尚未算出。超过单次复制上限的对象不写入。
+
+    Returns:
+        bool: 是否写入
+    """
+    meta_headers = digest_metadata_headers(digests)
+    if not meta_headers or size > config.COPY_OBJECT_MAX_SIZE:
+        return False
+    copy_headers = dict(headers or {})
+    copy_headers.update(meta_headers)
+    copy_headers["x-kss-metadata-directive"] = "REPLACE"
+    bucket.copy_key(key_name, bucket.name, key_name, headers=copy_headers)
+    return True
@@ -0,0 +1,242 @@
+"""分片上传断点续传日志"""
+import time
+
+from robot_data_uploader.digest_cache import (compute_digests, OrderedDigester, multipart_etag_algorithm,
+                                              multipart_etag_from_part_md5s)
+from robot_data_uploader.local_store import SqliteStore, file_identity, open_store
+from robot_data_uploader.parallel_upload import plan_parts, make_part_info, find_multipart_upload
+
+
+class ResumeJournal(SqliteStore):
+    """基于SQLite的断点续传日志
+
+    每个分片上传任务按 (文件身份标识, 目标key) 记录一行，每完成一个分片追加一条分片记录
+    （分片号、大小、ETag、CRC64），写入代价为 O(1)，不再整体重写已完成分片列表。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS uploads (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        dev INTEGER NOT NULL,
+        ino INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        key TEXT NOT NULL,
+        upload_id TEXT NOT NULL,
+        part_size INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        UNIQUE (dev, ino, size, mtime_ns, key)
+    );
+    CREATE TABLE IF NOT EXISTS parts (
+        upload INTEGER NOT NULL,
+        part_number INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        etag TEXT,
+        crc64 TEXT,
+        PRIMARY KEY (upload, part_number)
+    );
+    """
+
+    def find(self, identity, key):
+        """查找文件对应的未完成上传记录
+
+        Args:
+            identity: 文件身份标识 (dev, ino, size, mtime_ns)
+            key: 目标对象key
+
+        Returns:
+            dict or None: {"id", "upload_id", "part_size", "parts": {part_number: {"size", "etag", "crc64"}}}
+        """
+        rows = self.query(
+            "SELECT id, upload_id, part_size FROM uploads "
+            "WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND key=?",
+            tuple(identity) + (key,)
+        )
+        if not rows:
+            return None
+        upload, upload_id, part_size = rows[0]
+        parts = {
+            part_number: {"size": size, "etag": etag, "crc64": crc64}
+            for part_number, size, etag, crc64 in self.query(
+                "SELECT part_number, size, etag, crc64 FROM parts WHERE upload=?", (upload,)
+            )
+        }
+        return {"id": upload, "upload_id": upload_id, "part_size": part_size, "parts": parts}
+
+    def begin(self, identity, key, upload_id, part_size):
+        """登记新的分片上传任务，覆盖同一文件（含旧版本）、同一key的旧记录
+
+        Returns:
+            int: 上传记录ID，用于后续追加分片
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            self._delete(conn, identity, key)
+            cursor = conn.execute(
+                "INSERT INTO uploads (dev, ino, size, mtime_ns, key, upload_id, part_size, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                tuple(identity) + (key, upload_id, part_size, now, now)
+            )
+            return cursor.lastrowid
+
+    def record_part(self, upload, part_number, size, etag=None, crc64=None):
+        """追加一个已完成的分片"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO parts (upload, part_number, size, etag, crc64) VALUES (?, ?, ?, ?, ?)",
+                (upload, part_number, size, etag, crc64)
+            )
+            conn.execute("UPDATE uploads SET updated_at=? WHERE id=?", (time.time(), upload))
+
+    def finish(self, upload):
+        """上传完成后删除记录"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM parts WHERE upload=?", (upload,))
+            conn.execute("DELETE FROM uploads WHERE id=?", (upload,))
+
+    def discard(self, identity, key):
+        """删除文件对应的上传记录"""
+        with self.transaction() as conn:
+            self._delete(conn, identity, key)
+
+    @staticmethod
+    def _delete(conn, identity, key):
+        # 同一文件旧版本（size 或 mtime 不同）的记录一并清理
+        dev, ino = identity[0], identity[1]
+        conn.execute(
+            "DELETE FROM parts WHERE upload IN (SELECT id FROM uploads WHERE dev=? AND ino=? AND key=?)",
+            (dev, ino, key)
+        )
+        conn.execute("DELETE FROM uploads WHERE dev=? AND ino=? AND key=?", (dev, ino, key))
+
+
+class JournaledUpload:
+    """一次可断点续传的分片上传
+
+    恢复顺序：
+    1. 日志中有该文件、该key的记录，且服务端对应的上传任务仍存在 -> 沿用日志中的分片大小和分片CRC
+    2. 日志中没有记录，但服务端存在该key的未完成任务 -> 由已上传分片推断分片大小，
+       并对照本地数据的MD5核对分片ETag，只保留内容一致的分片
+    3. 以上均不满足 -> 新建上传任务
+    """
+
+    def __init__(self, journal, bucket, file_path, key, part_size, headers=None):
+        self.journal = journal
+        self.bucket = bucket
+        self.file_path = file_path
+        self.key = key
+        self.part_size = part_size
+        self.headers = headers
+        self.identity = file_identity(file_path)
+        self.file_size = self.identity[2]
+        self.mp = None
+        self.upload = None
+        self.resumed = False
+        self.uploaded_parts = {}  # part_number -> size
+        self.part_etags = {}  # part_number -> ETag
+
+    def open(self):
+        """恢复或新建上传任务"""
+        record = self.journal.find(self.identity, self.key)
+        if record:
+            self.mp = find_multipart_upload(self.bucket, self.key, record["upload_id"])
+            if self.mp is None:
+                # 服务端任务已过期或已完成
+                self.journal.discard(self.identity, self.key)
+                record = None
+        else:
+            self.mp = find_multipart_upload(self.bucket, self.key)
+
+        if self.mp is not None:
+            server_parts = {part.part_number: part for part in self.mp}
+            if record:
+                self.part_size = record["part_size"]
+                self.upload = record["id"]
+                known_parts = record["parts"]
+            else:
+                self.part_size = self._infer_part_size(server_parts) or self.part_size
+                self.upload = self.journal.begin(self.identity, self.key, self.mp.id, self.part_size)
+                known_parts = {}
+            self._restore_parts(server_parts, known_parts)
+            self.resumed = True
+        else:
+            self.mp = self.bucket.initiate_multipart_upload(self.key, headers=self.headers)
+            self.upload = self.journal.begin(self.identity, self.key, self.mp.id, self.part_size)
+        return self
+
+    def _infer_part_size(self, server_parts):
+        """由服务端已上传分片推断分片大小（除最后一片外各分片大小一致）"""
+        if 1 not in server_parts:
+            return None
+        return server_parts[1].size
+
+    def _restore_parts(self, server_parts, known_parts):
+        """核对服务端已上传分片，并恢复完成上传时CRC校验所需的分片信息"""
+        expected = {part_number: size for part_number, _, size in plan_parts(self.file_size, self.part_size)}
+        for part_number, part in server_parts.items():
+            if expected.get(part_number) != part.size:
+                continue
+            known = known_parts.get(part_number)
+            if known and known["size"] == part.size and known["crc64"]:
+                crc64 = known["crc64"]
+            else:
+                digests = compute_digests(self.file_path, ("md5", "crc64"),
+                                          offset=(part_number - 1) * self.part_size, size=part.size)
+                if digests["md5"] != (part.etag or "").strip('"'):
+                    continue
+                crc64 = digests["crc64"]
+                self.journal.record_part(self.upload, part_number, part.size, part.etag, crc64)
+            self.mp.part_crc_infos[part_number] = make_part_info(part.size, crc64)
+            self.uploaded_parts[part_number] = part.size
+            self.part_etags[part_number] = part.etag
+
+    @property
+    def completed_bytes(self):
+        return sum(self.uploaded_parts.values())
+
+    def pending_parts(self):
+        """待上传的分片列表 [(part_number, offset, size), ...]"""
+        return plan_parts(self.file_size, self.part_size, skip_parts=self.uploaded_parts)
+
+    def new_digester(self, algorithms):
+        """创建上传时顺带计算整文件摘要的计算器，已上传的分片从本地文件补齐"""
+        skip_ranges = [((part_number - 1) * self.part_size, size)
+                       for part_number, size in self.uploaded_parts.items()]
+        return OrderedDigester(self.file_path, algorithms, self.file_size, skip_ranges=skip_ranges)
+
+    def record(self, part_result):
+        """记录一个刚完成的分片"""
+        self.journal.record_part(self.upload, part_result.part_number, part_result.size,
+                                 part_result.etag, part_result.crc64)
+        self.uploaded_parts[part_result.part_number] = part_result.size
+        self.part_etags[part_result.part_number] = part_result.etag
+
+    def multipart_digests(self):
+        """上传完成后由各分片ETag得到整个对象的ETag，以 etag:<分片大小> 的形式写入摘要缓存
+
+        Returns:
+            dict: {"etag:<part_size>": ETag}，分片ETag不完整时为空字典
+        """
+        part_numbers = sorted(self.part_etags)
+        if len(part_numbers) != len(self.uploaded_parts) or not all(self.part_etags.values()):
+            return {}
+        etag = multipart_etag_from_part_md5s([self.part_etags[n] for n in part_numbers])
+        return {multipart_etag_algorithm(self.part_size): etag}
+
+    def complete(self):
+        """完成上传并删除日志记录"""
+        try:
+            result = self.mp.complete_upload()
+        except Exception as e:
+            # CRC校验在服务端合并成功之后进行，此时上传任务已不存在，不能再续传
+            if "Inconsistent CRC checksum" in str(e):
+                self.journal.finish(self.upload)
+            raise
+        self.journal.finish(self.upload)
+        return result
+
+
+def get_resume_journal(db_path):
+    """获取进程内共享的断点续传日志实例"""
+    return open_store(ResumeJournal, db_path)
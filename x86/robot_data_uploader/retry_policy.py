@@ -0,0 +1,232 @@
+"""上传重试策略：错误分类、带抖动的指数退避、批次重试预算和熔断器"""
+import random
+import socket
+import threading
+import time
+
+import requests
+from ks3.exception import KS3ClientError, KS3ServerError, ParamValidationError
+
+from robot_data_uploader import config
+
+# 错误分类
+RETRYABLE = "retryable"        # 网络错误、服务端错误、限流，退避后重试
+AUTH_REFRESH = "auth_refresh"  # 凭证失效（如STS过期），刷新凭证后重试
+FATAL = "fatal"                # 参数错误、权限不足、本地文件错误，重试无意义
+
+# 服务端要求降低请求速率的错误码，按较长的基准时间退避
+SLOW_DOWN_ERROR_CODES = {"SlowDown", "TooManyRequests", "RequestLimitExceeded"}
+# 凭证相关的错误码，刷新凭证后可恢复
+AUTH_ERROR_CODES = {"InvalidAccessKeyId", "ExpiredToken", "InvalidToken", "TokenExpired",
+                    "SignatureDoesNotMatch", "AccessDenied"}
+# 4xx 中可以重试的错误码（服务端超时、分片上传任务失效后由断点续传重新发起）
+RETRYABLE_ERROR_CODES = {"RequestTimeout", "NoSuchUpload", "InvalidPart", "BadDigest"} | SLOW_DOWN_ERROR_CODES
+
+_NETWORK_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                   requests.exceptions.ChunkedEncodingError, ConnectionError, TimeoutError, socket.timeout)
+
+
+def classify_error(error):
+    """判断上传异常的类别
+
+    Args:
+        error: 上传过程中抛出的异常
+
+    Returns:
+        str: RETRYABLE / AUTH_REFRESH / FATAL
+    """
+    if isinstance(error, KS3ServerError):
+        status = error.status or 0
+        code = error.error_code
+        if code in RETRYABLE_ERROR_CODES or status in (408, 429) or status >= 500:
+            return RETRYABLE
+        if code in AUTH_ERROR_CODES or status in (401, 403):
+            return AUTH_REFRESH
+        return FATAL
+    if isinstance(error, _NETWORK_ERRORS):
+        return RETRYABLE
+    if isinstance(error, KS3ClientError):
+        # CRC 不一致等传输校验错误，重新上传即可
+        return RETRYABLE
+    if isinstance(error, (ValueError, ParamValidationError, OSError)):
+        # 路径不合法、本地文件不存在或不可读
+        return FATAL
+    # 未知异常保持原有行为：重试
+    return RETRYABLE
+
+
+def is_slow_down(error):
+    """服务端是否在要求降低请求速率（429 或 503 SlowDown）"""
+    if not isinstance(error, KS3ServerError):
+        return False
+    return error.status == 429 or error.error_code in SLOW_DOWN_ERROR_CODES
+
+
+def is_endpoint_failure(error):
+    """异常是否说明服务端不可用（连接失败、超时、5xx），用于熔断判断
+
+    服务端正常返回的 4xx 和限流响应说明服务可达，不计入熔断。
+    """
+    if isinstance(error, KS3ServerError):
+        return (error.status or 0) >= 500 and not is_slow_down(error)
+    return isinstance(error, _NETWORK_ERRORS)
+
+
+def backoff_delay(attempt, error=None, base=None, cap=None):
+    """带全抖动的指数退避时间
+
+    等待时间在 [0, min(cap, base * 2^attempt)] 内均匀随机，避免各工作线程同时重试。
+    限流响应的基准时间取 config.RETRY_SLOW_DOWN_DELAY。
+
+    Args:
+        attempt: 已失败次数（从 0 开始）
+        error: 本次失败的异常
+        base: 基准等待时间（秒），默认取 config.RETRY_BASE_DELAY
+        cap: 最长等待时间（秒），默认取 config.RETRY_MAX_DELAY
+
+    Returns:
+        float: 等待时间（秒）
+    """
+    if base is None:
+        base = config.RETRY_SLOW_DOWN_DELAY if is_slow_down(error) else config.RETRY_BASE_DELAY
+    cap = config.RETRY_MAX_DELAY if cap is None else cap
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class RetryBudget:
+    """批次重试预算：一批文件总共允许的重试次数
+
+    大面积失败时各文件很快用完预算直接失败，避免每个文件都重试满次数。
+    """
+
+    def __init__(self, total):
+        self._lock = threading.Lock()
+        self.total = max(0, int(total))
+        self._remaining = self.total
+
+    @classmethod
+    def for_batch(cls, file_count):
+        """按文件数确定预算：不少于 config.RETRY_BUDGET_MIN，按 config.RETRY_BUDGET_RATIO 随文件数增加"""
+        return cls(max(config.RETRY_BUDGET_MIN, file_count * config.RETRY_BUDGET_RATIO))
+
+    def try_spend(self):
+        """消耗一次重试机会，预算已用完时返回 False"""
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            return True
+
+    @property
+    def remaining(self):
+        with self._lock:
+            return self._remaining
+
+
+class CircuitBreaker:
+    """熔断器：服务端明显不可用时暂停所有工作线程
+
+    - 关闭：正常放行
+    - 连续 failure_threshold 次服务不可用的失败后打开：所有线程在 before_request 处等待 reset_timeout 秒
+    - 等待结束后半开：只放行一个探测请求，成功则关闭，失败则重新打开
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        """
+        Args:
+            failure_threshold: 打开熔断的连续失败次数，默认取 config.CIRCUIT_FAILURE_THRESHOLD
+            reset_timeout: 熔断持续时间（秒），默认取 config.CIRCUIT_RESET_TIMEOUT
+        """
+        self.failure_threshold = max(1, failure_threshold or config.CIRCUIT_FAILURE_THRESHOLD)
+        self.reset_timeout = config.CIRCUIT_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self._cond = threading.Condition()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+
+    @property
+    def state(self):
+        with self._cond:
+            return self._state
+
+    def _try_pass(self, now):
+        """在锁内判断本次请求能否发送，返回 0 表示放行，否则返回建议等待的时间（秒）"""
+        if self._state == self.CLOSED:
+            return 0.0
+        if self._state == self.OPEN:
+            remaining = self._opened_at + self.reset_timeout - now
+            if remaining <= 0:
+                self._state = self.HALF_OPEN
+                self._probe_started = now
+                return 0.0
+            return remaining
+        # 探测请求迟迟没有结果（如探测线程遇到其他异常）时，放行下一个探测
+        remaining = self._probe_started + self.reset_timeout - now
+        if remaining <= 0:
+            self._probe_started = now
+            return 0.0
+        return remaining
+
+    def before_request(self):
+        """请求前调用：熔断打开时阻塞等待，直到本线程可以发送请求
+
+        Returns:
+            float: 等待的时间（秒）
+        """
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                remaining = self._try_pass(time.monotonic())
+                if not remaining:
+                    break
+                self._cond.wait(remaining)
+        return time.monotonic() - start
+
+    def try_request(self):
+        """非阻塞版本的 before_request，供 asyncio 协程使用
+
+        Returns:
+            float: 0 表示可以发送请求，否则为建议等待的时间（秒），等待后需再次调用
+        """
+        with self._cond:
+            return self._try_pass(time.monotonic())
+
+    def record_success(self):
+        """服务端可达（请求成功，或返回了非服务不可用的错误）"""
+        with self._cond:
+            self._failures = 0
+            if self._state != self.CLOSED:
+                self._state = self.CLOSED
+                self._cond.notify_all()
+
+    def record_failure(self):
+        """服务端不可用的失败
+
+        Returns:
+            bool: 本次失败是否使熔断打开
+        """
+        with self._cond:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED
+                                                 and self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._cond.notify_all()
+                return True
+            return False
+
+    def record_error(self, error):
+        """按异常类型记录结果
+
+        Returns:
+            bool: 本次失败是否使熔断打开
+        """
+        if is_endpoint_failure(error):
+            return self.record_failure()
+        self.record_success()
+        return False
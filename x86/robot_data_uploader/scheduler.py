@@ -0,0 +1,110 @@
+"""批量上传文件调度"""
+import fnmatch
+import os
+import threading
+from collections import deque
+
+from robot_data_uploader import config
+
+
+class _Lane:
+    """一个优先级通道：匹配规则、调度权重和通道内的文件顺序"""
+
+    def __init__(self, name, patterns, weight=1, order="largest"):
+        self.name = name
+        self.patterns = tuple(patterns)
+        self.weight = max(1, weight)
+        self.order = order
+        self.items = deque()
+        # 步长调度的累计值，越小越先被调度；初始为一个步长，开始时权重高的通道先领取
+        self.pass_value = 1.0 / self.weight
+
+    def matches(self, relative_path):
+        return any(fnmatch.fnmatch(relative_path, pattern) for pattern in self.patterns)
+
+
+def _modified_time(item):
+    """文件修改时间（纳秒），清单条目直接取遍历时记录的值，普通元组才重新 stat"""
+    mtime_ns = getattr(item, "mtime_ns", None)
+    if mtime_ns is not None:
+        return mtime_ns
+    try:
+        return os.stat(item[0]).st_mtime_ns
+    except OSError:
+        return 0
+
+
+# 通道内的文件顺序
+_ORDER_KEYS = {
+    "smallest": lambda item: item[1],
+    "largest": lambda item: -item[1],
+    "newest": lambda item: -_modified_time(item),
+}
+
+
+class FileWorkQueue:
+    """线程安全的共享文件队列，按优先级通道调度
+
+    上传线程上传完一个文件后再领取下一个，慢文件或重试中的文件只会占住当前线程，
+    其余线程继续消费队列，整体完成时间趋近于最大单个文件的上传耗时。
+
+    文件按 config.UPLOAD_PRIORITY_LANES 分到各通道（如元数据、最新的 episode、大体积媒体文件），
+    通道之间按权重做步长调度：权重高的通道领取次数多，但权重低的通道也始终能领到文件，
+    元数据等小文件不会排在数 GB 的视频之后，数据集可以更早在平台上可见。
+    """
+
+    def __init__(self, files_info, base_dir=None, lanes=None):
+        """
+        Args:
+            files_info: 文件信息列表，每个元素为 (file_path, file_size)
+            base_dir: 数据集根目录，按相对于它的路径匹配通道规则，默认按文件路径匹配
+            lanes: 通道配置，默认取 config.UPLOAD_PRIORITY_LANES
+        """
+        lanes = config.UPLOAD_PRIORITY_LANES if lanes is None else lanes
+        self._lanes = [_Lane(**lane) for lane in lanes]
+        # 没有匹配任何通道的文件进入兜底通道：大文件优先出队，避免最后剩下一个大文件拖长尾部耗时
+        fallback = _Lane("default", ("*",), weight=1, order="largest")
+
+        assigned = {id(lane): [] for lane in self._lanes + [fallback]}
+        for item in files_info:
+            relative_path = item[0]
+            if base_dir:
+                relative_path = os.path.relpath(item[0], base_dir)
+            relative_path = relative_path.replace(os.sep, "/")
+            lane = next((lane for lane in self._lanes if lane.matches(relative_path)), fallback)
+            assigned[id(lane)].append(item)
+
+        self._lanes.append(fallback)
+        for lane in self._lanes:
+            lane.items.extend(sorted(assigned[id(lane)], key=_ORDER_KEYS.get(lane.order, _ORDER_KEYS["largest"])))
+        self._lanes = [lane for lane in self._lanes if lane.items]
+        self._lock = threading.Lock()
+
+    def get(self):
+        """领取下一个待上传文件
+
+        Returns:
+            tuple or None: (file_path, file_size)，队列为空时返回 None
+        """
+        with self._lock:
+            candidates = [lane for lane in self._lanes if lane.items]
+            if not candidates:
+                return None
+            # 步长调度：累计值最小的通道出队，每次出队累计值增加 1/权重；
+            # 累计值相同时按配置顺序，靠前的通道优先
+            lane = min(candidates, key=lambda lane: lane.pass_value)
+            lane.pass_value += 1.0 / lane.weight
+            return lane.items.popleft()
+
+    def lane_sizes(self):
+        """各通道剩余的文件数
+
+        Returns:
+            dict: {通道名称: 文件数}
+        """
+        with self._lock:
+            return {lane.name: len(lane.items) for lane in self._lanes}
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(lane.items) for lane in self._lanes)
@@ -1,18 +1,28 @@
+import io
 import os
-import json
 import time
 import requests
-import threading
 import argparse
 import sys
 import math
-import hashlib
-from filechunkio import FileChunkIO
 from concurrent.futures import ThreadPoolExecutor
 from ks3.connection import Connection
-from ks3.multipart import PartInfo
 # TODO:打包放开
 from robot_data_uploader import config
+from robot_data_uploader.parallel_upload import upload_parts_concurrently, sdk_md5
+from robot_data_uploader.bandwidth import throttled
+from robot_data_uploader.part_sizing import choose_part_size, get_transfer_stats
+from robot_data_uploader.scheduler import FileWorkQueue
+from robot_data_uploader.progress_reporter import ProgressReporter, latest_only_queue
+from robot_data_uploader.connection_pool import Ks3ConnectionPool, ks3_connection_options
+from robot_data_uploader.credentials import StsConnection, StsCredentialProvider
+from robot_data_uploader.digest_cache import get_digest_cache, digest_bytes, upload_digest_algorithms
+from robot_data_uploader.local_store import file_identity
+from robot_data_uploader.file_rules import MATCH_ALL, FileRules
+from robot_data_uploader.manifest import build_manifest, entry_identity
+from robot_data_uploader.resume_journal import JournaledUpload, get_resume_journal
+from robot_data_uploader.retry_policy import (AUTH_REFRESH, RETRYABLE, CircuitBreaker, RetryBudget,
+                                              backoff_delay, classify_error)
 # NOTE:开发调试
 # import config
 from tqdm import tqdm
@@ -106,18 +116,44 @@ class RobotDataUploader:
         # 上传工具相关参数
         self.sts_token = None
         self.connection = None
+        self.connection_pool = None
         self.resume_dir = ".upload_resume"
         self.file_filters = ["*.*"]  # "*.txt", "*.csv", "*.json", "*.dat" , "*.tar", "*.png" # 默认文件过滤器
+        # 文件过滤器与 config.FILE_SELECTION_RULES 编译成的匹配器，扫描目录时剪掉被排除的子目录
+        self.file_rules = FileRules.from_config(self.file_filters)
         self.use_direct_auth = use_direct_auth
         self.max_worker = 4
+        self.part_concurrency = config.PART_CONCURRENCY  # 单文件内并发上传的分片数
+        self.part_buffer_limit = config.PART_BUFFER_LIMIT  # 单文件在途分片内存上限
+        self.retry_budget = None  # 批量上传各线程共享的重试预算
+        self.circuit_breaker = None  # 批量上传各线程共享的熔断器
+        self.credential_provider = None  # STS凭证提供者，批量上传时各线程共享
+        self.progress_reporter = None  # 上传进度上报器，批量上传时各线程共享
+        self.progress_listeners = []  # 本地进度监听函数，参数为进度快照
         
         # 创建断点续传目录
         if not os.path.exists(self.resume_dir):
             os.makedirs(self.resume_dir)
+        # 文件摘要缓存，进程内各上传器实例共享
+        self.digest_cache = get_digest_cache(os.path.join(self.resume_dir, config.DIGEST_CACHE_FILE))
+        # 分片上传断点续传日志，同一主机上的多个上传进程可共享
+        self.resume_journal = get_resume_journal(os.path.join(self.resume_dir, config.RESUME_JOURNAL_FILE))
             
     
     def set_sts_token(self, sts_token):
         self.sts_token = sts_token
+        if self.credential_provider is not None and sts_token:
+            self.credential_provider.update(sts_token)
+    
+    def set_credential_provider(self, credential_provider):
+        """设置共享的STS凭证提供者（批量上传时各工作线程共享，凭证刷新后所有连接即时生效）"""
+        self.credential_provider = credential_provider
+    
+    def _get_credential_provider(self):
+        """获取（必要时创建）STS凭证提供者，凭证即将过期时通过 STS_PATH 自动刷新"""
+        if self.credential_provider is None:
+            self.credential_provider = StsCredentialProvider(self._request_sts_token, sts_token=self.sts_token)
+        return self.credential_provider
     
     def set_eai_token(self, eai_token):
         self.eai_token = eai_token
@@ -125,86 +161,118 @@ class RobotDataUploader:
     def set_max_worker(self, max_worker):
         self.max_worker = max_worker
         
+    def set_part_concurrency(self, part_concurrency, buffer_limit=None):
+        """设置单文件内并发上传的分片数及在途分片内存上限"""
+        self.part_concurrency = max(1, part_concurrency)
+        if buffer_limit is not None:
+            self.part_buffer_limit = buffer_limit
+        
+    def set_retry_policy(self, retry_budget=None, circuit_breaker=None):
+        """设置重试预算和熔断器（批量上传时各工作线程共享）"""
+        self.retry_budget = retry_budget
+        self.circuit_breaker = circuit_breaker
+    
+    def set_progress_reporter(self, progress_reporter):
+        """设置进度上报器（批量上传时各工作线程共享）"""
+        self.progress_reporter = progress_reporter
+    
+    def add_progress_listener(self, listener):
+        """添加本地进度监听函数，上传期间按 config.PROGRESS_REPORT_INTERVAL 收到进度快照（在上报线程中调用）"""
+        self.progress_listeners.append(listener)
+    
+    def subscribe_progress(self, maxsize=1):
+        """订阅上传进度队列，只保留最新的 maxsize 条快照，上传结束时最后一条快照的 finished 为 True"""
+        progress_queue, listener = latest_only_queue(maxsize)
+        self.add_progress_listener(listener)
+        return progress_queue
+    
+    def _create_progress_reporter(self, total_files, total_bytes):
+        """创建并启动进度上报器：定时向平台上报进度，同时通知本地监听者"""
+        return ProgressReporter(send=self._send_platform_progress, listeners=self.progress_listeners,
+                                total_files=total_files, total_bytes=total_bytes).start()
+    
+    def _send_platform_progress(self, snapshot):
+        """把进度快照转换为平台进度接口的数据并发送"""
+        progress_data = {
+            "upload_task_id": self.eai_upload_task_id,   # 上传数据任务id
+            "success_file_count": snapshot["success_file_count"],   # 已成功上传文件数量
+            "failed_file_count": snapshot["failed_file_count"]       # 上传失败文件数量
+        }
+        return self.update_upload_eai_task_progress(progress_data)
+        
         
     def set_file_filters(self, filters):
         """设置文件过滤器"""
         self.file_filters = filters
+        self.file_rules = FileRules.from_config(filters)
+    
+    def set_file_rules(self, file_rules):
+        """设置文件选择规则（FileRules），可包含排除目录、路径前缀和大小限制"""
+        self.file_rules = file_rules
+        self.file_filters = file_rules.include or [MATCH_ALL]
     
     def _is_file_allowed(self, filename):
         """检查文件是否符合过滤规则"""
-        import fnmatch
-        # 如果过滤器包含"*.*"，表示允许所有文件
-        if "*.*" in self.file_filters:
-            return True
-        # 否则检查是否匹配任一过滤规则
-        return any(fnmatch.fnmatch(filename.lower(), pattern.lower()) 
-                  for pattern in self.file_filters)
+        return self.file_rules.allows_name(filename)
     
     def _get_file_md5(self, file_path):
-        """计算文件MD5"""
-        hash_md5 = hashlib.md5()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+        """计算文件MD5（优先读取摘要缓存）"""
+        return self.digest_cache.get_digests(file_path, ("md5",))["md5"]
     
-    def _get_resume_info(self, file_path):
-        """获取断点续传信息"""
-        resume_file = os.path.join(
-            self.resume_dir, 
-            f"{self._get_file_md5(file_path)}.json"
-        )
-        if os.path.exists(resume_file):
-            with open(resume_file, 'r') as f:
-                return json.load(f)
-        return None
+    def _open_journaled_upload(self, bucket, file_path, key, headers=None):
+        """恢复或新建分片上传任务，断点续传信息记录在本地日志中
+        
+        新任务的分片大小按文件大小和实测网络状况选择，记录在日志中，续传时沿用原分片大小
+        """
+        part_size = choose_part_size(os.path.getsize(file_path), get_transfer_stats(),
+                                     part_concurrency=self.part_concurrency, buffer_limit=self.part_buffer_limit)
+        return JournaledUpload(self.resume_journal, bucket, file_path, key, part_size, headers=headers).open()
     
-    def _save_resume_info(self, file_path, info):
-        """保存断点续传信息"""
-        resume_file = os.path.join(
-            self.resume_dir,
-            f"{self._get_file_md5(file_path)}.json"
-        )
-        with open(resume_file, 'w') as f:
-            json.dump(info, f)
+    def set_connection_pool(self, connection_pool):
+        """设置共享的KS3连接池（批量上传时由各工作线程共享）"""
+        self.connection_pool = connection_pool
     
-    def _delete_resume_info(self, file_path):
-        """删除断点续传信息"""
-        resume_file = os.path.join(
-            self.resume_dir,
-            f"{self._get_file_md5(file_path)}.json"
+    def _create_connection(self):
+        """根据认证方式创建新的KS3连接"""
+        if self.use_direct_auth:
+            return Connection(
+                access_key_id=config.ACCESS_KEY,
+                access_key_secret=config.SECRET_KEY,
+                **ks3_connection_options(),
+                enable_crc=False
+            )
+        # STS凭证由凭证提供者统一管理，过期前自动刷新
+        return StsConnection(
+            self._get_credential_provider(),
+            **ks3_connection_options(),
+            enable_crc=False
         )
-        if os.path.exists(resume_file):
-            os.remove(resume_file)
+    
+    def _get_connection_pool(self):
+        """获取（必要时创建）批量上传共享的连接池"""
+        if self.connection_pool is None:
+            self.connection_pool = Ks3ConnectionPool(self._create_connection)
+        return self.connection_pool
+    
+    def _get_bucket(self, show_progress=True):
+        """获取目标存储桶对象，优先使用连接池中缓存的 Bucket"""
+        if self.connection_pool is not None:
+            return self.connection_pool.get_bucket(config.BUCKET_NAME)
+        return self.get_connection(show_progress).get_bucket(config.BUCKET_NAME)
     
     def get_connection(self, show_progress=True):
         """获取连接对象，根据配置使用STS或直接认证"""
+        if self.connection_pool is not None:
+            return self.connection_pool.get_connection()
         if self.connection:
             return self.connection
         try:
-            if self.use_direct_auth:
-                if show_progress:
+            if show_progress:
+                if self.use_direct_auth:
                     print(f"{Fore.BLUE}使用直接认证方式...")
-                self.connection = Connection(
-                    access_key_id=config.ACCESS_KEY,
-                    access_key_secret=config.SECRET_KEY,
-                    host=config.ENDPOINT,
-                    enable_crc=False
-                )
-            else:
-                if show_progress:
+                else:
                     print(f"{Fore.BLUE}使用STS临时凭证认证方式...")
-                # response = requests.get(f"{config.SERVER_URL}/get_sts_token", verify=False)
-                # self.sts_token = response.json()
-                
-                self.connection = Connection(
-                    access_key_id=self.sts_token['accessKeyId'],
-                    access_key_secret=self.sts_token['secretAccessKey'],
-                    security_token=self.sts_token['securityToken'],
-                    host=config.ENDPOINT,
-                    enable_crc=False
-                )
-                
+            self.connection = self._create_connection()
             return self.connection
         except Exception as e:
             print(f"{Fore.RED}获取连接失败: {str(e)}")
@@ -214,23 +282,46 @@ class RobotDataUploader:
                 print(f"{Fore.RED}STS服务可能不可用，请尝试使用直接认证方式")
             sys.exit(1)
             
-    def get_ks3_sts(self):
-        """获取金山云ks3的sts信息
-        Args:
-            token: 具身数据平台token
+    def refresh_credentials(self):
+        """上传凭证失效（如服务端返回403）时立即刷新STS凭证，所有连接的后续请求使用新凭证
+        
+        多个线程同时遇到凭证失效时，config.AUTH_REFRESH_MIN_INTERVAL 秒内只刷新一次。
+        
         Returns:
-            _type_: 成功/失败
+            bool: 凭证是否已刷新（直接认证方式无法刷新，返回 False）
+        """
+        if self.use_direct_auth:
+            return False
+        return self._get_credential_provider().refresh()
+    
+    def _request_sts_token(self):
+        """通过 STS_PATH 请求新的STS凭证
+        
+        Returns:
+            dict or None: 接口返回的凭证（accessKeyId、secretAccessKey、securityToken 等），失败时返回 None
         """
         try:
-            # 获取STS服务上传凭证
             headers = {"Authorization": f"Bearer {self.eai_token}"}
             response = requests.get(f"{config.SERVER_URL}{config.STS_PATH}", headers=headers)
             if "code" in response.json() and response.json()["code"]==200:
-                self.sts_token = response.json()["data"]
-                return True
-            return False
+                return response.json()["data"]
         except Exception as e:
             print(f"{Fore.RED}获取sts凭证失败: {str(e)}")
+        return None
+    
+    def get_ks3_sts(self):
+        """获取金山云ks3的sts信息
+        Args:
+            token: 具身数据平台token
+        Returns:
+            _type_: 成功/失败
+        """
+        # 获取STS服务上传凭证
+        sts_token = self._request_sts_token()
+        if not sts_token:
+            return False
+        self.set_sts_token(sts_token)
+        return True
             
                     
     def get_eai_token(self, ak, sk):
@@ -285,7 +376,8 @@ class RobotDataUploader:
         try:
             headers = {"Authorization": self.eai_token}
             # 获取具身真机平台token
-            response = requests.post(f"{config.SERVER_URL}{config.START_UPLOAD_PATH}", headers=headers, json=data)
+            response = requests.post(f"{config.SERVER_URL}{config.START_UPLOAD_PATH}", headers=headers, json=data,
+                                     timeout=config.PLATFORM_REQUEST_TIMEOUT)
             if response.status_code == 200:
                 if "code" in response.json() and response.json()["code"]==200:
                     self.eai_upload_task_id = response.json()["data"]["uploadTaskId"]
@@ -306,7 +398,8 @@ class RobotDataUploader:
         try:
             headers = {"Authorization": self.eai_token}
             # 获取具身真机平台token
-            response = requests.post(f"{config.SERVER_URL}{config.UPDATE_UPLOAD_PATH}", headers=headers, json=data)
+            response = requests.post(f"{config.SERVER_URL}{config.UPDATE_UPLOAD_PATH}", headers=headers, json=data,
+                                     timeout=config.PLATFORM_REQUEST_TIMEOUT)
             if response.status_code == 200:
                 if "code" in response.json() and response.json()["code"]==200:
                     # self.eai_upload_task_id = response.json()["data"]["uploadTaskId"]
@@ -327,7 +420,8 @@ class RobotDataUploader:
         try:
             headers = {"Authorization": self.eai_token}
             # 获取具身真机平台token
-            response = requests.post(f"{config.SERVER_URL}{config.COMPLETE_UPLOAD_PATH}", headers=headers, json={"upload_task_id":self.eai_upload_task_id, "status": status})
+            response = requests.post(f"{config.SERVER_URL}{config.COMPLETE_UPLOAD_PATH}", headers=headers, json={"upload_task_id":self.eai_upload_task_id, "status": status},
+                                     timeout=config.PLATFORM_REQUEST_TIMEOUT)
             if response.status_code == 200:
                 if "code" in response.json() and response.json()["code"]==200:
                     # self.eai_upload_task_id = response.json()["data"]["uploadTaskId"]
@@ -338,7 +432,8 @@ class RobotDataUploader:
             print(f"{Fore.YELLOW}完成数据集上传通知异常: {str(e)}") 
             
     
-    def upload_file(self, file_path, target_directory, base_dir=None, skip_dir_check=False, show_progress=True, pbar=None):
+    def upload_file(self, file_path, target_directory, base_dir=None, skip_dir_check=False, show_progress=True, pbar=None,
+                    identity=None):
         """上传文件
         Args:
             file_path: 本地文件路径
@@ -347,16 +442,17 @@ class RobotDataUploader:
             skip_dir_check: 是否跳过目录存在检查
             show_progress: 是否显示详细的上传进度(单文件上传时为True,可展示进度条等)
             pbar: 外部传入的进度条对象（用于批量上传时复用）
+            identity: 扫描清单时记录的文件身份标识 (dev, ino, size, mtime_ns)，提供时不再 stat 文件
         """
         if not target_directory:
             print(f"{Fore.RED}错误：必须指定数据集名称")
             return
             
-        if not os.path.exists(file_path):
+        if identity is None and not os.path.exists(file_path):
             print(f"{Fore.RED}错误：文件不存在 - {file_path}")
             return
             
-        if not os.path.isfile(file_path):
+        if identity is None and not os.path.isfile(file_path):
             print(f"{Fore.RED}错误：路径不是文件 - {file_path}")
             return
             
@@ -379,15 +475,19 @@ class RobotDataUploader:
             }
             if not self.beigin_upload_eai_task(data=data):
                 print(f"{Fore.YELLOW}警告：开始上传通知异常,数据可正常上传,但后续平台无记录,请联系管理员排查。具体信息:{data}")
+            # 进度和完成通知由上报线程发送，不阻塞上传
+            self.set_progress_reporter(self._create_progress_reporter(total_file_count, data["total_size_bytes"]))
             
-        # 最大重试次数
-        max_retries = 5
+        # 最大尝试次数
+        max_retries = config.MAX_UPLOAD_RETRIES
         retry_count = 0
+        auth_refreshed = False
         try:
             while retry_count < max_retries:
+                # 熔断打开时在此等待，服务恢复前不再发起请求
+                if self.circuit_breaker:
+                    self.circuit_breaker.before_request()
                 try:
-                    connection = self.get_connection(show_progress)
-                    
                     # 计算相对路径
                     if base_dir:
                         # 将 base_dir 和 file_path 都转换为绝对路径
@@ -412,7 +512,7 @@ class RobotDataUploader:
                     # 只在单文件上传且未指定跳过时检查目录是否存在
                     if not skip_dir_check:
                         # 检查数据集是否已存在
-                        bucket = connection.get_bucket(config.BUCKET_NAME)
+                        bucket = self._get_bucket(show_progress)
                         # prefix = os.path.join(config.UPLOAD_TARGET, sub_dir)
                         prefix = f"{config.UPLOAD_TARGET}/{target_directory}"
                         existing = list(bucket.list(prefix=prefix, delimiter='/', max_keys=1))
@@ -424,7 +524,7 @@ class RobotDataUploader:
                             target_directory = new_sub_dir
                         # key = os.path.join(config.UPLOAD_TARGET, sub_dir, os.path.basename(file_path))
                         key = f"{config.UPLOAD_TARGET}/{target_directory}/{os.path.basename(file_path)}"
-                    file_size = os.path.getsize(file_path)
+                    file_size = identity[2] if identity else os.path.getsize(file_path)
                     
                     # 大小文件的上传逻辑
                     if file_size > 5 * 1024 * 1024:  # 5MB
@@ -432,42 +532,57 @@ class RobotDataUploader:
                         self._multipart_upload_ks3_sdk(file_path, key, show_progress, pbar=pbar)
                         # self._upload_large_file_with_progress(file_path, key, show_progress)
                     else:
-                        self._simple_upload(file_path, key, show_progress, pbar=pbar)
+                        self._simple_upload(file_path, key, show_progress, pbar=pbar, identity=identity)
                         
                     if show_progress and not pbar:
                         print(f"{Fore.GREEN}成功上传: {file_path} 到 {key}")      
+                    if self.circuit_breaker:
+                        self.circuit_breaker.record_success()
                     # 上传成功，跳出循环
                     success_file_count += 1
                     break
     
                 except Exception as e:
                     retry_count += 1
-                    # if show_progress:
-                    if retry_count < max_retries:
-                        print(f"{Fore.YELLOW}上传失败 {file_path}: {str(e)}，正在进行第 {retry_count} 次重试...")
-                    else:
-                        print(f"{Fore.RED}上传失败 {file_path}: {str(e)}，已重试 {retry_count} 次，放弃上传")
+                    category = classify_error(e)
+                    if self.circuit_breaker and self.circuit_breaker.record_error(e):
+                        print(f"{Fore.RED}服务端连续不可用，暂停所有上传 {self.circuit_breaker.reset_timeout} 秒: {str(e)}")
+                    
+                    # 凭证失效：刷新凭证后立即重试（每个文件只刷新一次，不占用重试预算）
+                    if category == AUTH_REFRESH and not auth_refreshed and retry_count < max_retries:
+                        auth_refreshed = True
+                        if self.refresh_credentials():
+                            print(f"{Fore.YELLOW}上传凭证失效 {file_path}: {str(e)}，已刷新凭证，重新上传...")
+                            continue
                     
-                    if retry_count >= max_retries:
+                    if category != RETRYABLE:
+                        reason = "错误不可重试"
+                    elif retry_count >= max_retries:
+                        reason = f"已重试 {retry_count - 1} 次"
+                    elif self.retry_budget is not None and not self.retry_budget.try_spend():
+                        reason = "本批次重试次数已用完"
+                    else:
+                        reason = None
+                    if reason:
+                        print(f"{Fore.RED}上传失败 {file_path}: {str(e)}，{reason}，放弃上传")
                         failed_file_count += 1
-                        raise  # 重试次数用完，抛出异常
-                        # break
-                    import time
-                    # 重试前等待一段时间
-                    time.sleep(2)
+                        raise  # 放弃上传，抛出异常
+                    
+                    # 指数退避加随机抖动，避免各线程同时重试
+                    delay = backoff_delay(retry_count - 1, e)
+                    print(f"{Fore.YELLOW}上传失败 {file_path}: {str(e)}，{delay:.1f} 秒后进行第 {retry_count} 次重试...")
+                    time.sleep(delay)
                 
         finally:
             if show_progress:
-                # 更新进度数据
-                progress_data = {
-                    "upload_task_id": self.eai_upload_task_id,   # 上传数据任务id
-                    "success_file_count": success_file_count,   # 已成功上传文件数量
-                    "failed_file_count": failed_file_count       # 上传失败文件数量
-                }
-                # 调用进度更新接口
-                self.update_upload_eai_task_progress(progress_data)
-                # 3.通知具身数据平台完成上传
-                self.complete_upload_eai_task(status="SUCCESS")
+                reporter = self.progress_reporter
+                self.set_progress_reporter(None)
+                if success_file_count:
+                    reporter.file_done(success=True)
+                elif failed_file_count:
+                    reporter.file_done(success=False)
+                # 发送最终进度后，3.通知具身数据平台完成上传
+                reporter.close(on_close=lambda: self.complete_upload_eai_task(status="SUCCESS"))
 
 
     
@@ -493,7 +608,7 @@ class RobotDataUploader:
                     print(f"{Fore.RED}错误: 必须至少含有1个路径分隔符'/',如:a/b")
                     continue
                 # 递归检查新名称是否也存在
-                bucket = self.get_connection(show_progress).get_bucket(config.BUCKET_NAME)
+                bucket = self._get_bucket(show_progress)
                 prefix = f"{config.UPLOAD_TARGET}/{new_name}"
                 existing = list(bucket.list(prefix=prefix, delimiter='/', max_keys=1))
                 
@@ -507,9 +622,11 @@ class RobotDataUploader:
             else:
                 print(f"{Fore.RED}无效选择，请重新输入")
     
-    def _simple_upload(self, file_path, key, show_progress=True, pbar=None):
-        """简单上传"""
-        file_size = os.path.getsize(file_path)
+    def _simple_upload(self, file_path, key, show_progress=True, pbar=None, identity=None):
+        """简单上传（identity 为扫描清单时记录的文件身份标识，提供时不再 stat 文件）"""
+        if identity is None:
+            identity = file_identity(file_path)
+        file_size = identity[2]
         
         # 如果没有传入外部进度条且需要显示进度，则创建新的进度条
         local_pbar = None
@@ -530,93 +647,74 @@ class RobotDataUploader:
         # 考虑到 KS3 SDK 的 set_contents_from_file 是阻塞的且没有回调参数
         # 我们只能在上传完成后一次性更新进度
         
+        # 文件只读取一次：同时用于上传和计算摘要，摘要写入缓存供后续校验使用
         with open(file_path, 'rb') as f:
-            bucket = self.get_connection(show_progress).get_bucket(config.BUCKET_NAME)
-            k = bucket.new_key(key)
-            
-            k.set_contents_from_file(f)
-            
-            # 上传完成后更新进度
-            if current_pbar:
-                current_pbar.update(file_size)
+            data = f.read()
+        digests = digest_bytes(data, upload_digest_algorithms())
+        
+        bucket = self._get_bucket(show_progress)
+        k = bucket.new_key(key)
+        
+        upload_start = time.monotonic()
+        k.set_contents_from_file(throttled(io.BytesIO(data)), md5=sdk_md5(digests["md5"]))
+        get_transfer_stats().record(file_size, time.monotonic() - upload_start)
+        if self.progress_reporter:
+            self.progress_reporter.add_bytes(file_size)
+        self.digest_cache.store_if_unchanged(file_path, identity, digests)
+        
+        # 上传完成后更新进度
+        if current_pbar:
+            current_pbar.update(file_size)
         
         if local_pbar:
             local_pbar.close()
+        return digests
     
     def _multipart_upload(self, file_path, key, show_progress=True):
-        """分片上传"""        
-        chunk_size = 5 * 1024 * 1024  # 5MB分片
-        file_size = os.path.getsize(file_path)
-        
-        bucket = self.connection.get_bucket(config.BUCKET_NAME)
+        """分片上传（逐片串行）"""
+        bucket = self._get_bucket(show_progress)
         
-        # 检查是否有未完成的上传
-        resume_info = self._get_resume_info(file_path)
-        if resume_info and resume_info['key'] == key:
-            # 恢复未完成的上传
-            mp = bucket.get_all_multipart_uploads(prefix=key)[0]
-            upload_id = resume_info['upload_id']
-            completed_parts = resume_info['completed_parts']
-            
-            # todo 恢复mp的part_crc_infos状态(mp对象上传时会在本地内存维护part_info，用于完成上传时校验整个文件的crc。part_info不完整会导致本地计算crc出错。)
-            for part in completed_parts:
-                # from ks3.multipart import PartInfo
-                mp.part_crc_infos[part['PartNumber']] = PartInfo(part['PartSize'], part['Crc64ecma'])
-            
-            start_part = len(completed_parts) + 1
+        # 检查是否有未完成的上传，断点续传信息记录在本地日志中
+        upload = self._open_journaled_upload(bucket, file_path, key)
+        # 上传时顺带计算整文件摘要，之后校验无需再次读盘
+        digester = upload.new_digester(upload_digest_algorithms())
+        if upload.resumed:
             # if show_progress:
-            print(f"{Fore.GREEN}发现{key}的断点续传信息，从第 {start_part} 部分继续上传")
-        else:
-            # 初始化新的分片上传
-            mp = bucket.initiate_multipart_upload(key)
-            upload_id = mp.id
-            completed_parts = []
-            start_part = 1
-            
-        # 计算分片数量
-        chunk_count = int(math.ceil(file_size * 1.0 / chunk_size))
+            print(f"{Fore.GREEN}发现{key}的断点续传信息，已完成 {len(upload.uploaded_parts)} 个分片，继续上传")
         
         if show_progress:
-            pbar = tqdm(total=file_size, 
+            pbar = tqdm(total=upload.file_size, 
                         bar_format = "{l_bar}{bar:40}| {percentage:.0f}% [{elapsed}<{remaining}, {rate_fmt}{postfix}]",
                         colour = "GREEN" , # 使用标准绿色而非十六进制颜色码 
                         dynamic_ncols = True , # 自动适应终端宽度
                         unit='B', 
                         unit_scale=True, 
                         desc=os.path.basename(file_path))
-            completed_bytes = (start_part - 1) * chunk_size
-            pbar.update(completed_bytes)
+            pbar.update(upload.completed_bytes)
+        
+        def on_part_done(part_result):
+            if show_progress:
+                pbar.update(part_result.size)
+            # 每完成一个分片追加一条断点续传记录
+            upload.record(part_result)
         
         try:
-            for i in range(start_part - 1, chunk_count):
-                offset = chunk_size * i
-                bytes_to_read = min(chunk_size, file_size - offset)
-                
-                with FileChunkIO(file_path, 'r', offset=offset, bytes=bytes_to_read) as fp:
-                    # 上传分片                   
-                    part_num = i + 1
-                    ret = mp.upload_part_from_file(fp, part_num=part_num)
-                    
-                    if show_progress:
-                        pbar.update(bytes_to_read)
-                    
-                    completed_parts.append({
-                        'PartNumber': part_num,
-                        # todo 额外保存块大小、块crc64信息
-                        'PartSize': bytes_to_read,
-                        'ETag': ret.response_metadata.headers['ETag'],  # todo 改为了保存ETag信息
-                        'Crc64ecma': ret.response_metadata.headers['x-kss-checksum-crc64ecma']
-                    })
-                    
-                    # 保存断点续传信息
-                    self._save_resume_info(file_path, {
-                        'key': key,
-                        'upload_id': upload_id,
-                        'completed_parts': completed_parts
-                    })
-            
-            mp.complete_upload()
-            self._delete_resume_info(file_path)
+            upload_parts_concurrently(
+                upload.mp,
+                file_path,
+                upload.pending_parts(),
+                part_concurrency=1,
+                buffer_limit=None,
+                part_size=upload.part_size,
+                on_part_done=on_part_done,
+                digester=digester
+            )
+            upload.complete()
+            digests = digester.hexdigests()
+            # 同时记录本次分片大小对应的对象ETag，供之后MD5校验直接比对
+            self.digest_cache.store_if_unchanged(file_path, upload.identity,
+                                                 dict(digests or {}, **upload.multipart_digests()))
+            return digests
          
         except Exception as e:
             if show_progress:
@@ -632,73 +730,32 @@ class RobotDataUploader:
         替代原有的 _multipart_upload 方法
         参考文档: https://docs.ksyun.com/documents/40532?type=3
         """
-        # 分片大小 5MB
-        chunk_size = 5 * 1024 * 1024
-        file_size = os.path.getsize(file_path)
-        # 计算分片数量
-        chunk_count = int(math.ceil(file_size * 1.0 / chunk_size))
-        
-        bucket = self.connection.get_bucket(config.BUCKET_NAME)
-        
-        mp = None
-        uploaded_parts_map = {} # part_number -> Part
+        bucket = self._get_bucket(show_progress)
         
         # 1. 检查是否存在未完成的分片上传任务（断点续传）
-        # 获取该key下的所有分片上传任务
-        # 注意：get_all_multipart_uploads 返回的是Bucket下的所有分片任务，需要过滤
-        all_uploads = bucket.get_all_multipart_uploads(prefix=key)
-        for upload in all_uploads:
-            if upload.key_name == key:
-                mp = upload
-                break
-        
-        if mp:
+        # 优先使用本地断点续传日志中记录的上传任务及分片CRC；
+        # 日志中没有记录时，沿用服务端该key下的未完成任务，并核对已上传分片的内容
+        # x-kss-storage-class: STANDARD (标准) / STANDARD_IA (低频)
+        headers = {"x-kss-storage-class": "STANDARD"}
+        upload = self._open_journaled_upload(bucket, file_path, key, headers=headers)
+        # 上传时顺带计算整文件摘要，之后校验无需再次读盘
+        digester = upload.new_digester(upload_digest_algorithms())
+        chunk_count = int(math.ceil(upload.file_size * 1.0 / upload.part_size))
+        if upload.resumed:
             # if show_progress and pbar is None:
-            print(f"{Fore.GREEN}发现未完成的上传任务 (ID: {mp.id})，正在获取已上传分片信息...")
-            
-            # 获取已上传的分片
-            # 使用SDK提供的迭代器自动处理分页，获取所有已上传分片
-            for part in mp:
-                uploaded_parts_map[part.part_number] = part
-                # 尝试从 part 对象中恢复 CRC64 信息
-                # 注意：这依赖于 KS3 SDK 在 ListParts 时是否返回并解析了 Crc64ecma
-                # 如果 part 对象有该属性（通常是扩展属性或通过 xml 解析得到），则赋值
-                # 如果没有，后续 complete_upload 仍可能报错，需要 catch 处理
-                # if hasattr(part, 'crc64ecma') and part.crc64ecma:
-                #      mp.part_crc_infos[part.part_number] = PartInfo(part.size, part.crc64ecma)
-                # elif hasattr(part, 'last_modified'): # 只要是有效的part
-                #      # 如果没有 CRC 信息，我们在服务端模式下也无法凭空捏造。
-                #      # 但为了兼容 _multipart_upload 的逻辑，我们可以在这里尝试查找本地是否碰巧有记录
-                #      # (虽然 _multipart_upload_ks3_sdk 旨在摆脱本地记录依赖)
-                     
-                #      # 尝试从本地断点续传文件补充 CRC 信息 (混合模式)
-                #      resume_info = self._get_resume_info(file_path)
-                #      if resume_info and resume_info.get('upload_id') == mp.id:
-                #          for p in resume_info.get('completed_parts', []):
-                #              if p['PartNumber'] == part.part_number:
-                #                  mp.part_crc_infos[part.part_number] = PartInfo(p['PartSize'], p['Crc64ecma'])
-                #                  break
-
-            # if show_progress and pbar is None:
-            print(f"{Fore.GREEN}已完成分片: {len(uploaded_parts_map)}/{chunk_count}")
-        else:
-            # 初始化新的分片上传任务
-            # x-kss-storage-class: STANDARD (标准) / STANDARD_IA (低频)
-            headers = {"x-kss-storage-class": "STANDARD"}
-            mp = bucket.initiate_multipart_upload(key, headers=headers)
-            if show_progress and pbar is None:
-                print(f"{Fore.GREEN}初始化新的上传任务 (ID: {mp.id})")
+            print(f"{Fore.GREEN}发现未完成的上传任务 (ID: {upload.mp.id})")
+            print(f"{Fore.GREEN}已完成分片: {len(upload.uploaded_parts)}/{chunk_count}")
+        elif show_progress and pbar is None:
+            print(f"{Fore.GREEN}初始化新的上传任务 (ID: {upload.mp.id})")
 
         # 2. 准备进度条
         local_pbar = None
         current_pbar = pbar
         # 计算已上传的字节数
-        completed_bytes = 0
-        for part in uploaded_parts_map.values():
-            completed_bytes += part.size
+        completed_bytes = upload.completed_bytes
             
         if show_progress and pbar is None:
-            local_pbar = tqdm(total=file_size,
+            local_pbar = tqdm(total=upload.file_size,
                         initial=completed_bytes,
                         bar_format="{l_bar}{bar:40}| {percentage:.0f}% [{elapsed}<{remaining}, {rate_fmt}{postfix}]",
                         colour="GREEN",
@@ -707,90 +764,53 @@ class RobotDataUploader:
                         unit_scale=True,
                         desc=os.path.basename(file_path))
             current_pbar = local_pbar
-        # 更新进度条
-        current_pbar.update(completed_bytes)
+        # 外部传入的进度条需要补齐已上传的字节数（本地进度条已通过initial设置）
+        if pbar is not None:
+            pbar.update(completed_bytes)
+        if self.progress_reporter:
+            self.progress_reporter.add_bytes(completed_bytes)
         try:
-            # 3. 上传未完成的分片
-            # 记录本次上传的分片信息，以便更新本地缓存（可选，用于辅助下一次 CRC 恢复）
-            current_session_parts = []
-            
-            for i in range(chunk_count):
-                part_number = i + 1
-                
-                # 如果该分片已上传，则跳过
-                if part_number in uploaded_parts_map:
-                    continue
-                
-                offset = i * chunk_size
-                bytes_to_read = min(chunk_size, file_size - offset)
-                
-                # 使用FileChunkIO读取指定分片的数据
-                with FileChunkIO(file_path, 'r', offset=offset, bytes=bytes_to_read) as fp:
-                    # 上传分片
-                    ret = mp.upload_part_from_file(fp, part_num=part_number)
-                    
-                    # 收集本次上传的分片信息，用于更新本地缓存
-                    # if ret and hasattr(ret, 'response_metadata'):
-                    #     crc64 = ret.response_metadata.headers.get('x-kss-checksum-crc64ecma')
-                    #     etag =ret.response_metadata.headers.get('ETag')
-                    #     if crc64:
-                    #          part_info = {
-                    #             'PartNumber': part_number,
-                    #             'PartSize': bytes_to_read,
-                    #             'Crc64ecma': crc64,
-                    #             'ETag': etag
-                    #         }
-                    #          current_session_parts.append(part_info)
-                    #          # 同时更新 mp 对象的内存状态，增加成功的几率
-                    #          mp.part_crc_infos[part_number] = PartInfo(bytes_to_read, crc64)
-                             
-                    #          # 实时更新本地断点续传信息，每上传一个分片就保存一次
-                    #          # 虽然增加了IO开销，但保证了断点续传的实时性
-                    #          resume_info = self._get_resume_info(file_path) or {
-                    #              'key': key,
-                    #              'upload_id': mp.id,
-                    #              'completed_parts': []
-                    #          }
-                             
-                    #          # 确保 upload_id 匹配，如果不匹配说明是新的任务，重置 completed_parts
-                    #          if resume_info.get('upload_id') != mp.id:
-                    #              resume_info = {'key': key, 'upload_id': mp.id, 'completed_parts': []}
-                             
-                    #          # 将新上传的分片添加到记录中
-                    #          # 简单起见，直接追加，保存时去重在 _save_resume_info 中通常不做，
-                    #          # 但我们为了保持文件整洁，可以读取-更新-保存
-                             
-                    #          # 效率优化：不需要每次都重新读取整个列表再去重
-                    #          # 只需要将当前 part_info 追加到 completed_parts 并保存
-                    #          resume_info['completed_parts'].append(part_info)
-                    #          self._save_resume_info(file_path, resume_info)
-
-                
+            # 3. 并发上传未完成的分片
+            # 分片结果按完成顺序返回，进度条、进度上报和断点续传日志在当前线程中统一更新
+            def on_part_done(part_result):
                 if current_pbar:
-                    current_pbar.update(bytes_to_read)
+                    current_pbar.update(part_result.size)
+                if self.progress_reporter:
+                    self.progress_reporter.add_bytes(part_result.size)
+                upload.record(part_result)
+
+            upload_parts_concurrently(
+                upload.mp,
+                file_path,
+                upload.pending_parts(),
+                part_concurrency=self.part_concurrency,
+                buffer_limit=self.part_buffer_limit,
+                part_size=upload.part_size,
+                on_part_done=on_part_done,
+                digester=digester
+            )
 
-            
             # 4. 完成分片上传
-            # SDK会自动合并分片
+            # SDK会自动合并分片，成功后清理断点续传日志
             try:
-                mp.complete_upload()
-                # 成功后清理本地缓存
-                # self._delete_resume_info(file_path)
+                upload.complete()
             except Exception as e:
                 # 处理断点续传时的CRC不一致问题
-                # 由于无法获取旧分片的CRC信息，会导致本地计算CRC与服务端不一致
-                # 但此时服务端实际上已经合并成功（否则不会返回server_crc）
+                # 此时服务端实际上已经合并成功（否则不会返回server_crc）
                 if "Inconsistent CRC checksum" in str(e):
                     if show_progress and pbar is None:
                         print(f"{Fore.YELLOW}警告: CRC校验不一致(断点续传导致)，但上传已完成。")
-                    # 成功后清理本地缓存
-                    # self._delete_resume_info(file_path)
                 else:
                     raise e
             
             if local_pbar:
                 local_pbar.close()
                 # print(f"{Fore.GREEN}上传成功: {key}")
+            digests = digester.hexdigests()
+            # 同时记录本次分片大小对应的对象ETag，供之后MD5校验直接比对
+            self.digest_cache.store_if_unchanged(file_path, upload.identity,
+                                                 dict(digests or {}, **upload.multipart_digests()))
+            return digests
                 
         except Exception as e:
             if local_pbar:
@@ -822,7 +842,7 @@ class RobotDataUploader:
                         desc=os.path.basename(file_path))
 
             try:
-                bucket = self.connection.get_bucket(config.BUCKET_NAME)
+                bucket = self._get_bucket(show_progress)
                 k = bucket.new_key(key)
                 
                 k.upload_file(
@@ -843,7 +863,7 @@ class RobotDataUploader:
         else:
             # 不显示进度条的上传
             try:
-                bucket = self.connection.get_bucket(config.BUCKET_NAME)
+                bucket = self._get_bucket(show_progress)
                 k = bucket.new_key(key)
                 
                 k.upload_file(
@@ -877,10 +897,11 @@ class RobotDataUploader:
             print(f"{Fore.RED}错误：路径不是目录 - {directory}")
             return
             
-        connection = self.get_connection()
+        # 所有线程共享同一个连接池，复用连接和 Bucket 对象
+        connection_pool = self._get_connection_pool()
         
         # 在批量上传开始前检查一次目录是否存在
-        bucket = connection.get_bucket(config.BUCKET_NAME)
+        bucket = self._get_bucket()
         # prefix = os.path.join(config.UPLOAD_TARGET, sub_dir)
         prefix = f"{config.UPLOAD_TARGET}/{target_directory}"
 
@@ -893,36 +914,22 @@ class RobotDataUploader:
             target_directory = new_sub_dir
             
         # 收集符合条件的文件及其大小
-        files_info = []
-        total_size = 0
-        for root, _, filenames in os.walk(directory):
-            for filename in filenames:
-                if self._is_file_allowed(filename):
-                    file_path = os.path.join(root, filename)
-                    size = os.path.getsize(file_path)
-                    files_info.append((file_path, size))
-                    total_size += size
-                else:
-                    print(f"{Fore.YELLOW}跳过不符合过滤规则的文件: {filename}")
+        # os.scandir 并行扫描各子目录，扫描时的 stat 结果随清单传给上传线程，不再逐个文件重复 stat
+        files_info = build_manifest(
+            directory, self.file_rules,
+            on_skip=lambda filename: print(f"{Fore.YELLOW}跳过不符合过滤规则的文件: {filename}"))
+        total_size = sum(size for _, size in files_info)
         
         if not files_info:
             print(f"{Fore.YELLOW}警告：在目录 {directory} 中没有找到符合过滤规则的文件")
             return
             
-        # 按文件大小排序，便于均匀分配
-        files_info.sort(key=lambda x: x[1], reverse=True)
-        
-        # 将文件分配给不同线程，尽量保证每个线程处理的数据量接近
+        # 所有线程共享一个文件队列，上传完一个文件再领取下一个；元数据等小文件按优先级通道先行
+        work_queue = FileWorkQueue(files_info, base_dir=directory)
         max_workers = min(self.max_worker, len(files_info)) 
-        thread_files = [[] for _ in range(max_workers)]   
-        thread_sizes = [0] * max_workers
-        
-        # 使用贪心算法分配文件
-        for file_path, size in files_info:
-            # 找到当前总大小最小的线程
-            min_size_thread = min(range(max_workers), key=lambda i: thread_sizes[i])
-            thread_files[min_size_thread].append(file_path)
-            thread_sizes[min_size_thread] += size
+        # 重试预算和熔断器由所有线程共享：大面积失败时尽快放弃，服务不可用时暂停所有线程
+        retry_budget = RetryBudget.for_batch(len(files_info))
+        circuit_breaker = CircuitBreaker()
         
         print(f"{Fore.BLUE}找到 {len(files_info)} 个文件 (总大小: {total_size/1024/1024:.2f}MB) 准备上传...")
         # 1.通知具身数据平台开始上传
@@ -938,10 +945,16 @@ class RobotDataUploader:
         self.beigin_upload_eai_task(data=data)
         
         # 定义线程上传任务
-        def upload_task_thread(thread_id, files, total_size, shared_success_files, shared_failed_files, lock):
+        def upload_task_thread(thread_id):
             # 为每个线程创建独立的上传器实例
             thread_uploader = RobotDataUploader(use_direct_auth=self.use_direct_auth)
             thread_uploader.set_sts_token(self.sts_token)
+            thread_uploader.set_connection_pool(connection_pool)
+            thread_uploader.set_retry_policy(retry_budget, circuit_breaker)
+            thread_uploader.set_progress_reporter(progress_reporter)
+            if not self.use_direct_auth:
+                # 所有线程共享同一个凭证提供者，凭证过期前统一刷新
+                thread_uploader.set_credential_provider(self._get_credential_provider())
             # 使用线程本地变量跟踪当前线程的成功和失败文件
             local_success_files = []
             local_failed_files = []
@@ -949,14 +962,21 @@ class RobotDataUploader:
             # 添加进度更新计时器
             last_update_time = time.time()
             
-            with tqdm(total=total_size, 
+            # 线程处理的文件在运行时动态领取，进度条总量随领取逐步增加
+            with tqdm(total=0, 
                      unit='B', 
                      colour = "GREEN" , # 使用标准绿色而非十六进制颜色码
                      dynamic_ncols = True , # 自动适应终端宽度
                      unit_scale=True, 
                      desc=f"🟢 线程-{thread_id}", leave=True,
                      position=thread_id) as pbar:                
-                for file_path in files:
+                while True:
+                    item = work_queue.get()
+                    if item is None:
+                        break
+                    file_path, file_size = item
+                    pbar.total += file_size
+                    pbar.refresh()
                     try:
                         # 传入基础目录路径
                         thread_uploader.upload_file(
@@ -965,12 +985,11 @@ class RobotDataUploader:
                             base_dir=directory,  # 添加基础目录参数
                             skip_dir_check=True, 
                             show_progress=False, # 批量上传时，内部不再打印单个文件的进度条信息，但会通过pbar更新进度
-                            pbar=pbar # 传入当前线程的进度条对象
+                            pbar=pbar, # 传入当前线程的进度条对象
+                            identity=entry_identity(item)
                         )
                         local_success_files.append(file_path)
-                        # 更新共享成功列表
-                        with lock:
-                            shared_success_files.append(file_path)
+                        progress_reporter.file_done(success=True)
                         
                         # 更新进度条
                         # 注意：upload_file内部已经调用了pbar.update来更新实际上传的字节数
@@ -979,9 +998,7 @@ class RobotDataUploader:
                     except Exception as e:
                         print(f"{Fore.RED}上传失败 {file_path}: {str(e)}")
                         local_failed_files.append(file_path)
-                        # 更新共享失败列表
-                        with lock:
-                            shared_failed_files.append(file_path)
+                        progress_reporter.file_done(success=False)
                             
                         # 失败的情况下，upload_file内部可能没有完全update进度
                         # 为了保证进度条能走到终点（或者至少反映该文件已处理完毕），
@@ -996,63 +1013,12 @@ class RobotDataUploader:
                 
                 return local_success_files, local_failed_files
         
-        # 定义进度更新线程函数
-        def update_progress_thread(shared_success_files, shared_failed_files, lock, stop_event):
-            # 使用当前实例而不是创建新的实例
-            while not stop_event.is_set():
-                # 获取当前共享列表的长度
-                with lock:
-                    success_count = len(shared_success_files)
-                    failed_count = len(shared_failed_files)
-                
-                # 更新进度数据
-                progress_data = {
-                    "upload_task_id": self.eai_upload_task_id,   # 上传数据任务id
-                    "success_file_count": success_count,   # 已成功上传文件数量
-                    "failed_file_count": failed_count       # 上传失败文件数量
-                }
-                
-                # 调用进度更新接口
-                self.update_upload_eai_task_progress(progress_data)
-                # print("haha")
-                
-                # 每5秒更新一次
-                time.sleep(5)
-            
-            # 上传完成后，发送最终进度更新
-            with lock:
-                success_count = len(shared_success_files)
-                failed_count = len(shared_failed_files)
-            
-            final_progress_data = {
-                "upload_task_id": self.eai_upload_task_id,   # 上传数据任务id
-                "success_file_count": success_count,   # 已成功上传文件数量
-                "failed_file_count": failed_count       # 上传失败文件数量
-            }
-            self.update_upload_eai_task_progress(final_progress_data)
-            # print("hehe")
-
-        
         # 由于使用了tqdm的position参数来显示多个进度条
         # 需要预先打印足够的空行为进度条预留显示空间
         print("\n" * (max_workers + 1))
         
-        # 创建共享的成功和失败文件列表
-        shared_success_files = []
-        shared_failed_files = []
-        # 创建线程锁以保护共享列表
-        lock = threading.Lock()
-        
-        # 创建停止事件用于通知进度更新线程停止
-        stop_event = threading.Event()
-        
-        # 2.启动进度更新线程
-        progress_thread = threading.Thread(
-            target=update_progress_thread,
-            args=(shared_success_files, shared_failed_files, lock, stop_event)
-        )
-        progress_thread.daemon = True  # 设置为守护线程，主线程结束时自动结束
-        progress_thread.start()
+        # 2.启动进度上报线程：上传线程只更新计数，进度按固定间隔合并后上报，不阻塞上传
+        progress_reporter = self._create_progress_reporter(len(files_info), total_size)
         
         # 使用线程池并行上传
         success_count = 0
@@ -1061,17 +1027,11 @@ class RobotDataUploader:
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = []
             for i in range(max_workers):
-                if thread_files[i]:  # 只为有文件的线程创建任务
-                    future = executor.submit(
-                        upload_task_thread,
-                        i,  # thread_id
-                        thread_files[i],  # 该线程负责的文件列表
-                        thread_sizes[i],   # 该线程负责的文件总大小
-                        shared_success_files,  # 共享的成功文件列表
-                        shared_failed_files,   # 共享的失败文件列表
-                        lock  # 线程锁
-                    )
-                    futures.append(future)
+                future = executor.submit(
+                    upload_task_thread,
+                    i  # thread_id
+                )
+                futures.append(future)
             
             # 等待所有任务完成
             for future in futures:
@@ -1082,11 +1042,6 @@ class RobotDataUploader:
                 failure_files.extend(local_failed)
 
         
-        # 通知进度更新线程停止
-        stop_event.set()
-        # 等待进度更新线程完成最后一次更新
-        progress_thread.join()
-        
         # 由于tqdm进度条会占用终端空间
         # 任务完成后需要打印相同数量的换行来"清理"这些进度条
         # 否则后续输出会紧贴在进度条上
@@ -1098,8 +1053,8 @@ class RobotDataUploader:
         if failure_count > 0:
             print(f"{Fore.RED}失败: {failure_count} 个文件，文件列表:{failure_files}")
        
-        # 3.通知具身数据平台完成上传
-        self.complete_upload_eai_task(status="SUCCESS")
+        # 上报线程发送最终进度后，3.通知具身数据平台完成上传
+        progress_reporter.close(on_close=lambda: self.complete_upload_eai_task(status="SUCCESS"))
 
  
 
@@ -1243,6 +1198,7 @@ def interactive_mode(use_direct_auth=False):
         elif choice == '4':
             uploader.use_direct_auth = not uploader.use_direct_auth
             uploader.connection = None  # 重置连接
+            uploader.connection_pool = None
             print(f"{Fore.GREEN}已切换到{'直接认证' if uploader.use_direct_auth else 'STS认证'}方式")
         elif choice == '5':
             while True:
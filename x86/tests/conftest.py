@@ -0,0 +1,64 @@
+"""基于本地KS3替身服务（ks3_stub）的离线测试公共夹具"""
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_data_uploader import config  # noqa: E402
+from robot_data_uploader.collect_uploader import BaaiRobotDataUploader  # noqa: E402
+from robot_data_uploader.credentials import StsCredentialProvider  # noqa: E402
+from robot_data_uploader.ks3_stub import Ks3Stub  # noqa: E402
+
+# 替身服务不校验签名，使用固定的凭证
+_STS_TOKEN = {"accessKeyId": "test", "secretAccessKey": "test", "securityToken": ""}
+# stub.configure() 修改的端点配置，测试结束后恢复
+_ENDPOINT_SETTINGS = ("ENDPOINT", "CURRENT_ENDPOINT", "ENDPOINT_TYPE", "KS3_PORT", "KS3_PATH_STYLE")
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """启动替身服务并让上传器指向它"""
+    for name in _ENDPOINT_SETTINGS:
+        monkeypatch.setattr(config, name, getattr(config, name))
+    # 失败重试不等待退避
+    monkeypatch.setattr(config, "RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(config, "RETRY_MAX_DELAY", 0.0)
+    with Ks3Stub() as server:
+        server.configure()
+        yield server
+
+
+@pytest.fixture
+def make_uploader(stub, tmp_path, monkeypatch):
+    """在临时目录中创建上传器（断点续传日志、摘要缓存、批量清单都位于该目录下）"""
+    monkeypatch.chdir(tmp_path)
+
+    def make():
+        uploader = BaaiRobotDataUploader()
+        uploader.set_credential_provider(StsCredentialProvider(lambda: dict(_STS_TOKEN),
+                                                               sts_token=dict(_STS_TOKEN)))
+        return uploader
+
+    return make
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """数据集目录"""
+    path = tmp_path / "dataset"
+    path.mkdir()
+    return path
+
+
+def quietly(func, *args, **kwargs):
+    """调用上传接口，不输出进度信息"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def remote_key(target_directory, relative_path):
+    return f"{config.UPLOAD_TARGET}/{target_directory}/{relative_path}"
@@ -0,0 +1,62 @@
+"""批量上传清单：中途失败后再次运行时的续传"""
+from conftest import quietly, remote_key
+
+from robot_data_uploader import config
+
+TARGET = "robot/outbox"
+
+
+def _write(path, content):
+    path.write_text(content)
+    return path
+
+
+def _batch(uploader, dataset):
+    return quietly(uploader.batch_upload, directory=str(dataset), target_directory=TARGET).data
+
+
+def _open_batches(uploader):
+    return uploader.batch_outbox.query("SELECT COUNT(*) FROM batches")[0][0]
+
+
+def test_resume_picks_up_new_files_and_skips_completed(stub, make_uploader, dataset):
+    _write(dataset / "a.json", "a" * 100)
+    _write(dataset / "b.json", "b" * 100)
+    _write(dataset / "bad.json", "x")
+    stub.fail("PutObject", times=None, key="*/bad.json", status=400, code="InvalidArgument")
+
+    first = _batch(make_uploader(), dataset)
+    assert (first["success_count"], first["failure_count"]) == (2, 1)
+    assert _open_batches(make_uploader()) == 1
+
+    # 清单未完成期间新采集的文件也要上传，已完成的文件不再上传
+    _write(dataset / "c.json", "c" * 100)
+    puts = stub.requests["PutObject"]
+    second = _batch(make_uploader(), dataset)
+    assert second["total_files"] == 4
+    assert (second["success_count"], second["failure_count"]) == (3, 1)
+    assert stub.requests["PutObject"] == puts + 1
+    assert stub.get_object(config.BUCKET_NAME, remote_key(TARGET, "c.json")) == b"c" * 100
+
+
+def test_resume_reuploads_modified_files(stub, make_uploader, dataset):
+    a = _write(dataset / "a.json", "a" * 100)
+    _write(dataset / "bad.json", "x")
+    stub.fail("PutObject", times=None, key="*/bad.json", status=400, code="InvalidArgument")
+    _batch(make_uploader(), dataset)
+
+    _write(a, "changed")
+    _batch(make_uploader(), dataset)
+    assert stub.get_object(config.BUCKET_NAME, remote_key(TARGET, "a.json")) == b"changed"
+
+
+def test_deleted_failing_file_lets_batch_finish(stub, make_uploader, dataset):
+    _write(dataset / "a.json", "a" * 100)
+    bad = _write(dataset / "bad.json", "x")
+    stub.fail("PutObject", times=None, key="*/bad.json", status=400, code="InvalidArgument")
+    _batch(make_uploader(), dataset)
+
+    bad.unlink()
+    result = _batch(make_uploader(), dataset)
+    assert (result["total_files"], result["success_count"], result["failure_count"]) == (1, 1, 0)
+    assert _open_batches(make_uploader()) == 0
@@ -0,0 +1,77 @@
+"""压缩上传：对象内容、请求头，以及跳过已存在文件时的内容验证"""
+import gzip
+import json
+
+import pytest
+from conftest import quietly, remote_key
+
+from robot_data_uploader import config
+from robot_data_uploader.compression import compression_headers
+
+TARGET = "robot/compressed"
+
+
+@pytest.fixture(params=[5 * 1024 * 1024, 16 * 1024], ids=["in-memory", "spooled-multipart"])
+def gzip_jsonl(request, monkeypatch):
+    """*.jsonl 按 gzip 压缩上传；压缩结果分别缓存在内存中（单次上传）和临时文件中（分片上传）"""
+    monkeypatch.setattr(config, "UPLOAD_COMPRESSION_RULES", {"*.jsonl": "gzip"})
+    monkeypatch.setattr(config, "COMPRESSION_SPOOL_SIZE", request.param)
+
+
+def _records(frames, offset=0.0):
+    return "".join(json.dumps({"frame_index": i, "observation.state": [round(offset + i * 0.001, 4)] * 14}) + "\n"
+                   for i in range(frames)).encode("utf-8")
+
+
+def _batch(uploader, dataset, verify_method):
+    return quietly(uploader.batch_upload, directory=str(dataset), target_directory=TARGET,
+                   skip_exist=True, verify_method=verify_method).data
+
+
+def test_compressed_object_decodes_to_original(stub, make_uploader, dataset, gzip_jsonl):
+    data = _records(2000)
+    (dataset / "episode_000000.jsonl").write_bytes(data)
+    assert quietly(make_uploader().upload_file, str(dataset / "episode_000000.jsonl"), TARGET)["success"]
+
+    obj = stub.objects[(config.BUCKET_NAME, remote_key(TARGET, "episode_000000.jsonl"))]
+    assert len(obj.data) < len(data)
+    assert gzip.decompress(obj.data) == data
+    assert obj.headers["content-encoding"] == "gzip"
+    assert obj.headers["x-kss-meta-encoding"] == "gzip"
+    assert obj.headers["x-kss-meta-original-size"] == str(len(data))
+
+
+@pytest.mark.parametrize("verify_method", ["size", "md5", "sha256", "strict"])
+def test_unchanged_compressed_file_is_verified_and_skipped(stub, make_uploader, dataset, gzip_jsonl,
+                                                           verify_method):
+    (dataset / "episode_000000.jsonl").write_bytes(_records(2000))
+    _batch(make_uploader(), dataset, verify_method)
+    uploads = stub.requests["PutObject"] + stub.requests["CompleteMultipartUpload"]
+
+    result = _batch(make_uploader(), dataset, verify_method)
+    assert (result["skipped_count"], result["success_count"]) == (1, 0)
+    assert stub.requests["PutObject"] + stub.requests["CompleteMultipartUpload"] == uploads
+
+
+@pytest.mark.parametrize("verify_method", ["md5", "sha256", "strict"])
+def test_modified_compressed_file_is_reuploaded(stub, make_uploader, dataset, gzip_jsonl, verify_method):
+    records = dataset / "episode_000000.jsonl"
+    records.write_bytes(_records(2000))
+    _batch(make_uploader(), dataset, verify_method)
+
+    # 大小不变、内容不同：只有按摘要验证才能发现
+    data = _records(2000, offset=0.5)
+    assert len(data) == records.stat().st_size
+    records.write_bytes(data)
+    result = _batch(make_uploader(), dataset, verify_method)
+    assert result["success_count"] == 1
+    obj = stub.objects[(config.BUCKET_NAME, remote_key(TARGET, records.name))]
+    assert gzip.decompress(obj.data) == data
+
+
+def test_only_gzip_sets_content_encoding():
+    assert compression_headers("gzip", 10)["Content-Encoding"] == "gzip"
+    zstd = compression_headers("zstd", 10)
+    assert "Content-Encoding" not in zstd
+    assert zstd["Content-Type"] == "application/zstd"
+    assert zstd["x-kss-meta-encoding"] == "zstd"
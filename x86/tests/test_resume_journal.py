@@ -0,0 +1,55 @@
+"""分片上传断点续传：上次已上传的分片不再重复上传"""
+import os
+
+import pytest
+from conftest import quietly, remote_key
+
+from robot_data_uploader import config
+
+TARGET = "robot/multipart"
+
+
+@pytest.fixture(autouse=True)
+def fixed_part_size(monkeypatch):
+    # 分片大小不随实测吞吐量变化：12MB 的文件固定分为 5MB、5MB、2MB 三片
+    monkeypatch.setattr(config, "MAX_PART_SIZE", config.PART_SIZE)
+    monkeypatch.setattr(config, "MAX_UPLOAD_RETRIES", 1)
+
+
+def test_multipart_upload_resumes_from_journal(stub, make_uploader, dataset):
+    data = os.urandom(12 * 1024 * 1024)
+    video = dataset / "episode_000000.mp4"
+    video.write_bytes(data)
+    key = remote_key(TARGET, video.name)
+
+    # 分片全部上传后完成请求失败：分片记录在本地日志中，服务端的分片上传任务保留
+    stub.fail("CompleteMultipartUpload", times=None, status=400, code="InvalidPart")
+    first = quietly(make_uploader().upload_file, str(video), TARGET)
+    assert not first["success"]
+    parts = stub.requests["UploadPart"]
+    assert parts == 3
+    assert stub.get_object(config.BUCKET_NAME, key) is None
+
+    stub.faults.clear()
+    second = quietly(make_uploader().upload_file, str(video), TARGET)
+    assert second["success"]
+    assert stub.requests["UploadPart"] == parts
+    assert stub.requests["InitiateMultipartUpload"] == 1
+    assert stub.get_object(config.BUCKET_NAME, key) == data
+    assert not stub.uploads
+
+
+def test_changed_file_does_not_reuse_stale_parts(stub, make_uploader, dataset):
+    video = dataset / "episode_000000.mp4"
+    video.write_bytes(os.urandom(12 * 1024 * 1024))
+    stub.fail("CompleteMultipartUpload", times=None, status=400, code="InvalidPart")
+    quietly(make_uploader().upload_file, str(video), TARGET)
+
+    # 本地文件已修改：沿用服务端的分片上传任务时逐片核对MD5，内容不同的分片重新上传
+    stub.faults.clear()
+    data = os.urandom(11 * 1024 * 1024)
+    video.write_bytes(data)
+    result = quietly(make_uploader().upload_file, str(video), TARGET)
+    assert result["success"]
+    assert stub.requests["UploadPart"] == 6
+    assert stub.get_object(config.BUCKET_NAME, remote_key(TARGET, video.name)) == data